@@ -1,18 +1,32 @@
-import requests
+from bisect import bisect_right
+from pathlib import Path
+import json
+import logging
+import threading
+from typing import TYPE_CHECKING
+from Services import services
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
 
 # 要查詢的排名位置
 RANKS = [1, 1000, 5000, 10000, 20000, 120000]
+# 外部 API 的逾時 (秒)
+HTTP_TIMEOUT = 30
 
-def get_json(url: str):
+def get_json(url: str, timeout: float = HTTP_TIMEOUT):
+    """以共用的 HTTP 連線 (服務 "http") 取得 JSON，失敗時回傳 None"""
     try:
-        response = requests.get(url)
+        response = services.resolve("http").get(url, timeout=timeout)
         if response.status_code == 200:
             return response.json()
         else:
-            print(f"Failed to fetch {url} (status code: {response.status_code})")
+            logger.error("Failed to fetch %s (status code: %s)", url, response.status_code)
             return None
     except Exception as e:
-        print(f"Exception while fetching {url}: {e}")
+        logger.error("Exception while fetching %s: %s", url, e)
         return None
 
 def get_rank_results(data: dict) -> dict:
@@ -37,7 +51,7 @@ def get_raidinfo_by_season(raid_info: dict, sensons: int, eraid: bool = False) -
         ts = raid_info["RaidSeasons"][0]
         seasons = ts["EliminateSeasons"] if eraid else ts["Seasons"]
     except Exception as e:
-        print("取得 raid_info 中的賽季資料錯誤:", e)
+        logger.error("取得 raid_info 中的賽季資料錯誤: %s", e)
         return {}
     season_data = None
     for season in seasons:
@@ -47,7 +61,7 @@ def get_raidinfo_by_season(raid_info: dict, sensons: int, eraid: bool = False) -
             break
     if season_data is None and seasons:
         season_data = seasons[-1]
-    print("[DEBUG] get_raidinfo_by_season - sensons:", sensons, "取得的賽季資料:", season_data)
+    logger.debug("get_raidinfo_by_season - sensons: %s 取得的賽季資料: %s", sensons, season_data)
     return season_data
 
 # 修改後的 get_boss_info
@@ -63,31 +77,135 @@ def get_boss_info(raid_info: dict, raid_id: int) -> str:
                 return r.get("Name", "未知")
         return "未知"
     except Exception as e:
-        print("取得 boss 資訊錯誤:", e)
+        logger.error("取得 boss 資訊錯誤: %s", e)
         return "未知"
 
 
 
+# 分數計算用的資料表 (難度倍率、基本分數、難度門檻與各 Boss 的時間模式)
+SCORING_FILE = Path(__file__).parent / "raid_scoring.json"
+
+
+def load_scoring_table(path: Path = SCORING_FILE) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+_scoring = load_scoring_table()
+
+# 難度代碼：0 為無法判斷 ("???")，1~8 由低到高
+DIFFICULTY_NAMES = ['???', *_scoring["difficulties"]]
+DIFFICULTY_CODES = {name: code for code, name in enumerate(DIFFICULTY_NAMES)}
+
+SCORE_MULTIPLIERS = dict(zip(_scoring["difficulties"], _scoring["multipliers"]))
+BASE_DIFFICULTY_SCORES = dict(zip(_scoring["difficulties"], _scoring["base_difficulty_scores"]))
+# {模式: {難度: 基本 HP 分數}}
+BASE_HP_SCORES = {mode: dict(zip(_scoring["difficulties"], profile["base_hp_scores"])) for mode, profile in _scoring["profiles"].items()}
+# 各模式下 NORMAL ~ LUNATIC 的最低分數 (由低到高)，第 i 個門檻對應難度代碼 i + 1
+DIFFICULTY_THRESHOLDS = {mode: profile["thresholds"] for mode, profile in _scoring["profiles"].items()}
+TIME_LIMITS = {mode: profile["time_limit"] for mode, profile in _scoring["profiles"].items()}
+DEFAULT_MODE = _scoring["default_profile"]
+
+# Boss 對照表：顯示名稱 -> raid_id、資料表代號 -> 顯示名稱、raid_id -> 模式
+BOSS_RAID_IDS = {boss["name"]: boss["raid_id"] for boss in _scoring["bosses"]}
+BOSS_TABLE_KEYS = {boss["table_key"]: boss["name"] for boss in _scoring["bosses"]}
+RAID_MODES = {boss["raid_id"]: boss["profile"] for boss in _scoring["bosses"]}
+
+# (模式, 難度) -> (分數倍率, 基本 HP 分數 + 基本難度分數)，查詢時不需再組合字典
+_SCORE_ENTRIES = {
+    (mode, name): (SCORE_MULTIPLIERS[name], BASE_HP_SCORES[mode][name] + BASE_DIFFICULTY_SCORES[name])
+    for mode in BASE_HP_SCORES for name in _scoring["difficulties"]
+}
+
+# 以難度代碼為索引的 NumPy 查表陣列，第一次使用陣列版本的函式時才建立 (啟動時不匯入 NumPy)
+_lookup_arrays = None
+_lookup_lock = threading.Lock()
+
+
+def _get_lookup_arrays() -> dict:
+    """門檻、倍率 (代碼 0 的倍率為 0，代表無法計算用時)、基本分數與難度名稱的查表陣列"""
+    global _lookup_arrays
+    if _lookup_arrays is None:
+        with _lookup_lock:
+            if _lookup_arrays is None:
+                import numpy as np
+                _lookup_arrays = {
+                    "thresholds": {mode: np.array(thresholds, dtype=np.float64) for mode, thresholds in DIFFICULTY_THRESHOLDS.items()},
+                    "multipliers": np.array([SCORE_MULTIPLIERS.get(name, 0) for name in DIFFICULTY_NAMES], dtype=np.float64),
+                    "base_scores": {
+                        mode: np.array([base_hp.get(name, 0) + BASE_DIFFICULTY_SCORES.get(name, 0) for name in DIFFICULTY_NAMES], dtype=np.float64)
+                        for mode, base_hp in BASE_HP_SCORES.items()
+                    },
+                    "names": np.array(DIFFICULTY_NAMES),
+                }
+    return _lookup_arrays
+
+
+def get_mode(raid_id) -> str:
+    """raid_id 對應的時間模式 ("3min" 或 "4min")，未知的 Boss 使用預設模式"""
+    return RAID_MODES.get(raid_id, DEFAULT_MODE)
+
+
+def get_time_limit(raid_id) -> int:
+    """raid_id 對應的戰鬥時間上限 (秒)"""
+    return TIME_LIMITS[get_mode(raid_id)]
+
+
+def get_raid_id(boss_name: str) -> int:
+    """Boss 顯示名稱 -> raid_id，未知的 Boss 回傳 0"""
+    return BOSS_RAID_IDS.get(boss_name, 0)
+
+
+def get_score_entry(raid_id, difficulty: str) -> tuple:
+    """回傳 (分數倍率, 基本 HP 分數 + 基本難度分數)，未知難度回傳 (0, 0)"""
+    return _SCORE_ENTRIES.get((get_mode(raid_id), difficulty.upper()), (0, 0))
+
+
+def determine_difficulty_array(scores, raid_id) -> "np.ndarray":
+    """
+    一次判斷整個分數陣列的難度，回傳難度代碼陣列 (DIFFICULTY_NAMES 的索引，0 為 "???")。
+    以 searchsorted 在門檻表上二分搜尋，不逐筆呼叫 determine_difficulty。
+    """
+    import numpy as np
+    thresholds = _get_lookup_arrays()["thresholds"][get_mode(raid_id)]
+    return np.searchsorted(thresholds, np.asarray(scores, dtype=np.float64), side="right").astype(np.int8)
+
+
+def difficulty_names(codes) -> "np.ndarray":
+    """難度代碼陣列 -> 難度名稱陣列"""
+    import numpy as np
+    return _get_lookup_arrays()["names"][np.asarray(codes)]
+
+
+def calculate_used_time_array(scores, raid_id, difficulty_codes=None) -> "np.ndarray":
+    """
+    一次計算整個分數陣列的用時 (秒)，公式同 calculate_used_time；
+    未指定難度代碼時依分數判斷。無法計算 (難度不明或分數過低) 的位置為 NaN。
+    """
+    import numpy as np
+    lookup = _get_lookup_arrays()
+    scores = np.asarray(scores, dtype=np.float64)
+    if difficulty_codes is None:
+        difficulty_codes = determine_difficulty_array(scores, raid_id)
+    multipliers = lookup["multipliers"][difficulty_codes]
+    target_time_score = scores - lookup["base_scores"][get_mode(raid_id)][difficulty_codes]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        used_times = 3600 - target_time_score / multipliers
+    used_times[(multipliers == 0) | (target_time_score < 0)] = np.nan
+    return used_times
+
+
 def calculate_used_time(score, difficulty, raid_id):
     """
     根據分數、難度與 raid_id 計算用時（單位：秒）
     用時 = 3600 - ((score - (基本HP分數 + 基本難度分數)) / 分數倍率)
     """
-    multiplier = get_score_multiplier(difficulty)
-    base_hp = get_base_hp_score(difficulty, raid_id)
-    base_difficulty = get_base_difficulty_score(difficulty)
-    target_time_score = score - (base_hp + base_difficulty)
-    # Debug 輸出各參數
-    print(f"[DEBUG] calculate_used_time - score: {score}, difficulty: {difficulty}, raid_id: {raid_id}")
-    print(f"[DEBUG] multiplier: {multiplier}, base_hp: {base_hp}, base_difficulty: {base_difficulty}")
-    print(f"[DEBUG] target_time_score: {target_time_score}")
-    
+    multiplier, base_score = get_score_entry(raid_id, difficulty)
+    target_time_score = score - base_score
     if target_time_score < 0:
         raise ValueError("輸入的分數太低，計算後的目標時間分數為負值。")
     remaining_time = target_time_score / multiplier
-    used_time = 3600 - remaining_time
-    print(f"[DEBUG] remaining_time: {remaining_time}, used_time: {used_time}")
-    return used_time
+    return 3600 - remaining_time
 
 def format_time(seconds: float) -> str:
     minutes = int(seconds // 60)
@@ -97,104 +215,21 @@ def format_time(seconds: float) -> str:
 
 def get_score_multiplier(difficulty):
     """根據難度取得分數倍率"""
-    multipliers = {
-        'NORMAL': 120,
-        'HARD': 240,
-        'VERYHARD': 480,
-        'HARDCORE': 960,
-        'EXTREME': 1440,
-        'INSANE': 1920,
-        'TORMENT': 2400,
-        'LUNATIC': 2880,
-    }
-    return multipliers.get(difficulty.upper(), 0)
+    return SCORE_MULTIPLIERS.get(difficulty.upper(), 0)
 
 def get_base_hp_score(difficulty, raid_id):
-    """
-    根據難度以及 raid_id 取得基本 HP 分數。
-    若 raid_id 為 1 或 5，使用一組數值，否則使用另一組數值。
-    """
-    difficulty = difficulty.upper()
-    if raid_id in [1, 5]:
-        mapping = {
-            'NORMAL': 229000,
-            'HARD': 458000,
-            'VERYHARD': 916000,
-            'HARDCORE': 1832000,
-            'EXTREME': 5392000,
-            'INSANE': 12449600,
-            'TORMENT': 18876000,
-            'LUNATIC': 25683000, # unknown
-        }
-    else:
-        mapping = {
-            'NORMAL': 277000,
-            'HARD': 554000,
-            'VERYHARD': 1108000,
-            'HARDCORE': 2216000,
-            'EXTREME': 6160000,
-            'INSANE': 14216000,
-            'TORMENT': 19508000,
-            'LUNATIC': 26315000,
-        }
-    return mapping.get(difficulty, 0)
+    """根據難度以及 raid_id (3 分鐘或 4 分鐘模式) 取得基本 HP 分數"""
+    return BASE_HP_SCORES[get_mode(raid_id)].get(difficulty.upper(), 0)
 
 def get_base_difficulty_score(difficulty):
     """根據難度取得基本難度分數"""
-    difficulty = difficulty.upper()
-    mapping = {
-        'NORMAL': 250000,
-        'HARD': 500000,
-        'VERYHARD': 1000000,
-        'HARDCORE': 2000000,
-        'EXTREME': 4000000,
-        'INSANE': 6800000,
-        'TORMENT': 12200000,
-        'LUNATIC': 17710000,
-    }
-    return mapping.get(difficulty, 0)
+    return BASE_DIFFICULTY_SCORES.get(difficulty.upper(), 0)
 
 def determine_difficulty(score: int, mode: str) -> str:
     """
     根據分數與模式（"4min" 或 "3min"）判斷難度
     """
-    if mode == "4min":
-        if score >= 44025000:
-            return "LUNATIC"
-        elif score >= 31708000:
-            return "TORMENT"
-        elif score >= 21016000:
-            return "INSANE"
-        elif score >= 10160000:
-            return "EXTREME"
-        elif score >= 4216000:
-            return "HARDCORE"
-        elif score >= 2108000:
-            return "VERYHARD"
-        elif score >= 1054000:
-            return "HARD"
-        elif score >= 527000:
-            return "NORMAL"
-        else:
-            return "???"
-    elif mode == "3min":
-        if score >= 40000000:
-            return "LUNATIC"
-        elif score >= 31076000:
-            return "TORMENT"
-        elif score >= 19249600:
-            return "INSANE"
-        elif score >= 9392000:
-            return "EXTREME"
-        elif score >= 3832000:
-            return "HARDCORE"
-        elif score >= 1916000:
-            return "VERYHARD"
-        elif score >= 958000:
-            return "HARD"
-        elif score >= 479000:
-            return "NORMAL"
-        else:
-            return "???"
-    else:
+    thresholds = DIFFICULTY_THRESHOLDS.get(mode)
+    if thresholds is None:
         return "???"
+    return DIFFICULTY_NAMES[bisect_right(thresholds, score)]
@@ -1,24 +1,43 @@
 
+import logging
 import pandas as pd
 import re
 from utils import  get_student_usage_stats
 
+logger = logging.getLogger(__name__)
+
 
 class AronaStatistics:
     """負責讀取 `data.xlsx` 並處理 RAID/ERAID 數據"""
 
-    def __init__(self, file_path="data.xlsx"):
+    def __init__(self, file_path="data.xlsx", snapshot=None):
+        """snapshot 為 SheetSnapshot 時從共用的快照讀取工作表，不開啟 data.xlsx"""
         self.file_path = file_path
-        self.xlsx = pd.ExcelFile(file_path)
+        self.snapshot = snapshot
+        if snapshot is not None:
+            self.xlsx = None
+            self.sheet_names = snapshot.sheet_names
+        else:
+            self.xlsx = pd.ExcelFile(file_path)
+            self.sheet_names = self.xlsx.sheet_names
+
+    def read_sheet(self, sheet: str, header=0) -> pd.DataFrame:
+        if self.snapshot is not None:
+            return self.snapshot.frame(sheet, header)
+        return pd.read_excel(self.xlsx, sheet_name=sheet, header=header)
+
+    def sheet_columns(self, sheet: str) -> list:
+        if self.snapshot is not None:
+            return self.snapshot.columns(sheet)
+        return list(pd.read_excel(self.xlsx, sheet_name=sheet, nrows=1).columns)
 
     def get_raid_name(self, season: int):
         """根據 `data.xlsx` 找出 RAID SXX 的正確名稱"""
-        for sheet in self.xlsx.sheet_names:
-            df = pd.read_excel(self.xlsx, sheet_name=sheet, nrows=1)
-            for column in df.columns:
+        for sheet in self.sheet_names:
+            for column in self.sheet_columns(sheet):
                 if f"S{season}" in column and "總力戰" in column:
                     return column
-        print(f"⚠ 未找到 S{season} 相關的總力戰", flush=True)
+        logger.warning("⚠ 未找到 S%s 相關的總力戰", season)
         return f"S{season} 總力戰 (未知名稱)"
 
     def get_eraid_name(self, season: int, armor_type: str):
@@ -26,9 +45,8 @@ class AronaStatistics:
         根據 `data.xlsx` 找出 ERAID SXX 的正確名稱，只匹配指定 `armor_type`
         """
         possible_names = []
-        for sheet in self.xlsx.sheet_names:
-            df = pd.read_excel(self.xlsx, sheet_name=sheet, nrows=1)
-            for column in df.columns:
+        for sheet in self.sheet_names:
+            for column in self.sheet_columns(sheet):
                 if f"S{season}" in column and "大決戰" in column:
                     if armor_type in column:
                         possible_names.append(column)
@@ -37,15 +55,10 @@ class AronaStatistics:
         possible_names = list(dict.fromkeys(possible_names))
         
         if not possible_names:
-            print(
-                f"⚠ 未找到 S{season} {armor_type} 相關的 ERAID 大決戰", flush=True
-            )
+            logger.warning("⚠ 未找到 S%s %s 相關的 ERAID 大決戰", season, armor_type)
             return f"S{season} {armor_type} 大決戰 (未知名稱)"
         if len(possible_names) > 1:
-            print(
-                f"⚠ 警告: S{season} {armor_type} 匹配到多個結果, 可能有誤: {possible_names}",
-                flush=True,
-            )
+            logger.warning("⚠ 警告: S%s %s 匹配到多個結果, 可能有誤: %s", season, armor_type, possible_names)
         return possible_names[0]
 
     def get_summary_sheet_name(self, rank: int) -> str:
@@ -71,7 +84,7 @@ class AronaStatistics:
         """獲取 RAID 指定賽季的角色數據"""
         raid_name = self.get_raid_name(season)
         summary_sheet = self.get_summary_sheet_name(rank)
-        df = pd.read_excel(self.xlsx, sheet_name=summary_sheet)
+        df = self.read_sheet(summary_sheet)
         if raid_name in df.columns:
             return (
                 df[['stdNm', raid_name]]
@@ -91,7 +104,7 @@ class AronaStatistics:
 
         eraid_name = self.get_eraid_name(season, armor_type)
         summary_sheet = self.get_summary_sheet_name(rank)
-        df = pd.read_excel(self.xlsx, sheet_name=summary_sheet)
+        df = self.read_sheet(summary_sheet)
         if eraid_name in df.columns:
             return (
                 df[['stdNm', eraid_name]]
@@ -107,21 +120,21 @@ class AronaStatistics:
         獲取 student_id 在 S{seasons} {armor_type} 大決戰 的數據，並回傳格式化表格。
         """
         matching_sheets = []
-        print(f"🔍 搜尋 `{student_id}` 相關的工作表...", flush=True)
+        logger.debug("🔍 搜尋 `%s` 相關的工作表...", student_id)
 
-        for sheet in self.xlsx.sheet_names:
+        for sheet in self.sheet_names:
             if student_id in sheet:
                 matching_sheets.append(sheet)
-                print(f"✅ 找到 `{student_id}` 相關的工作表: {sheet}", flush=True)
+                logger.debug("✅ 找到 `%s` 相關的工作表: %s", student_id, sheet)
 
         if not matching_sheets:
-            print(f"❌ 找不到 `{student_id}` 相關的工作表", flush=True)
+            logger.warning("❌ 找不到 `%s` 相關的工作表", student_id)
             return None, None
 
-        print(f"🔍 在 `{student_id}` 的工作表內，搜尋 `S{seasons}`, `{armor_type}`, `大決戰` 是否出現在內容中...", flush=True)
+        logger.debug("🔍 在 `%s` 的工作表內，搜尋 `S%s`, `%s`, `大決戰` 是否出現在內容中...", student_id, seasons, armor_type)
 
         for sheet in matching_sheets:
-            df_full = pd.read_excel(self.xlsx, sheet_name=sheet, header=None)
+            df_full = self.read_sheet(sheet, header=None)
 
             found_row = None
             end_row = None
@@ -130,12 +143,12 @@ class AronaStatistics:
 
                 if f"S{seasons}" in row_str and armor_type in row_str and "大決戰" in row_str:
                     found_row = index
-                    print(f"🎯 `{sheet}` 內部找到 `S{seasons} {armor_type} 大決戰` (位於第 {found_row+1} 行)", flush=True)
+                    logger.debug("🎯 `%s` 內部找到 `S%s %s 大決戰` (位於第 %s 行)", sheet, seasons, armor_type, found_row+1)
                     continue
 
                 if found_row is not None and re.search(r"S\d+ - .* (大決戰|總力戰)", row_str):
                     end_row = index
-                    print(f"⏹ 截斷 `{sheet}` 的數據 (結束於第 {end_row+1} 行)", flush=True)
+                    logger.debug("⏹ 截斷 `%s` 的數據 (結束於第 %s 行)", sheet, end_row+1)
                     break
 
             if found_row is not None:
@@ -147,7 +160,7 @@ class AronaStatistics:
                 headers = [str(x).strip() for x in df_section.iloc[1]]
                 data_rows = df_section.iloc[2:].values.tolist()
 
-                print(data_rows, flush=True)
+                logger.debug("原始數據列: %s", data_rows)
                 Two_dimensional_Arrays_data = get_student_usage_stats(data_rows)
                 return sheet, title, Two_dimensional_Arrays_data
 
@@ -158,21 +171,21 @@ class AronaStatistics:
         獲取 student_id 在 S{seasons} 總力戰 的數據，並回傳格式化表格。
         """
         matching_sheets = []
-        print(f"🔍 搜尋 `{student_id}` 相關的工作表...", flush=True)
+        logger.debug("🔍 搜尋 `%s` 相關的工作表...", student_id)
 
-        for sheet in self.xlsx.sheet_names:
+        for sheet in self.sheet_names:
             if student_id in sheet:
                 matching_sheets.append(sheet)
-                print(f"✅ 找到 `{student_id}` 相關的工作表: {sheet}", flush=True)
+                logger.debug("✅ 找到 `%s` 相關的工作表: %s", student_id, sheet)
 
         if not matching_sheets:
-            print(f"❌ 找不到 `{student_id}` 相關的工作表", flush=True)
+            logger.warning("❌ 找不到 `%s` 相關的工作表", student_id)
             return None, None
 
-        print(f"🔍 在 `{student_id}` 的工作表內，搜尋 `S{seasons}`, `總力戰` 是否出現在內容中...", flush=True)
+        logger.debug("🔍 在 `%s` 的工作表內，搜尋 `S%s`, `總力戰` 是否出現在內容中...", student_id, seasons)
 
         for sheet in matching_sheets:
-            df_full = pd.read_excel(self.xlsx, sheet_name=sheet, header=None)
+            df_full = self.read_sheet(sheet, header=None)
 
             found_row = None
             end_row = None
@@ -181,13 +194,13 @@ class AronaStatistics:
 
                 if f"S{seasons}" in row_str and "總力戰" in row_str:
                     found_row = index
-                    print(f"🎯 `{sheet}` 內部找到 `S{seasons} 總力戰` (位於第 {found_row+1} 行)", flush=True)
+                    logger.debug("🎯 `%s` 內部找到 `S%s 總力戰` (位於第 %s 行)", sheet, seasons, found_row+1)
                     continue
 
                 # **檢測 `SXX - ... 大決戰` 或 `SXX - ... 總力戰` 來截斷數據**
                 if found_row is not None and re.search(r"S\d+ - .* (大決戰|總力戰)", row_str):
                     end_row = index
-                    print(f"⏹ 截斷 `{sheet}` 的數據 (結束於第 {end_row+1} 行)", flush=True)
+                    logger.debug("⏹ 截斷 `%s` 的數據 (結束於第 %s 行)", sheet, end_row+1)
                     break
 
             if found_row is not None:
@@ -201,13 +214,13 @@ class AronaStatistics:
                 headers = [str(x).strip() for x in df_section.iloc[1]]
                 data_rows = df_section.iloc[2:].values.tolist()
 
-                print(data_rows, flush=True)
+                logger.debug("原始數據列: %s", data_rows)
                 Two_dimensional_Arrays_data = get_student_usage_stats(data_rows)
-                print(Two_dimensional_Arrays_data, flush=True)
+                logger.debug("轉換後數據: %s", Two_dimensional_Arrays_data)
 
                 return sheet, title, Two_dimensional_Arrays_data
 
-        print(f"❌ `{student_id}` 的 S{seasons} 總力戰 沒有在內容中找到", flush=True)
+        logger.warning("❌ `%s` 的 S%s 總力戰 沒有在內容中找到", student_id, seasons)
         return None, None
 
     
@@ -222,12 +235,12 @@ class AronaStatistics:
             return f"❌ 錯誤: {e}"
 
         try:
-            df = pd.read_excel(self.file_path, sheet_name=sheet_name)
+            df = self.read_sheet(sheet_name)
         except Exception as e:
             return f"❌ 讀取 Excel 檔案錯誤：{e}"
 
         # 確保欄位名稱正確
-        df.columns = df.columns.str.strip()
+        df = df.rename(columns=str.strip)
 
         if 'stdNm' not in df.columns:
             return "❌ Excel 檔案格式錯誤，缺少 'stdNm' 欄位"
@@ -263,7 +276,7 @@ class AronaStatistics:
         將戰鬥環境類型從英文翻譯為中文
         """
         if not isinstance(title, str):  # 確保 title 是字串
-            print(f"⚠ 警告：title 不是字串，跳過翻譯 ({title})")
+            logger.warning("⚠ 警告：title 不是字串，跳過翻譯 (%s)", title)
             return title  # 如果不是字串，直接返回原始值
 
         translations = {
@@ -281,7 +294,7 @@ class AronaStatistics:
                 title = title.replace(eng, zh)  # 替換英文為中文
             return title
         except Exception as e:
-            print(f"⚠ 翻譯錯誤：{e}")
+            logger.warning("⚠ 翻譯錯誤：%s", e)
             return title  # 發生錯誤時，返回原始值
 
 
@@ -0,0 +1,164 @@
+# DataStore.py
+"""
+Bot 執行期間使用的資料 (data.xlsx 統計、精簡學生資料、學生名稱索引、繪圖素材) 的熱重載。
+
+  - 所有資料在背景執行緒中建立成一個新的 DataSnapshot，完成後以單一參照指派替換 `store.current`，
+    讀取端不會看到載入到一半的狀態，Bot 也不需要重新啟動
+  - 指令開始時取一次 `snapshot = store.current` 並在整個指令中使用同一份，避免前後讀到不同版本
+  - 任一檔案載入失敗時保留舊的資料，下次檢查時再重試
+  - 多行程部署時 (設定 DATA_SNAPSHOT) 不解析 data.xlsx，改為開啟 launcher.py 建立的共用快照 (SheetSnapshot)
+  - 第一次載入 (含 pandas、PIL 的匯入) 登記為延遲初始化的服務 "data"，由 Bot 登入後的預熱或第一個指令觸發；
+    指令以 `await store.wait_loaded()` 取得資料
+"""
+from pathlib import Path
+from datetime import datetime
+import json
+import logging
+import threading
+from typing import TYPE_CHECKING
+from Services import services
+import Sharding
+from StudentNameTranslator import translator
+import StudentModel
+
+if TYPE_CHECKING:
+    from AronaStatistics import AronaStatistics
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+XLSX_FILE = BASE_DIR / "data.xlsx"
+JSON_DIR = BASE_DIR / "Json"
+STUDENTS_JSON = StudentModel.STUDENTS_JSON
+STUDENTS_COMPACT_JSON = StudentModel.STUDENTS_COMPACT_JSON
+ID_NAME_MAPPING_JSON = JSON_DIR / "id_name_mapping.json"
+# 第一次載入失敗時回覆給使用者的訊息
+DATA_UNAVAILABLE = "⚠ 資料尚未載入完成或載入失敗，請稍後再試"
+
+
+class DataSnapshot:
+    """某一時間點載入完成的唯讀資料"""
+
+    def __init__(self, stats: "AronaStatistics | None", students: dict, id_name_mapping: dict,
+                 assets: dict | None, mtimes: dict):
+        self.stats = stats
+        self.students = students  # 學生 ID 字串 -> StudentModel.Student
+        self.id_name_mapping = id_name_mapping
+        # 學生名稱 -> ID (同名時保留第一筆，與原本逐一比對的結果相同)
+        self.student_ids = {}
+        for student_id, name in id_name_mapping.items():
+            self.student_ids.setdefault(name, student_id)
+        self.assets = assets
+        self.mtimes = mtimes
+        self.loaded_at = datetime.now()
+
+    def find_student_id(self, name: str) -> str | None:
+        return self.student_ids.get(name)
+
+
+def _mtime(path: Path) -> float | None:
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def _load_json(path: Path) -> dict:
+    if not path.exists():
+        logger.warning("⚠ 警告：找不到 %s，部分功能可能無法運作。", path)
+        return {}
+    with open(path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    logger.info("✅ 成功載入 %s", path)
+    return data
+
+
+class DataStore:
+    """持有目前的 DataSnapshot；reload() 建立新版本後整份替換"""
+
+    def __init__(self, xlsx_file: Path = XLSX_FILE, students_json: Path = STUDENTS_JSON,
+                 id_name_mapping_json: Path = ID_NAME_MAPPING_JSON, students_compact_json: Path = STUDENTS_COMPACT_JSON,
+                 snapshot_pointer: Path | None = Sharding.DATA_SNAPSHOT):
+        self.xlsx_file = xlsx_file
+        self.snapshot_pointer = snapshot_pointer
+        self.students_json = students_json
+        self.students_compact_json = students_compact_json
+        self.id_name_mapping_json = id_name_mapping_json
+        self.current = DataSnapshot(None, {}, {}, None, {})
+        self.version = 0
+        self._reload_lock = threading.Lock()
+
+    def _students_source(self) -> Path:
+        # 有精簡檔時只追蹤精簡檔：DownloadSchaleDBData 執行中途先更新 students.json 時不會提早重新載入
+        return self.students_compact_json if self.students_compact_json.exists() else self.students_json
+
+    def _source_mtimes(self) -> dict:
+        stats_source = self.snapshot_pointer or self.xlsx_file
+        return {str(path): _mtime(path) for path in (stats_source, self._students_source(), self.id_name_mapping_json)}
+
+    def is_stale(self) -> bool:
+        """任一來源檔案的修改時間與目前載入的版本不同"""
+        return self._source_mtimes() != self.current.mtimes
+
+    def build_snapshot(self) -> DataSnapshot:
+        """從檔案建立新的 DataSnapshot (不影響目前的資料)；缺少 data.xlsx 或檔案格式錯誤時拋出例外"""
+        # pandas 與 PIL 匯入較慢，於第一次載入時才匯入
+        from AronaStatistics import AronaStatistics
+        import ImageFactory
+
+        mtimes = self._source_mtimes()
+        if self.snapshot_pointer is not None:
+            import SheetSnapshot
+            stats = AronaStatistics(str(self.xlsx_file), snapshot=SheetSnapshot.open_current(self.snapshot_pointer))
+        else:
+            stats = AronaStatistics(str(self.xlsx_file))
+        students = StudentModel.load_students(self.students_compact_json, self.students_json)
+        id_name_mapping = _load_json(self.id_name_mapping_json)
+        try:
+            assets = ImageFactory.load_assets()
+        except OSError as e:
+            # 缺少圖示或字型時於繪圖時再讀取 (會得到相同的錯誤訊息)
+            logger.warning("⚠ 無法預先載入繪圖素材: %s", e)
+            assets = None
+        return DataSnapshot(stats, students, id_name_mapping, assets, mtimes)
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        來源檔案有變動 (或 force=True) 時重新載入，回傳是否已替換。
+        同時只會有一個重新載入在進行；失敗時保留舊的資料並拋出例外。
+        """
+        with self._reload_lock:
+            if not force and not self.is_stale():
+                return False
+            snapshot = self.build_snapshot()
+            self.current = snapshot
+            self.version += 1
+        if self.version > 1:
+            # 搜尋影片用的中日名稱對照表同樣以整組替換的方式更新 (首次載入時由第一次搜尋建立)
+            translator.refresh()
+        logger.info("✅ 已載入第 %s 版資料 (%s 位學生)", self.version, len(snapshot.students))
+        return True
+
+    def ensure_loaded(self) -> "DataStore":
+        """尚未載入過資料時載入 (供服務 "data" 使用)"""
+        if self.version == 0:
+            self.reload(force=True)
+        return self
+
+    @property
+    def loaded(self) -> bool:
+        return self.version > 0
+
+    async def wait_loaded(self) -> DataSnapshot | None:
+        """等待第一次載入完成後回傳目前的資料；第一次載入失敗時回傳 None (下次呼叫會重試)"""
+        if not self.loaded:
+            try:
+                await services.get("data")
+            except Exception:
+                return None
+        return self.current
+
+
+# 全域共用的資料
+store = DataStore()
+services.register("data", store.ensure_loaded)
@@ -1,92 +1,384 @@
 import io
 from pathlib import Path
+import argparse
+import hashlib
+from email.utils import formatdate
+import random
 import sys
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from tqdm import tqdm
+import ImageFactory
+import StudentModel
 
 
-if sys.stdout.encoding != 'utf-8':
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-if sys.stderr.encoding != 'utf-8':
-    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
-
 # 定義 URL
 urls = {
     "students.json": "https://schaledb.com/data/tw/students.json",
-    "localization.json": "https://schaledb.com/data/tw/localization.json"
+    "localization.json": "https://schaledb.com/data/tw/localization.json",
+    # 日服學生資料，供 StudentNameTranslator 建立中日名稱對照表
+    "students_jp.json": "https://schaledb.com/data/jp/students.json"
 }
 JSON_DIR = Path(__file__).parent / "Json"
 STUDENTS_JSON = JSON_DIR / "students.json"
-JSON_DIR.mkdir(exist_ok=True) 
-
-# 下載並保存 JSON 文件
-for filename, url in urls.items():
-    Save_Path = JSON_DIR / filename
-    response = requests.get(url)
-    if response.status_code == 200:
-        with open(Save_Path, "w", encoding="utf-8") as file:
-            json.dump(response.json(), file, ensure_ascii=False, indent=4)
-        print(f"下載完成: {Save_Path}")
-    else:
-        print(f"下載失敗: {filename}, 狀態碼: {response.status_code}")
-
-# 讀取 students.json
-with open(STUDENTS_JSON, "r", encoding="utf-8") as file:
-    students = json.load(file)
+# 已下載圖片的紀錄 (URL、ETag、Last-Modified、大小、SHA-256)，用於條件式請求與略過未變動的檔案
+MANIFEST_JSON = JSON_DIR / "asset_manifest.json"
 
 # 資料夾名稱
 students_folder = "studentsimage"
 bg_folder = "CollectionBG"
 output_json_path =  JSON_DIR / "id_name_mapping.json"
 
-# 確保資料夾存在
-os.makedirs(students_folder, exist_ok=True)
-os.makedirs(bg_folder, exist_ok=True)
+# 同步結果
+DOWNLOADED, NOT_MODIFIED, SKIPPED, FAILED = "downloaded", "not_modified", "skipped", "failed"
+# 最後一次執行仍失敗的下載 (URL、路徑、錯誤、嘗試次數)
+FAILURE_REPORT_JSON = JSON_DIR / "download_failures.json"
 
-# 下載圖片函數
-def download_image(url, save_path):
+# 下載設定的預設值 (可由命令列參數調整)
+DEFAULT_WORKERS = 16
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_RETRIES = 4
+DEFAULT_BACKOFF = 0.5
+CHUNK_SIZE = 256 * 1024
+WRITE_BUFFER_SIZE = 1024 * 1024
+# 視為暫時性錯誤、會重試的狀態碼
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class RetryableStatus(Exception):
+    """伺服器回應暫時性錯誤的狀態碼"""
+
+
+# 會重試的例外：連線錯誤、逾時、暫時性狀態碼，以及串流中斷 (內容不完整或解壓縮失敗)
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.ContentDecodingError, RetryableStatus)
+
+
+class Downloader:
+    """
+    共用連線池的 requests.Session，所有請求都有逾時設定，
+    連線錯誤、逾時、串流中斷與 RETRY_STATUS 以指數退避 (含隨機抖動) 重試。
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, timeout: tuple = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT),
+                 retries: int = DEFAULT_RETRIES, backoff: float = DEFAULT_BACKOFF):
+        self.workers = workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._retry_count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def retry_count(self) -> int:
+        return self._retry_count
+
+    def call(self, func, *args):
+        """執行 func(*args)，遇到暫時性錯誤時重試，回傳 (結果, 嘗試次數)"""
+        for attempt in range(self.retries + 1):
+            try:
+                return func(*args), attempt + 1
+            except RETRY_ERRORS:
+                if attempt == self.retries:
+                    raise
+                with self._lock:
+                    self._retry_count += 1
+                time.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+
+    def get(self, url: str, headers: dict = None, stream: bool = False) -> requests.Response:
+        response = self.session.get(url, headers=headers, stream=stream, timeout=self.timeout)
+        if response.status_code in RETRY_STATUS:
+            response.close()
+            raise RetryableStatus(f"狀態碼 {response.status_code}")
+        return response
+
+    def fetch_json(self, url: str) -> bytes:
+        """下載 JSON 並確認格式正確，回傳原始內容 (直接存檔，不重新序列化)"""
+        def fetch():
+            response = self.get(url)
+            response.raise_for_status()
+            json.loads(response.content)
+            return response.content
+        return self.call(fetch)[0]
+
+    def close(self):
+        self.session.close()
+
+
+def write_atomic(save_path, chunks) -> tuple[int, str]:
+    """將 chunks 寫入暫存檔後改名，回傳 (位元組數, SHA-256)；失敗時不會留下寫到一半的檔案"""
+    tmp_path = f"{save_path}.tmp"
+    digest = hashlib.sha256()
+    size = 0
     try:
-        response = requests.get(url, stream=True)
-        if response.status_code == 200:
-            with open(save_path, "wb") as file:
-                for chunk in response.iter_content(1024):
-                    file.write(chunk)
-            return save_path
-        else:
-            return f"下載失敗: {url}, 狀態碼: {response.status_code}"
-    except Exception as e:
-        return f"錯誤: {e}"
+        with open(tmp_path, "wb", buffering=WRITE_BUFFER_SIZE) as file:
+            for chunk in chunks:
+                file.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        os.replace(tmp_path, save_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return size, digest.hexdigest()
+
+
+def load_manifest() -> dict:
+    try:
+        with open(MANIFEST_JSON, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
 
-# 生成下載任務
-download_tasks = []
-with ThreadPoolExecutor(max_workers=10) as executor:  # 設置最多 10 個並行下載
-    futures = {}
+def save_manifest(manifest: dict):
+    write_atomic(MANIFEST_JSON, [json.dumps(manifest, ensure_ascii=False).encode("utf-8")])
 
+
+def entry_from_file(save_path, url: str, response) -> dict:
+    """以本地既有的檔案建立紀錄 (伺服器確認未變動時使用)"""
+    digest = hashlib.sha256()
+    with open(save_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    stat = os.stat(save_path)
+    return {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "size": stat.st_size,
+        "sha256": digest.hexdigest(),
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def is_verified(save_path, entry: dict | None, url: str) -> bool:
+    """本地檔案存在，且大小與修改時間和紀錄相同 (檔案未被替換或損毀)"""
+    if not entry or entry.get("url") != url:
+        return False
+    try:
+        stat = os.stat(save_path)
+    except FileNotFoundError:
+        return False
+    return stat.st_size == entry.get("size") and stat.st_mtime_ns == entry.get("mtime_ns")
+
+
+def collect_asset_tasks(students: dict) -> dict:
+    """回傳 {儲存路徑: URL}；多位學生共用同一張 CollectionBG 時只會下載一次"""
+    tasks = {}
     for student_id, student_data in students.items():
         # 學生圖片
-        student_image_url = f"https://schaledb.com/images/student/collection/{student_id}.webp"
-        student_image_path = os.path.join(students_folder, f"{student_id}.webp")
-        futures[executor.submit(download_image, student_image_url, student_image_path)] = student_image_path
-
+        tasks[os.path.join(students_folder, f"{student_id}.webp")] = f"https://schaledb.com/images/student/collection/{student_id}.webp"
         # 背景圖片
         if "CollectionBG" in student_data:
-            bg_image_url = f"https://schaledb.com/images/background/{student_data['CollectionBG']}.jpg"
-            bg_image_path = os.path.join(bg_folder, f"{student_data['CollectionBG']}.jpg")
-            futures[executor.submit(download_image, bg_image_url, bg_image_path)] = bg_image_path
+            tasks[os.path.join(bg_folder, f"{student_data['CollectionBG']}.jpg")] = f"https://schaledb.com/images/background/{student_data['CollectionBG']}.jpg"
+    return tasks
+
+
+def _fetch_image(downloader: Downloader, url, save_path, headers: dict, entry, verified: bool):
+    """單次下載嘗試；串流中斷時拋出例外由 Downloader.call 重試"""
+    with downloader.get(url, headers=headers, stream=True) as response:
+        if response.status_code == 304:
+            return NOT_MODIFIED, entry if verified else entry_from_file(save_path, url, response), None
+        if response.status_code != 200:
+            return FAILED, entry, f"狀態碼 {response.status_code}"
+        size, sha256 = write_atomic(save_path, response.iter_content(CHUNK_SIZE))
+        return DOWNLOADED, {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "size": size,
+            "sha256": sha256,
+            "mtime_ns": os.stat(save_path).st_mtime_ns,
+        }, None
+
+
+# 下載圖片函數
+def download_image(downloader: Downloader, url, save_path, entry=None, skip_verified=False):
+    """
+    下載單一圖片，回傳 (結果, 新的紀錄, 錯誤訊息, 嘗試次數)。
+    已驗證的檔案以 If-None-Match / If-Modified-Since 條件式請求，伺服器回應 304 時不重新下載；
+    skip_verified=True 時已驗證的檔案完全不連線。
+    """
+    verified = is_verified(save_path, entry, url)
+    if verified and skip_verified:
+        return SKIPPED, entry, None, 0
+
+    headers = {}
+    if verified:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    elif os.path.exists(save_path):
+        # 建立紀錄前就已下載的檔案：以檔案修改時間詢問伺服器，未變動時直接沿用
+        headers["If-Modified-Since"] = formatdate(os.path.getmtime(save_path), usegmt=True)
+
+    try:
+        (result, new_entry, message), attempts = downloader.call(_fetch_image, downloader, url, save_path, headers, entry, verified)
+        return result, new_entry, message, attempts
+    except Exception as e:
+        return FAILED, entry, f"{e.__class__.__name__}: {e}", downloader.retries + 1
+
+
+def sync_assets(downloader: Downloader, tasks: dict, manifest: dict, skip_verified: bool = False) -> dict:
+    """下載 tasks 中的圖片並更新 manifest，回傳各結果的數量、傳輸量與失敗清單"""
+    report = {DOWNLOADED: 0, NOT_MODIFIED: 0, SKIPPED: 0, FAILED: 0, "bytes_downloaded": 0, "bytes_saved": 0, "failures": []}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=downloader.workers) as executor:
+        futures = {
+            executor.submit(download_image, downloader, url, save_path, manifest.get(save_path), skip_verified): save_path
+            for save_path, url in tasks.items()
+        }
+        # 進度條顯示
+        for future in tqdm(as_completed(futures), total=len(futures), desc="下載中"):
+            save_path = futures[future]
+            result, entry, message, attempts = future.result()
+            report[result] += 1
+            if result == DOWNLOADED:
+                report["bytes_downloaded"] += entry["size"]
+            elif result in (NOT_MODIFIED, SKIPPED):
+                report["bytes_saved"] += entry["size"]
+            if entry is not None:
+                manifest[save_path] = entry
+            if result == FAILED:
+                report["failures"].append({"url": tasks[save_path], "path": save_path, "error": message, "attempts": attempts})
+    report["seconds"] = time.perf_counter() - started
+    report["retries"] = downloader.retry_count
+    return report
+
+
+def download_json_files(downloader: Downloader) -> list:
+    """下載並保存 JSON 文件，回傳失敗清單"""
+    JSON_DIR.mkdir(exist_ok=True)
+    failures = []
+    for filename, url in urls.items():
+        Save_Path = JSON_DIR / filename
+        try:
+            data = downloader.fetch_json(url)
+        except Exception as e:
+            failures.append({"url": url, "path": str(Save_Path), "error": f"{e.__class__.__name__}: {e}", "attempts": downloader.retries + 1})
+            print(f"下載失敗: {filename}, {e}")
+            continue
+        write_atomic(Save_Path, [data])
+        print(f"下載完成: {Save_Path}")
+    return failures
+
+
+def preprocess_jobs(tasks: dict, force: bool = False) -> list:
+    """
+    列出需要 (重新) 產生繪圖用素材的圖片：[(處理函式, 原圖, 輸出路徑)]。
+    輸出已存在且比原圖新時略過。
+    """
+    jobs = []
+    for save_path in tasks:
+        source = Path(save_path)
+        if not source.exists():
+            continue
+        if source.parent.name == students_folder:
+            func, target = ImageFactory.prepare_portrait, ImageFactory.render_portrait_path(source.stem)
+        else:
+            func, target = ImageFactory.prepare_background, ImageFactory.render_background_path(source.stem)
+        if not force and target.exists() and target.stat().st_mtime >= source.stat().st_mtime:
+            continue
+        jobs.append((func, str(source), str(target)))
+    return jobs
+
+
+def preprocess_assets(tasks: dict, workers: int | None = None, force: bool = False) -> tuple[int, list]:
+    """以多個行程平行產生模糊背景與角色卡圖片，回傳 (產生數量, 失敗清單)"""
+    jobs = preprocess_jobs(tasks, force)
+    if not jobs:
+        return 0, []
+    done, failures = 0, []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(func, source, target): source for func, source, target in jobs}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="預先處理圖片"):
+            try:
+                future.result()
+                done += 1
+            except Exception as e:
+                failures.append({"url": None, "path": futures[future], "error": f"預先處理失敗 {e.__class__.__name__}: {e}", "attempts": 1})
+    return done, failures
+
+
+def write_failure_report(failures: list):
+    """寫出失敗清單 (沒有失敗時刪除舊的報告)"""
+    if not failures:
+        if FAILURE_REPORT_JSON.exists():
+            FAILURE_REPORT_JSON.unlink()
+        return
+    write_atomic(FAILURE_REPORT_JSON, [json.dumps(failures, ensure_ascii=False, indent=2).encode("utf-8")])
+    print(f"⚠ {len(failures)} 個檔案下載失敗，詳見 {FAILURE_REPORT_JSON}：")
+    for failure in failures[:20]:
+        print(f"  {failure['path']} ({failure['attempts']} 次): {failure['error']}")
+    if len(failures) > 20:
+        print(f"  ...其餘 {len(failures) - 20} 個")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="下載 SchaleDB 學生資料與圖片")
+    parser.add_argument("--skip-verified", action="store_true",
+                        help="本地已驗證的圖片不再向伺服器確認是否更新")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="同時下載的數量")
+    parser.add_argument("--connect-timeout", type=float, default=DEFAULT_CONNECT_TIMEOUT, help="連線逾時 (秒)")
+    parser.add_argument("--read-timeout", type=float, default=DEFAULT_READ_TIMEOUT, help="讀取逾時 (秒)")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="暫時性錯誤的重試次數")
+    parser.add_argument("--backoff", type=float, default=DEFAULT_BACKOFF, help="重試等待的基準秒數 (每次加倍)")
+    parser.add_argument("--preprocess-workers", type=int, default=None, help="預先處理圖片的行程數 (預設為 CPU 核心數)")
+    parser.add_argument("--force-preprocess", action="store_true", help="重新產生所有繪圖用素材")
+    args = parser.parse_args()
+
+    downloader = Downloader(args.workers, (args.connect_timeout, args.read_timeout), args.retries, args.backoff)
+    try:
+        failures = download_json_files(downloader)
+
+        # 讀取 students.json
+        with open(STUDENTS_JSON, "r", encoding="utf-8") as file:
+            students = json.load(file)
+
+        # 確保資料夾存在
+        os.makedirs(students_folder, exist_ok=True)
+        os.makedirs(bg_folder, exist_ok=True)
+
+        tasks = collect_asset_tasks(students)
+        manifest = load_manifest()
+        report = sync_assets(downloader, tasks, manifest, skip_verified=args.skip_verified)
+        save_manifest(manifest)
+    finally:
+        downloader.close()
+
+    print(f"所有圖片下載完成 ({report['seconds']:.1f} 秒，重試 {report['retries']} 次)：下載 {report[DOWNLOADED]} 個 ({report['bytes_downloaded'] / 1024 / 1024:.1f} MB)，"
+          f"未變動 {report[NOT_MODIFIED] + report[SKIPPED]} 個 (節省 {report['bytes_saved'] / 1024 / 1024:.1f} MB)，"
+          f"失敗 {report[FAILED]} 個。")
+
+    started = time.perf_counter()
+    prepared, preprocess_failures = preprocess_assets(tasks, args.preprocess_workers, args.force_preprocess)
+    print(f"已產生 {prepared} 個繪圖用素材 ({time.perf_counter() - started:.1f} 秒)。")
+    write_failure_report(failures + report["failures"] + preprocess_failures)
 
-    # 進度條顯示
-    for future in tqdm(as_completed(futures), total=len(futures), desc="下載中"):
-        result = future.result()
-        if isinstance(result, str) and "失敗" in result:
-            print(result)
+    id_name_mapping = {str(student.id): student.name for student in StudentModel.parse_students(students)}
+    write_atomic(output_json_path, [json.dumps(id_name_mapping, ensure_ascii=False, indent=4).encode("utf-8")])
+    print(f"已成功生成 {output_json_path}")
 
-print("所有圖片下載完成。")
+    # Bot 只讀取精簡的學生資料 (於圖片處理完成後才更新，避免 Bot 先看到新學生卻沒有圖片)
+    write_atomic(StudentModel.STUDENTS_COMPACT_JSON, [StudentModel.dump_compact(students)])
+    print(f"已成功生成 {StudentModel.STUDENTS_COMPACT_JSON}")
 
 
-id_name_mapping = {str(student["Id"]): student["Name"] for student in students.values()}
-with open(output_json_path, "w", encoding="utf-8") as file:
-    json.dump(id_name_mapping, file, ensure_ascii=False, indent=4)
-print(f"已成功生成 {output_json_path}")
\ No newline at end of file
+if __name__ == "__main__":
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    if sys.stderr.encoding != 'utf-8':
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+    main()
@@ -0,0 +1,36 @@
+# GatewayConfig.py
+"""
+Discord gateway 的 intents 與快取設定。
+
+Bot 只使用斜線指令 (interaction 本身帶有使用者、成員權限與頻道資料)，不處理訊息內容、成員或上線狀態事件，
+因此預設以最少的 intents 連線，並關閉成員與訊息快取：
+
+  - minimal  只訂閱 guilds (伺服器與頻道快取，interaction.guild / channel 需要)；不快取成員與訊息，不在啟動時 chunk 成員
+  - all      與原本相同的 discord.Intents.all() 與 discord.py 預設快取 (需在開發者後台開啟特權 intents)
+
+模式由環境變數 BOT_INTENTS 指定 (預設 minimal)，兩種模式的記憶體比較見 benchmarks/gateway_memory.py。
+"""
+import os
+import discord
+from discord.ext import commands
+
+BOT_INTENTS = os.environ.get("BOT_INTENTS", "minimal").lower()
+MODES = ("minimal", "all")
+
+
+def client_options(mode: str = BOT_INTENTS) -> dict:
+    """建立 Bot 時使用的 intents 與快取參數"""
+    if mode not in MODES:
+        raise ValueError(f"未知的 BOT_INTENTS 模式: {mode} (可用: {', '.join(MODES)})")
+    if mode == "all":
+        return {"command_prefix": "!", "intents": discord.Intents.all()}
+    intents = discord.Intents.none()
+    intents.guilds = True
+    return {
+        # 沒有文字指令；使用 when_mentioned 避免缺少 message_content intent 的警告
+        "command_prefix": commands.when_mentioned,
+        "intents": intents,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        "max_messages": None,
+        "chunk_guilds_at_startup": False,
+    }
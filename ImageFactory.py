@@ -1,72 +1,174 @@
 import io
+import logging
 from pathlib import Path
+import threading
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
+from StudentModel import Student
+
+logger = logging.getLogger(__name__)
 
 class BlueArchiveData:
     DataBaseURL = "https://schaledb.com/"
     ImageFilePath = "iconimages/"
 
+# 背景與角色卡的尺寸 (預先處理的素材與繪圖共用)
+BACKGROUND_SIZE = (2800, 1400)
+BACKGROUND_BLUR_RADIUS = 40
+CARD_SIZE = (400, 452)
+# DownloadSchaleDBData 下載後預先處理的素材：模糊並縮放好的背景、縮放好的 RGBA 角色圖
+RENDER_BACKGROUND_DIR = Path("CollectionBG") / "render"
+RENDER_PORTRAIT_DIR = Path("studentsimage") / "card"
+
+
+def render_background_path(collection_bg: str) -> Path:
+    return RENDER_BACKGROUND_DIR / f"{collection_bg}.jpg"
+
+
+def render_portrait_path(student_id) -> Path:
+    return RENDER_PORTRAIT_DIR / f"{student_id}.png"
+
+
+def prepare_background(source, target):
+    """將背景縮放為 BACKGROUND_SIZE 並套用模糊後存檔 (與繪圖時的處理相同)"""
+    image = Image.open(source).resize(BACKGROUND_SIZE).filter(ImageFilter.GaussianBlur(BACKGROUND_BLUR_RADIUS))
+    _save_atomic(image, target, format="JPEG", quality=95)
+
+
+def prepare_portrait(source, target):
+    """將角色圖縮放為 CARD_SIZE 的 RGBA 後存檔"""
+    image = Image.open(source).resize(CARD_SIZE).convert("RGBA")
+    _save_atomic(image, target, format="PNG")
+
+
+def _save_atomic(image: Image.Image, target, **params):
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(target.name + ".tmp")
+    image.save(tmp_path, **params)
+    tmp_path.replace(target)
+
+
+def load_background(collection_bg: str) -> Image.Image:
+    """讀取背景；有預先處理的版本時直接使用，否則即時縮放與模糊"""
+    prepared = render_background_path(collection_bg)
+    if prepared.exists():
+        return Image.open(prepared).convert("RGB")
+    return Image.open(f"CollectionBG/{collection_bg}.jpg").resize(BACKGROUND_SIZE).filter(ImageFilter.GaussianBlur(BACKGROUND_BLUR_RADIUS))
+
+
+def load_portrait(student_id) -> Image.Image:
+    """讀取角色圖；有預先處理的版本時直接使用，否則即時縮放"""
+    prepared = render_portrait_path(student_id)
+    if prepared.exists():
+        return Image.open(prepared).convert("RGBA")
+    return Image.open(f"studentsimage/{student_id}.webp").resize(CARD_SIZE).convert("RGBA")
+
+
+# 繪圖時使用的固定圖示：名稱 -> (檔名, 尺寸)
+ICON_SPECS = {
+    "star_yellow": ("Common_Yellow_Star_Icon.png", (30, 30)),
+    "star_blue": ("Common_Blue_Star_Icon.png", (30, 30)),
+    "arrow": ("arrow_down.png", (30, 30)),
+    "borrow": ("common_icon_asist.png", (30, 30)),
+    "type_attack": ("Type_Attack.png", (50, 50)),
+    "type_defense": ("Type_Defense.png", (50, 50)),
+    **{f"terrain_{name}": (f"Terrain_{name}.png", (65, 65)) for name in ("Street", "Outdoor", "Indoor")},
+}
+ADAPTATION_ICON_SIZE = (60, 60)
+FONT_FILE = Path(__file__).parent / "Font" / "msjhbd.ttc"  # 微軟正黑體
+FONT_SIZE = 42
+
+# FreeTypeFont 內部的 FreeType face 不是執行緒安全的，每個繪圖執行緒各自開啟一份
+_thread_fonts = threading.local()
+
+
+def get_font() -> ImageFont.FreeTypeFont:
+    """目前執行緒專用的字型 (第一次使用時開啟，之後重複使用)"""
+    font = getattr(_thread_fonts, "font", None)
+    if font is None:
+        font = _thread_fonts.font = ImageFont.truetype(FONT_FILE, FONT_SIZE)
+    return font
+
+
+def load_assets() -> dict:
+    """
+    載入並縮放繪圖用的圖示，回傳 {"icons": {名稱: Image}}。
+    結果為唯讀，可在多次繪圖 (含不同執行緒) 間共用；由 DataStore 於載入資料時一併建立。
+    字型不放在共用的素材中，繪圖時以 get_font() 取得各執行緒自己的字型。
+    """
+    icon_dir = Path(BlueArchiveData.ImageFilePath)
+    icons = {
+        name: Image.open(icon_dir / file_name).resize(size).convert("RGBA")
+        for name, (file_name, size) in ICON_SPECS.items()
+    }
+    for path in icon_dir.glob("Adaptresult*.png"):
+        icons[path.stem] = Image.open(path).resize(ADAPTATION_ICON_SIZE).convert("RGBA")
+    # 先確認字型可以開啟 (缺少字型時與圖示相同，於載入資料時就得到錯誤訊息)
+    get_font()
+    return {"icons": icons}
+
+
 class ImageFactory:
     @staticmethod
-    def StudentUsageImageGenerator(student_info,student_usage_array:list) -> io.BytesIO:
-        #預先載入icon相關圖片
-        print("✅開始繪製角色使用狀態圖",flush=True)
-        print("載入icon中...",flush=True)
-
-        StarImg1 = Image.open(f"{BlueArchiveData.ImageFilePath}Common_Yellow_Star_Icon.png").resize((30,30)).convert("RGBA")
-        StarImg2 = Image.open(f"{BlueArchiveData.ImageFilePath}Common_Blue_Star_Icon.png").resize((30,30)).convert("RGBA")
-        arrow_img = Image.open(f"{BlueArchiveData.ImageFilePath}arrow_down.png").resize((30,30)).convert("RGBA")
-        student_borrow_img = Image.open(f"{BlueArchiveData.ImageFilePath}common_icon_asist.png").resize((30,30)).convert("RGBA")
-        type_attack_img = Image.open(f"{BlueArchiveData.ImageFilePath}Type_Attack.png").resize((50,50)).convert("RGBA")
-        type_defense_img = Image.open(f"{BlueArchiveData.ImageFilePath}Type_Defense.png").resize((50,50)).convert("RGBA")
-
-        attack_color = ImageFactory.StudentAttackTypeColorMatch(student_info["BulletType"])
-        defense_color = ImageFactory.StudentDefenseTypeColorMatch(student_info["ArmorType"])
-        base_image_size = [2800,1400]
+    def StudentUsageImageGenerator(student_info:Student,student_usage_array:list,assets:dict=None) -> io.BytesIO:
+        #預先載入icon相關圖片 (未傳入時才從檔案讀取)
+        logger.debug("✅開始繪製角色使用狀態圖")
+        if assets is None:
+            logger.debug("載入icon中...")
+            assets = load_assets()
+        icons = assets["icons"]
+
+        StarImg1 = icons["star_yellow"]
+        StarImg2 = icons["star_blue"]
+        arrow_img = icons["arrow"]
+        student_borrow_img = icons["borrow"]
+        type_attack_img = icons["type_attack"]
+        type_defense_img = icons["type_defense"]
+
+        attack_color = ImageFactory.StudentAttackTypeColorMatch(student_info.bullet_type)
+        defense_color = ImageFactory.StudentDefenseTypeColorMatch(student_info.armor_type)
+        base_image_size = BACKGROUND_SIZE
         #以學生學園圖為背景
-        print("正在繪製背景與角色圖...",flush=True)
+        logger.debug("正在繪製背景與角色圖...")
 
-        BaseImage:Image.Image = (Image.open(f"CollectionBG/{student_info['CollectionBG']}.jpg")).resize((base_image_size[0],base_image_size[1]))
-        BaseImage = BaseImage.filter(ImageFilter.GaussianBlur(40))
+        BaseImage:Image.Image = load_background(student_info.collection_bg)
         BaseImageDraw = ImageDraw.Draw(BaseImage,"RGBA")
 
-        CardSizeX, CardSizeY = (400,452)
+        CardSizeX, CardSizeY = CARD_SIZE
         CardLeftX = 100
         CardUpY = int((base_image_size[1]/2)-475)
         CardRightX,CardDownY = CardLeftX+CardSizeX,CardUpY+CardSizeY
 
         #分配角色圖底色與陰影
-        CharacterColor = ImageFactory.CharacterRarityColorMatch(student_info["StarGrade"])
+        CharacterColor = ImageFactory.CharacterRarityColorMatch(student_info.star_grade)
         ImageFactory.CharacterCardGenerator(BaseImageDraw,[CardLeftX,CardUpY,CardRightX,CardDownY],CharacterColor,ImageGap=(15,24))
 
         #繪製角色本體
-        CharacterImage = Image.open(f"studentsimage/{student_info['Id']}.webp").resize((CardSizeX,CardSizeY)).convert("RGBA")
+        CharacterImage = load_portrait(student_info.id)
         BaseImage.paste(CharacterImage,(CardLeftX,CardUpY),CharacterImage)
 
         #角色卡名稱
-        print("將角色名稱寫上角色圖上...",flush=True)
-        CharacterName = (student_info["Name"])
+        logger.debug("將角色名稱寫上角色圖上...")
+        CharacterName = student_info.name
         NamePreProcessList = {"（":"(","）":")"}
         for key, value in NamePreProcessList.items():
             CharacterName = CharacterName.replace(key,value)
         
-        Font = Path(__file__).parent / "Font"
-        
-        font = ImageFont.truetype(Font/"msjhbd.ttc", 42) #微軟正黑體
+        font = get_font()
         #font_title = ImageFont.truetype("msjhbd.ttc", 40) #微軟正黑體
 
         BaseImageDraw.rounded_rectangle([CardLeftX,CardDownY-80+5,CardRightX,CardDownY],1,(0,0,0,150))
         BaseImageDraw.text((CardLeftX+CardSizeX/2,CardDownY-24), CharacterName ,font=font,fill=(255,255,255,255),anchor="ms")
 
         #繪製場地適應性
-        print("正在繪製場地適應性與攻防屬性...",flush=True)
+        logger.debug("正在繪製場地適應性與攻防屬性...")
         adaptation_type_list = ["Street","Outdoor","Indoor"]
-        street_battle_adaptation = student_info["StreetBattleAdaptation"]
-        outdoor_battle_adaptation = student_info["OutdoorBattleAdaptation"]
-        indoor_battle_adaptation = student_info["IndoorBattleAdaptation"]
+        street_battle_adaptation = student_info.street_adaptation
+        outdoor_battle_adaptation = student_info.outdoor_adaptation
+        indoor_battle_adaptation = student_info.indoor_adaptation
         adaptation_value_list = [street_battle_adaptation,outdoor_battle_adaptation,indoor_battle_adaptation]
-        weapon_adaptation_type = student_info["Weapon"]["AdaptationType"]
-        WeaponAdaptationValue = student_info["Weapon"]["AdaptationValue"]
+        weapon_adaptation_type = student_info.weapon_adaptation_type
+        WeaponAdaptationValue = student_info.weapon_adaptation_value
         terrain_position = (CardLeftX+50,CardDownY+275)
 
         terrain_position_offset_x = 120
@@ -80,18 +182,18 @@ class ImageFactory:
             terrain_position_dynamic_offset_y = terrain_position_offset_y
             terrain_name = adaptation_type_list[terrain_index]
             terrain_value = adaptation_value_list[terrain_index]
-            terrain_type_img = Image.open(f"{BlueArchiveData.ImageFilePath}Terrain_{terrain_name}.png").resize((65,65)).convert("RGBA")
+            terrain_type_img = icons[f"terrain_{terrain_name}"]
             ImageFactory.ColoredCircleDrawer(BaseImageDraw,terrain_type_img.size,(terrain_position[0]+terrain_position_dynamic_offset_x,terrain_position[1]),(0,0,0,150),15)
             BaseImage.paste(terrain_type_img,(terrain_position[0]+terrain_position_dynamic_offset_x,terrain_position[1]),terrain_type_img)
             
-            terrain_adaptation_img = Image.open(f"{BlueArchiveData.ImageFilePath}Adaptresult{terrain_value}.png").resize((60,60)).convert("RGBA")
+            terrain_adaptation_img = icons[f"Adaptresult{terrain_value}"]
             BaseImage.paste(terrain_adaptation_img,(terrain_position[0]+terrain_position_dynamic_offset_x,terrain_position[1]+terrain_position_dynamic_offset_y),terrain_adaptation_img)
 
             if weapon_adaptation_type != terrain_name:
                 continue
             
             terrain_value += WeaponAdaptationValue
-            terrain_adaptation_img = Image.open(f"{BlueArchiveData.ImageFilePath}Adaptresult{terrain_value}.png").resize((60,60)).convert("RGBA")
+            terrain_adaptation_img = icons[f"Adaptresult{terrain_value}"]
             BaseImage.paste(terrain_adaptation_img,(terrain_position[0]+terrain_position_dynamic_offset_x,terrain_position[1]+terrain_position_dynamic_offset_y*2),terrain_adaptation_img)
 
         #繪製防禦與攻擊屬性
@@ -104,7 +206,7 @@ class ImageFactory:
         BaseImage.paste(type_defense_img,defense_img_position,type_defense_img)
 
         #繪製名次資訊
-        print("繪製名次與星數等UI資訊...",flush=True)
+        logger.debug("繪製名次與星數等UI資訊...")
         data_position_array_x = [750,1050,1300,1550,1800,2050,2300,2550]
         data_position_array_y = [500,700,900,1100]
         rank_list = [1000,5000,10000,20000]
@@ -133,7 +235,7 @@ class ImageFactory:
         for array_second_index in range(0,4):
             BaseImageDraw.text((data_position_array_x[0]-80,data_position_array_y[array_second_index]+25), ui_text_list_2[array_second_index] ,font=font,fill=(0,0,0,255),anchor="ls")
         #繪製數據
-        print("將角色使用數據繪製至圖片上...",flush=True)
+        logger.debug("將角色使用數據繪製至圖片上...")
         for student_usage_array_first_index in range(0,4):
             for student_usage_array_second_index in range(1,8):
                 usage_data = student_usage_array[student_usage_array_first_index][student_usage_array_second_index-1]
@@ -146,7 +248,7 @@ class ImageFactory:
                     usage_data_text = f"{usage_data}位"
                 BaseImageDraw.text((data_position_array_x[student_usage_array_second_index],data_position_array_y[student_usage_array_first_index]), usage_data_text ,font=font,fill=(0,0,0,255),anchor="ms")
         
-        print("✅已繪製完成角色使用狀態圖，準備輸出",flush=True)
+        logger.debug("✅已繪製完成角色使用狀態圖，準備輸出")
         #儲存圖片並輸出
         base_image_bytes = io.BytesIO()
         BaseImage.save(base_image_bytes, format="PNG")
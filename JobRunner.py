@@ -0,0 +1,197 @@
+# JobRunner.py
+"""
+在背景以子行程執行管理用腳本 (arona_ai_helper.py、DownloadSchaleDBData.py 等)。
+
+  - 以 asyncio.create_subprocess_exec 執行，不會阻塞 Bot 的事件迴圈
+  - 分段讀取輸出 (以 \n 或 \r 分行，tqdm 進度列也能即時取得)，保留最後 OUTPUT_LINES 行，供進度回報與 /jobs 查詢
+  - 可隨時取消 (先 terminate，逾時後 kill)
+  - 完成時依序呼叫 on_finish 回呼，由呼叫端決定成功後是否熱重載
+"""
+from collections import OrderedDict, deque
+from datetime import datetime
+from pathlib import Path
+import asyncio
+import codecs
+import itertools
+import logging
+import os
+import re
+import sys
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+# 每個工作保留的輸出行數
+OUTPUT_LINES = 200
+# 保留的已結束工作數量
+HISTORY_SIZE = 20
+# 取消時等待子行程自行結束的秒數，逾時後強制結束
+TERMINATE_TIMEOUT = 10
+# 每次讀取輸出的大小；沒有換行的輸出超過 MAX_LINE_CHARS 時直接視為一行
+READ_SIZE = 4096
+MAX_LINE_CHARS = 4096
+LINE_BREAK = re.compile(r"\r\n|\r|\n")
+
+PENDING, RUNNING, SUCCEEDED, FAILED, CANCELLED = "pending", "running", "succeeded", "failed", "cancelled"
+STATUS_EMOJI = {PENDING: "⏳", RUNNING: "🔄", SUCCEEDED: "✅", FAILED: "❌", CANCELLED: "🛑"}
+
+
+class Job:
+    """一次腳本執行的狀態與輸出"""
+
+    def __init__(self, job_id: int, script: str, args: tuple):
+        self.id = job_id
+        self.script = script
+        self.args = args
+        self.status = PENDING
+        self.returncode = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.output = deque(maxlen=OUTPUT_LINES)
+        self.line_count = 0
+        self.process = None
+        self.task = None
+        self.done = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        # 以子行程實際結束為準 (取消中的工作在結束前仍視為執行中)
+        return self.done.is_set()
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return ((self.finished_at or datetime.now()) - self.started_at).total_seconds()
+
+    def tail(self, lines: int = 15, max_chars: int = 1800) -> str:
+        """輸出的最後幾行 (限制長度以符合 Discord 訊息上限)"""
+        text = "\n".join(list(self.output)[-lines:])
+        return text[-max_chars:]
+
+    def describe(self) -> str:
+        return f"{STATUS_EMOJI[self.status]} #{self.id} `{self.script}` {self.status} ({self.elapsed:.0f} 秒)"
+
+
+class JobRunner:
+    """管理背景腳本工作；同一個腳本同時只會執行一次"""
+
+    def __init__(self, base_dir: Path = BASE_DIR):
+        self.base_dir = base_dir
+        self.jobs = OrderedDict()  # id -> Job
+        self._ids = itertools.count(1)
+
+    def running(self, script: str) -> Job | None:
+        return next((job for job in self.jobs.values() if job.script == script and not job.finished), None)
+
+    def get(self, job_id: int) -> Job | None:
+        return self.jobs.get(job_id)
+
+    def list(self) -> list:
+        return list(reversed(self.jobs.values()))
+
+    def start(self, script: str, *args: str, on_finish=None) -> Job:
+        """
+        開始執行 `script` (相對於 repo 根目錄)，回傳 Job。
+        on_finish(job) 為 async 回呼，於子行程結束後呼叫。腳本已在執行時拋出 RuntimeError。
+        """
+        if not (self.base_dir / script).exists():
+            raise FileNotFoundError(f"找不到 `{script}`")
+        if self.running(script):
+            raise RuntimeError(f"`{script}` 已在執行中")
+
+        job = Job(next(self._ids), script, args)
+        self.jobs[job.id] = job
+        self._trim_history()
+        job.task = asyncio.create_task(self._run(job, on_finish), name=f"job-{job.id}-{script}")
+        return job
+
+    async def wait(self, job: Job) -> Job:
+        await job.done.wait()
+        return job
+
+    async def cancel(self, job_id: int) -> bool:
+        """取消執行中的工作，回傳是否有取消"""
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.status = CANCELLED
+        if job.process is not None and job.process.returncode is None:
+            job.process.terminate()
+            try:
+                await asyncio.wait_for(job.process.wait(), TERMINATE_TIMEOUT)
+            except asyncio.TimeoutError:
+                job.process.kill()
+        return True
+
+    async def _run(self, job: Job, on_finish):
+        env = dict(os.environ, PYTHONIOENCODING="utf-8", PYTHONUNBUFFERED="1")
+        try:
+            job.process = await asyncio.create_subprocess_exec(
+                sys.executable, str(self.base_dir / job.script), *job.args,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+                cwd=self.base_dir, env=env,
+            )
+            job.started_at = datetime.now()
+            if job.status == CANCELLED:
+                job.process.terminate()  # 在子行程啟動前就被取消
+            else:
+                job.status = RUNNING
+            logger.info("🔄 開始執行工作 #%s: %s", job.id, job.script)
+
+            await self._read_output(job)
+            job.returncode = await job.process.wait()
+            if job.status != CANCELLED:
+                job.status = SUCCEEDED if job.returncode == 0 else FAILED
+        except Exception as e:
+            job.output.append(f"❌ 無法執行腳本: {e}")
+            if job.status != CANCELLED:
+                job.status = FAILED
+        finally:
+            job.finished_at = job.finished_at or datetime.now()
+            if job.started_at is None:
+                job.started_at = job.finished_at
+            logger.info("%s 工作 #%s (%s) 結束，結束碼 %s，耗時 %.0f 秒",
+                        STATUS_EMOJI[job.status], job.id, job.script, job.returncode, job.elapsed)
+            job.done.set()
+
+        if on_finish is not None:
+            try:
+                await on_finish(job)
+            except Exception as e:
+                logger.error("工作 #%s 的完成回呼發生錯誤: %s", job.id, e)
+
+    async def _read_output(self, job: Job):
+        """讀取輸出直到 EOF；不使用 readline，避免沒有換行的長輸出 (進度列) 超過 StreamReader 的行長上限"""
+        pending = ""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            chunk = await job.process.stdout.read(READ_SIZE)
+            pending += decoder.decode(chunk, final=not chunk)
+            *lines, pending = LINE_BREAK.split(pending)
+            if len(pending) > MAX_LINE_CHARS:
+                lines.append(pending)
+                pending = ""
+            for line in lines:
+                self._append_line(job, line)
+            if not chunk:
+                break
+        if pending:
+            self._append_line(job, pending)
+
+    @staticmethod
+    def _append_line(job: Job, line: str):
+        line = line.rstrip()
+        if line:
+            job.output.append(line)
+            job.line_count += 1
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(self.jobs) - HISTORY_SIZE)]:
+            del self.jobs[job_id]
+
+
+# 全域共用的工作管理
+runner = JobRunner()
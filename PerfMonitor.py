@@ -0,0 +1,167 @@
+# PerfMonitor.py
+"""
+斜線指令的延遲統計。
+
+  - InstrumentedCommandTree 在每個指令開始時記錄時間，完成 (on_app_command_completion) 或
+    出錯 (on_error) 時記錄整體耗時 (stage="total") 與 Discord 送達延遲 (stage="queue")
+  - 指令內以 mark(interaction, "data") 等方式標記階段，記錄與上一個標記之間的耗時
+    (慣例：defer -> data -> render -> send)
+  - 選單/按鈕等元件的 callback 不經過 CommandTree，需自行呼叫 start(interaction, "名稱") 與 finish
+  - 各 (指令, 階段) 的耗時累積在固定區間的直方圖中，可輸出為 Prometheus 文字格式
+"""
+from collections import deque
+from datetime import datetime, timezone
+import bisect
+import logging
+import os
+import threading
+import time
+import discord
+from discord import app_commands
+
+logger = logging.getLogger(__name__)
+
+# 直方圖區間上限 (秒)
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+# 每個直方圖保留最近幾筆原始數據，用於計算 p50/p95
+RECENT_SAMPLES = 512
+METRIC_NAME = "arona_command_duration_seconds"
+
+
+class Histogram:
+    """固定區間的累積直方圖，另保留最近的原始數據以計算百分位"""
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(BUCKETS) + 1)  # 最後一格為 +Inf
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds: float):
+        self.bucket_counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def percentile(self, percent: float) -> float:
+        if not self.recent:
+            return 0.0
+        samples = sorted(self.recent)
+        index = min(len(samples) - 1, int(round(percent / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+class PerfRegistry:
+    """所有 (指令, 階段) 的直方圖與錯誤次數"""
+
+    def __init__(self):
+        self._histograms = {}  # (command, stage) -> Histogram
+        self._errors = {}  # command -> 次數
+        self._lock = threading.Lock()
+
+    def observe(self, command: str, stage: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get((command, stage))
+            if histogram is None:
+                histogram = self._histograms[(command, stage)] = Histogram()
+            histogram.observe(max(0.0, seconds))
+
+    def record_error(self, command: str):
+        with self._lock:
+            self._errors[command] = self._errors.get(command, 0) + 1
+
+    def summary(self) -> list:
+        """回傳 [(command, stage, count, avg, p50, p95)]，依指令與階段排序"""
+        with self._lock:
+            return [
+                (command, stage, h.count, h.total / h.count, h.percentile(50), h.percentile(95))
+                for (command, stage), h in sorted(self._histograms.items())
+            ]
+
+    def errors(self) -> dict:
+        with self._lock:
+            return dict(self._errors)
+
+    def render_prometheus(self) -> str:
+        """輸出 Prometheus text exposition format"""
+        lines = [
+            f"# HELP {METRIC_NAME} Slash command latency by command and stage.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        with self._lock:
+            for (command, stage), h in sorted(self._histograms.items()):
+                labels = f'command="{_escape(command)}",stage="{_escape(stage)}"'
+                cumulative = 0
+                for upper, bucket_count in zip([*BUCKETS, "+Inf"], h.bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f'{METRIC_NAME}_bucket{{{labels},le="{upper}"}} {cumulative}')
+                lines.append(f"{METRIC_NAME}_sum{{{labels}}} {h.total:.6f}")
+                lines.append(f"{METRIC_NAME}_count{{{labels}}} {h.count}")
+            lines.append("# HELP arona_command_errors_total Slash commands that raised an error.")
+            lines.append("# TYPE arona_command_errors_total counter")
+            for command, count in sorted(self._errors.items()):
+                lines.append(f'arona_command_errors_total{{command="{_escape(command)}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """以暫存檔 + 改名的方式寫出 Prometheus 文字檔 (供 node_exporter textfile collector 讀取)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# 全域共用的統計
+registry = PerfRegistry()
+
+
+def _command_name(interaction: discord.Interaction) -> str:
+    command = interaction.command
+    return command.qualified_name if command is not None else "unknown"
+
+
+def start(interaction: discord.Interaction, name: str = None):
+    """開始計時；未指定名稱時使用斜線指令名稱"""
+    now = time.perf_counter()
+    command = name or _command_name(interaction)
+    interaction.extras["perf"] = {"command": command, "start": now, "last": now}
+    # 使用者按下指令到 Bot 收到互動的延遲 (以 snowflake 時間計算，時鐘誤差會被截為 0)
+    queued = (datetime.now(timezone.utc) - interaction.created_at).total_seconds()
+    registry.observe(command, "queue", queued)
+
+
+def mark(interaction: discord.Interaction, stage: str):
+    """記錄從上一個標記 (或指令開始) 到現在的耗時為 `stage` 階段"""
+    perf = interaction.extras.get("perf")
+    if perf is None:
+        return
+    now = time.perf_counter()
+    registry.observe(perf["command"], stage, now - perf["last"])
+    perf["last"] = now
+
+
+def finish(interaction: discord.Interaction, failed: bool = False):
+    """記錄整體耗時；同一個互動只記錄一次"""
+    perf = interaction.extras.pop("perf", None)
+    if perf is None:
+        return
+    registry.observe(perf["command"], "total", time.perf_counter() - perf["start"])
+    if failed:
+        registry.record_error(perf["command"])
+
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    """為所有斜線指令自動計時的 CommandTree (指令完成時由 on_app_command_completion 呼叫 finish)"""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.type is discord.InteractionType.application_command:
+            start(interaction)
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        finish(interaction, failed=True)
+        await super().on_error(interaction, error)
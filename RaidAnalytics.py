@@ -0,0 +1,156 @@
+# RaidAnalytics.py
+"""
+台服總力戰/大決戰賽季資料表 (S<season>_<boss>) 的統計分析：
+  - 分數百分位 (前 X% 需要多少分)
+  - 各難度人數分布 (依 AronaRankLine.determine_difficulty_array)
+  - 各難度的用時分布直方圖
+
+分數欄位一次整欄讀出後以 NumPy 向量運算，結果依資料表版本快取。
+NumPy 於第一次分析時才匯入 (Bot 啟動時不需要)。
+"""
+from collections import OrderedDict
+import math
+import sqlite3
+import threading
+from typing import TYPE_CHECKING
+import AronaRankLine as arona
+from RaidDatabase import ARMOR_COLUMNS, ConnectionPool, parse_table_name
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# 預設顯示的百分位 (前 X%)
+DEFAULT_TOP_PERCENTS = [0.1, 1, 5, 10, 25, 50]
+# 用時直方圖的區間寬度 (秒)
+HISTOGRAM_BIN_SECONDS = 30
+# 最多快取幾個資料表的分析結果
+CACHE_SIZE = 16
+
+# 難度由高到低，用於排序與挑選預設直方圖
+DIFFICULTY_ORDER = ['LUNATIC', 'TORMENT', 'INSANE', 'EXTREME', 'HARDCORE', 'VERYHARD', 'HARD', 'NORMAL', '???']
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class TableAnalytics:
+    """單一賽季資料表的分析結果"""
+
+    def __init__(self, table_name: str, total_scores: "np.ndarray", column_stats: dict, time_limit: int):
+        import numpy as np
+        self.table_name = table_name
+        # BestRankingPoint 由高到低排序，用於百分位查詢
+        self.sorted_scores = np.sort(total_scores)[::-1]
+        # {分數欄位: {"difficulties": 難度陣列, "used_times": 用時陣列 (秒，無法計算為 NaN)}}
+        self.column_stats = column_stats
+        self.time_limit = time_limit
+
+    @property
+    def player_count(self) -> int:
+        return int(self.sorted_scores.size)
+
+    def score_at_top_percent(self, percent: float) -> int | None:
+        """前 `percent`% 的最低分數 (即第 ceil(N * percent / 100) 名的分數)"""
+        if self.player_count == 0 or not 0 < percent <= 100:
+            return None
+        rank = max(1, math.ceil(self.player_count * percent / 100))
+        return int(self.sorted_scores[rank - 1])
+
+    def difficulty_counts(self, column: str) -> dict:
+        """{難度: 人數}，依難度由高到低排序"""
+        import numpy as np
+        difficulties = self.column_stats[column]["difficulties"]
+        names, counts = np.unique(difficulties, return_counts=True)
+        result = dict(zip(names.tolist(), counts.tolist()))
+        return {d: result[d] for d in DIFFICULTY_ORDER if d in result}
+
+    def count_cleared_under(self, column: str, difficulty: str, seconds: float) -> int:
+        """`difficulty` 難度中用時小於 `seconds` 秒的人數"""
+        import numpy as np
+        stats = self.column_stats[column]
+        mask = (stats["difficulties"] == difficulty) & (stats["used_times"] < seconds)
+        return int(np.count_nonzero(mask))
+
+    def time_histogram(self, column: str, difficulty: str, bin_seconds: int = HISTOGRAM_BIN_SECONDS) -> list:
+        """回傳 [(區間起點秒數, 區間終點秒數, 人數), ...]"""
+        import numpy as np
+        stats = self.column_stats[column]
+        times = stats["used_times"][stats["difficulties"] == difficulty]
+        times = times[~np.isnan(times)]
+        if times.size == 0:
+            return []
+        upper = max(self.time_limit, int(math.ceil(times.max() / bin_seconds)) * bin_seconds)
+        edges = np.arange(0, upper + bin_seconds, bin_seconds)
+        counts, edges = np.histogram(times, bins=edges)
+        return [(int(edges[i]), int(edges[i + 1]), int(c)) for i, c in enumerate(counts)]
+
+
+def _table_version(conn: sqlite3.Connection, table_name: str) -> tuple:
+    """
+    資料表版本：匯入工具每次匯入 (整表替換) 都會新增一筆 ImportLog，以其 rowid 作為世代編號，
+    同一秒內重新匯入或筆數不變的替換也會得到新版本。
+    沒有匯入紀錄的資料表 (由其他工具寫入，可能原地更新) 以筆數、總分合計與最大 rowid 作為版本。
+    """
+    try:
+        generation = conn.execute("SELECT MAX(rowid) FROM ImportLog WHERE SeasonTable = ?", (table_name,)).fetchone()[0]
+    except sqlite3.OperationalError:
+        generation = None  # 尚未使用匯入工具 (沒有 ImportLog)
+    if generation is not None:
+        return ("import", generation)
+    count, total, max_rowid = conn.execute(
+        f'SELECT COUNT(*), TOTAL("BestRankingPoint"), MAX(rowid) FROM "{table_name}"'
+    ).fetchone()
+    return ("content", count, total, max_rowid)
+
+
+def compute_table_analytics(conn: sqlite3.Connection, table_name: str) -> TableAnalytics:
+    """一次讀出所有分數欄位並計算分析結果"""
+    import numpy as np
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")')]
+    armor_cols = [c for c in ARMOR_COLUMNS if c in columns]
+    # 大決戰以各裝甲分數判斷難度與用時，總力戰則使用總分
+    score_cols = armor_cols or ["BestRankingPoint"]
+    select_cols = ", ".join(f'"{c}"' for c in ["BestRankingPoint", *armor_cols])
+
+    rows = conn.execute(f'SELECT {select_cols} FROM "{table_name}"').fetchall()
+    data = np.array(rows, dtype=np.float64).reshape(len(rows), 1 + len(armor_cols))
+
+    _season_display, _internal_boss_key, _display_boss_name, raid_id = parse_table_name(table_name)
+    time_limit = arona.get_time_limit(raid_id)
+
+    column_stats = {}
+    for index, column in enumerate(score_cols, start=0 if not armor_cols else 1):
+        scores = data[:, index]
+        # 未出戰 (NULL 或 0) 的分數不列入統計
+        scores = scores[~np.isnan(scores) & (scores > 0)]
+        codes = arona.determine_difficulty_array(scores, raid_id)
+        column_stats[column] = {
+            "difficulties": arona.difficulty_names(codes),
+            "used_times": arona.calculate_used_time_array(scores, raid_id, codes),
+        }
+
+    total_scores = data[:, 0]
+    total_scores = total_scores[~np.isnan(total_scores)]
+    return TableAnalytics(table_name, total_scores, column_stats, time_limit)
+
+
+def get_table_analytics(pool: ConnectionPool, table_name: str) -> TableAnalytics:
+    """取得資料表的分析結果；資料表版本未變動時直接使用快取"""
+    with pool.connection() as conn:
+        version = _table_version(conn, table_name)
+        key = (str(pool.db_path), table_name)
+        with _cache_lock:
+            cached = _cache.get(key)
+            if cached and cached[0] == version:
+                _cache.move_to_end(key)
+                return cached[1]
+
+        analytics = compute_table_analytics(conn, table_name)
+
+    with _cache_lock:
+        _cache[key] = (version, analytics)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return analytics
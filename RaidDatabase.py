@@ -0,0 +1,614 @@
+# RaidDatabase.py
+"""
+台服總力戰/大決戰排行榜資料庫 (RaidDatabase.db) 的共用工具：
+  - 資料庫路徑與賽季資料表 (S<season>_<boss>) 的列舉
+  - 排行榜快照 (CSV / JSON / JSON Lines) 的大量匯入
+  - 跨賽季的玩家歷史索引 (PlayerHistory)
+  - 各賽季分數線的預先計算結果 (RankLines)
+  - 暱稱的三字元組 (trigram) 模糊搜尋索引 (NicknameTrigrams)
+  - Bot 內共用的連線池 (服務 "db")
+
+用法：
+    python3 RaidDatabase.py import <dump.csv|dump.json|dump.jsonl> S80_Binah
+"""
+from contextlib import contextmanager
+from pathlib import Path
+import argparse
+import csv
+import itertools
+import json
+import logging
+import re
+import sqlite3
+import sys
+import threading
+import time
+import AronaRankLine as arona
+from Services import services
+
+logger = logging.getLogger(__name__)
+
+
+DB_Path = Path(__file__).parent / "db"
+LINUX_DB = DB_Path / "Linux" / "RaidDatabase.db"
+WINDOWS_DB = DB_Path / "Windows" / "RaidDatabase.db"
+
+DB_FILE = LINUX_DB if sys.platform.startswith("linux") else WINDOWS_DB
+
+# 大決戰資料表才會有的各裝甲分數欄位
+ARMOR_COLUMNS = ['LightArmor', 'HeavyArmor', 'Unarmed', 'ElasticArmor']
+
+# 賽季資料表名稱格式，例如 S80_Binah
+SEASON_TABLE_PATTERN = re.compile(r"^S\d+_\w+$")
+
+# 資料表名稱中的 Boss 代號 -> 顯示名稱 -> raid_id (來自 raid_scoring.json)
+BOSS_RAID_ID = arona.BOSS_RAID_IDS
+BOSS_NAME_MAP = arona.BOSS_TABLE_KEYS
+
+# /glrainline 顯示的分數線名次
+RANK_LINE_RANKS = [1, 1000, 5000, 10001, 50001]
+
+# 匯入時必須存在的欄位
+REQUIRED_COLUMNS = ["Rank", "AccountId", "Nickname", "BestRankingPoint"]
+# 以整數儲存的已知欄位，其餘未知欄位使用 NUMERIC 親和性
+INTEGER_COLUMNS = {"Rank", "AccountId", "BestRankingPoint", "RepresentCharacterUniqueId", *ARMOR_COLUMNS}
+TEXT_COLUMNS = {"Nickname"}
+# 載入完成後才建立的索引 (對應 Bot 內的查詢條件)
+INDEXED_COLUMNS = ["Rank", "AccountId", "Nickname"]
+
+DEFAULT_BATCH_SIZE = 100_000
+
+# 模糊搜尋時先取出的候選數量 (相對於回傳數量的倍數)
+FUZZY_CANDIDATE_FACTOR = 5
+
+# 連線池保留的閒置連線數
+POOL_SIZE = 4
+
+
+def list_season_tables(conn: sqlite3.Connection) -> list:
+    """列出所有 S<season>_<boss> 賽季資料表 (名稱遞減排序)"""
+    cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name GLOB 'S[0-9]*' ORDER BY name DESC")
+    return [row[0] for row in cursor.fetchall() if SEASON_TABLE_PATTERN.match(row[0])]
+
+
+def get_season_number(table_name: str) -> int:
+    """從資料表名稱取得賽季編號，例如 S80_Binah -> 80"""
+    return int(table_name.split('_', 1)[0][1:])
+
+
+def parse_table_name(table_name: str) -> tuple[int, str | None, str, int]:
+    """將 S80_Binah 形式的資料表名稱解析為 (賽季, 內部 Boss 代號, 顯示用 Boss 名稱, raid_id)"""
+    boss_name_from_table = table_name.split('_', 1)[1]
+    season_display = get_season_number(table_name)
+    internal_boss_key = next((key for key in BOSS_NAME_MAP.keys() if key.lower() in boss_name_from_table.lower()), None)
+    display_boss_name = BOSS_NAME_MAP.get(internal_boss_key, boss_name_from_table)
+    raid_id = arona.get_raid_id(display_boss_name)
+    return season_display, internal_boss_key, display_boss_name, raid_id
+
+
+class ConnectionPool:
+    """
+    重複使用的 SQLite 連線 (Bot 內的指令與背景任務共用，不必每次查詢都重新開啟資料庫)。
+    `with pool.connection() as conn:` 與 `with sqlite3.connect(...) as conn:` 相同：成功時 commit、例外時 rollback，
+    結束後連線回到池中 (row_factory 會被重設)。同時使用的連線超過 size 時另開新連線，歸還時多餘的會關閉。
+    """
+
+    def __init__(self, db_path=DB_FILE, size: int = POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @contextmanager
+    def connection(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            # 連線會在 asyncio.to_thread 的不同執行緒間傳遞，但同一時間只有一個使用者
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.row_factory = None
+            with self._lock:
+                keep = not self._closed and len(self._idle) < self.size
+                if keep:
+                    self._idle.append(conn)
+            if not keep:
+                conn.close()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+def _create_import_log_table(conn: sqlite3.Connection):
+    """建立記錄每次匯入結果的資料表"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ImportLog (
+            SeasonTable TEXT NOT NULL,
+            SourceFile TEXT NOT NULL,
+            RowCount INTEGER NOT NULL,
+            Seconds REAL NOT NULL,
+            ImportedAt INTEGER NOT NULL
+        )
+    """)
+
+
+def create_player_history_tables(conn: sqlite3.Connection):
+    """
+    建立跨賽季的玩家歷史索引：
+      - PlayerHistory：每個賽季資料表中每位玩家的 (AccountId, Nickname, 賽季資料表, Rank, BestRankingPoint)
+      - PlayerHistoryTables：已建立索引的賽季資料表，用於增量更新
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS PlayerHistory (
+            AccountId INTEGER NOT NULL,
+            Nickname TEXT,
+            SeasonTable TEXT NOT NULL,
+            Season INTEGER NOT NULL,
+            Rank INTEGER,
+            BestRankingPoint INTEGER,
+            PRIMARY KEY (SeasonTable, AccountId)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_PlayerHistory_AccountId ON PlayerHistory (AccountId, Season)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_PlayerHistory_Nickname ON PlayerHistory (Nickname)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS PlayerHistoryTables (
+            SeasonTable TEXT PRIMARY KEY,
+            RowCount INTEGER NOT NULL,
+            IndexedAt INTEGER NOT NULL
+        )
+    """)
+
+
+def index_player_history(conn: sqlite3.Connection, table_name: str) -> int:
+    """(重新) 將單一賽季資料表寫入 PlayerHistory，回傳寫入筆數。呼叫端負責交易。"""
+    create_player_history_tables(conn)
+    conn.execute("DELETE FROM PlayerHistory WHERE SeasonTable = ?", (table_name,))
+    cursor = conn.execute(f"""
+        INSERT OR REPLACE INTO PlayerHistory (AccountId, Nickname, SeasonTable, Season, Rank, BestRankingPoint)
+        SELECT AccountId, Nickname, ?, ?, Rank, BestRankingPoint FROM "{table_name}" WHERE AccountId IS NOT NULL
+    """, (table_name, get_season_number(table_name)))
+    conn.execute(
+        "INSERT OR REPLACE INTO PlayerHistoryTables (SeasonTable, RowCount, IndexedAt) VALUES (?, ?, ?)",
+        (table_name, cursor.rowcount, int(time.time()))
+    )
+    return cursor.rowcount
+
+
+def sync_player_history(db_path=DB_FILE) -> list:
+    """為尚未建立索引的賽季資料表補上 PlayerHistory，並移除已不存在的資料表，回傳新增索引的資料表"""
+    with sqlite3.connect(db_path) as conn:
+        create_player_history_tables(conn)
+        season_tables = set(list_season_tables(conn))
+        indexed = {row[0] for row in conn.execute("SELECT SeasonTable FROM PlayerHistoryTables")}
+
+        for table_name in indexed - season_tables:
+            conn.execute("DELETE FROM PlayerHistory WHERE SeasonTable = ?", (table_name,))
+            conn.execute("DELETE FROM PlayerHistoryTables WHERE SeasonTable = ?", (table_name,))
+
+        new_tables = sorted(season_tables - indexed)
+        for table_name in new_tables:
+            rows = index_player_history(conn, table_name)
+            logger.info("已建立 %s 的玩家歷史索引 (%s 筆)", table_name, f"{rows:,}")
+        conn.commit()
+    return new_tables
+
+
+def get_player_history(conn: sqlite3.Connection, nickname: str) -> list:
+    """
+    以單一查詢取得暱稱為 `nickname` 的所有玩家 (依 AccountId) 在各賽季的排名紀錄，
+    包含該玩家在其他賽季使用不同暱稱的紀錄。依 AccountId、賽季遞減排序。
+    """
+    cursor = conn.execute("""
+        SELECT AccountId, Nickname, SeasonTable, Season, Rank, BestRankingPoint
+        FROM PlayerHistory
+        WHERE AccountId IN (SELECT AccountId FROM PlayerHistory WHERE Nickname = ?)
+        ORDER BY AccountId, Season DESC, SeasonTable
+    """, (nickname,))
+    return cursor.fetchall()
+
+
+def create_rank_line_tables(conn: sqlite3.Connection):
+    """
+    建立分數線的預先計算結果：
+      - RankLines：每個分數線名次一列總分 (ColumnOrder = 0)，大決戰另有各裝甲分數 (ColumnOrder = 1..4)，
+        並附上已計算好的難度與用時 (秒，無法計算時為 NULL)
+      - RankLineTables：已計算的賽季資料表
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS RankLines (
+            SeasonTable TEXT NOT NULL,
+            Rank INTEGER NOT NULL,
+            ColumnOrder INTEGER NOT NULL,
+            ScoreColumn TEXT NOT NULL,
+            Nickname TEXT,
+            Score INTEGER,
+            Difficulty TEXT,
+            UsedTime REAL,
+            PRIMARY KEY (SeasonTable, Rank, ColumnOrder)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS RankLineTables (
+            SeasonTable TEXT PRIMARY KEY,
+            IsEliminate INTEGER NOT NULL,
+            UpdatedAt INTEGER NOT NULL
+        )
+    """)
+
+
+def _score_detail(score: int, mode: str, raid_id: int) -> tuple:
+    """回傳 (難度, 用時秒數)，無法計算用時時為 None"""
+    difficulty = arona.determine_difficulty(score, mode)
+    try:
+        return difficulty, arona.calculate_used_time(score, difficulty, raid_id)
+    except Exception:
+        return difficulty, None
+
+
+def materialize_rank_lines(conn: sqlite3.Connection, table_name: str) -> bool:
+    """(重新) 計算單一賽季資料表的分數線並寫入 RankLines，回傳是否為大決戰。呼叫端負責交易。"""
+    create_rank_line_tables(conn)
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")')]
+    armor_cols = [c for c in ARMOR_COLUMNS if c in columns]
+    is_eliminate = bool(armor_cols)
+    _season_display, _internal_boss_key, _display_boss_name, raid_id = parse_table_name(table_name)
+    mode = arona.get_mode(raid_id)
+
+    select_cols = ", ".join(f'"{c}"' for c in ["Rank", "Nickname", "BestRankingPoint", *armor_cols])
+    placeholders = ", ".join("?" for _ in RANK_LINE_RANKS)
+    cursor = conn.execute(f'SELECT {select_cols} FROM "{table_name}" WHERE Rank IN ({placeholders})', RANK_LINE_RANKS)
+
+    rows = []
+    for rank, nickname, best_ranking_point, *armor_scores in cursor.fetchall():
+        if best_ranking_point is None:
+            continue  # 沒有分數的名次不寫入，查詢時顯示「無資料」
+        if is_eliminate:
+            rows.append((table_name, rank, 0, "BestRankingPoint", nickname, best_ranking_point, None, None))
+            for order, (armor, armor_score) in enumerate(zip(armor_cols, armor_scores), start=1):
+                if not armor_score or armor_score == 0:
+                    continue
+                difficulty, used_time = _score_detail(int(armor_score), mode, raid_id)
+                rows.append((table_name, rank, order, armor, nickname, armor_score, difficulty, used_time))
+        else:
+            difficulty, used_time = _score_detail(int(best_ranking_point), mode, raid_id)
+            rows.append((table_name, rank, 0, "BestRankingPoint", nickname, best_ranking_point, difficulty, used_time))
+
+    conn.execute("DELETE FROM RankLines WHERE SeasonTable = ?", (table_name,))
+    conn.executemany("""
+        INSERT OR REPLACE INTO RankLines (SeasonTable, Rank, ColumnOrder, ScoreColumn, Nickname, Score, Difficulty, UsedTime)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.execute(
+        "INSERT OR REPLACE INTO RankLineTables (SeasonTable, IsEliminate, UpdatedAt) VALUES (?, ?, ?)",
+        (table_name, int(is_eliminate), int(time.time()))
+    )
+    return is_eliminate
+
+
+def sync_rank_lines(db_path=DB_FILE) -> list:
+    """為尚未計算分數線的賽季資料表補上 RankLines，並移除已不存在的資料表，回傳新計算的資料表"""
+    with sqlite3.connect(db_path) as conn:
+        create_rank_line_tables(conn)
+        season_tables = set(list_season_tables(conn))
+        materialized = {row[0] for row in conn.execute("SELECT SeasonTable FROM RankLineTables")}
+
+        for table_name in materialized - season_tables:
+            conn.execute("DELETE FROM RankLines WHERE SeasonTable = ?", (table_name,))
+            conn.execute("DELETE FROM RankLineTables WHERE SeasonTable = ?", (table_name,))
+
+        new_tables = sorted(season_tables - materialized)
+        for table_name in new_tables:
+            materialize_rank_lines(conn, table_name)
+        conn.commit()
+    return new_tables
+
+
+def get_rank_lines(conn: sqlite3.Connection, table_name: str):
+    """
+    取得預先計算的分數線，回傳 (是否為大決戰, {Rank: [(ScoreColumn, Nickname, Score, Difficulty, UsedTime), ...]})；
+    尚未計算時回傳 None。
+    """
+    create_rank_line_tables(conn)
+    meta = conn.execute("SELECT IsEliminate FROM RankLineTables WHERE SeasonTable = ?", (table_name,)).fetchone()
+    if meta is None:
+        return None
+    lines = {}
+    cursor = conn.execute("""
+        SELECT Rank, ScoreColumn, Nickname, Score, Difficulty, UsedTime
+        FROM RankLines WHERE SeasonTable = ? ORDER BY Rank, ColumnOrder
+    """, (table_name,))
+    for rank, *detail in cursor.fetchall():
+        lines.setdefault(rank, []).append(tuple(detail))
+    return bool(meta[0]), lines
+
+
+def nickname_trigrams(nickname: str) -> set:
+    """
+    將暱稱轉為三字元組集合 (不分大小寫)。前方補兩個空白、後方補一個空白，
+    讓一兩個字的暱稱與開頭字元也能產生三字元組，並提高前綴相符的權重。
+    """
+    padded = f"  {nickname.casefold()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def create_nickname_index_tables(conn: sqlite3.Connection):
+    """
+    建立暱稱模糊搜尋索引：
+      - NicknameTrigrams：每個賽季資料表中每個相異暱稱的三字元組
+      - NicknameIndexTables：已建立索引的賽季資料表
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS NicknameTrigrams (
+            SeasonTable TEXT NOT NULL,
+            Trigram TEXT NOT NULL,
+            Nickname TEXT NOT NULL,
+            PRIMARY KEY (SeasonTable, Trigram, Nickname)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS NicknameIndexTables (
+            SeasonTable TEXT PRIMARY KEY,
+            NicknameCount INTEGER NOT NULL,
+            IndexedAt INTEGER NOT NULL
+        )
+    """)
+
+
+def index_nicknames(conn: sqlite3.Connection, table_name: str) -> int:
+    """(重新) 建立單一賽季資料表的暱稱三字元組索引，回傳相異暱稱數量。呼叫端負責交易。"""
+    create_nickname_index_tables(conn)
+    conn.execute("DELETE FROM NicknameTrigrams WHERE SeasonTable = ?", (table_name,))
+    nicknames = [row[0] for row in conn.execute(f'SELECT DISTINCT Nickname FROM "{table_name}" WHERE Nickname IS NOT NULL')]
+    conn.executemany(
+        "INSERT OR IGNORE INTO NicknameTrigrams (SeasonTable, Trigram, Nickname) VALUES (?, ?, ?)",
+        ((table_name, trigram, nickname) for nickname in nicknames for trigram in nickname_trigrams(str(nickname)))
+    )
+    conn.execute(
+        "INSERT OR REPLACE INTO NicknameIndexTables (SeasonTable, NicknameCount, IndexedAt) VALUES (?, ?, ?)",
+        (table_name, len(nicknames), int(time.time()))
+    )
+    return len(nicknames)
+
+
+def sync_nickname_index(db_path=DB_FILE) -> list:
+    """為尚未建立暱稱索引的賽季資料表補上 NicknameTrigrams，並移除已不存在的資料表，回傳新增索引的資料表"""
+    with sqlite3.connect(db_path) as conn:
+        create_nickname_index_tables(conn)
+        season_tables = set(list_season_tables(conn))
+        indexed = {row[0] for row in conn.execute("SELECT SeasonTable FROM NicknameIndexTables")}
+
+        for table_name in indexed - season_tables:
+            conn.execute("DELETE FROM NicknameTrigrams WHERE SeasonTable = ?", (table_name,))
+            conn.execute("DELETE FROM NicknameIndexTables WHERE SeasonTable = ?", (table_name,))
+
+        new_tables = sorted(season_tables - indexed)
+        for table_name in new_tables:
+            count = index_nicknames(conn, table_name)
+            logger.info("已建立 %s 的暱稱搜尋索引 (%s 個暱稱)", table_name, f"{count:,}")
+        conn.commit()
+    return new_tables
+
+
+def search_nicknames(conn: sqlite3.Connection, table_name: str, query: str, limit: int = 10) -> list:
+    """
+    在 `table_name` 中模糊搜尋暱稱，回傳最多 `limit` 筆 [(暱稱, 相似度), ...]，依相似度遞減排序。
+    以單一查詢依共同三字元組數量取出候選，再以 Jaccard 相似度排序，完全相符與前綴相符者優先。
+    尚未建立索引時回傳空列表。
+    """
+    query = query.strip()
+    if not query:
+        return []
+    query_trigrams = nickname_trigrams(query)
+    placeholders = ", ".join("?" for _ in query_trigrams)
+    try:
+        cursor = conn.execute(f"""
+            SELECT Nickname, COUNT(*) AS Hits FROM NicknameTrigrams
+            WHERE SeasonTable = ? AND Trigram IN ({placeholders})
+            GROUP BY Nickname ORDER BY Hits DESC LIMIT ?
+        """, (table_name, *query_trigrams, limit * FUZZY_CANDIDATE_FACTOR))
+        candidates = cursor.fetchall()
+    except sqlite3.OperationalError:
+        return []  # 尚未建立 NicknameTrigrams
+
+    folded_query = query.casefold()
+    results = []
+    for nickname, hits in candidates:
+        similarity = hits / (len(query_trigrams) + len(nickname_trigrams(nickname)) - hits)
+        folded_nickname = nickname.casefold()
+        if folded_nickname == folded_query:
+            similarity += 2.0
+        elif folded_nickname.startswith(folded_query):
+            similarity += 1.0
+        results.append((nickname, similarity))
+    results.sort(key=lambda item: item[1], reverse=True)
+    return results[:limit]
+
+
+def sync_derived_tables(db_path=DB_FILE):
+    """為新加入的賽季資料表補上 PlayerHistory、RankLines 與 NicknameTrigrams"""
+    sync_player_history(db_path)
+    sync_rank_lines(db_path)
+    sync_nickname_index(db_path)
+
+
+def _record_to_row(record: dict, columns: list) -> tuple:
+    """將一筆 JSON 物件依欄位順序轉為 tuple，巢狀的值 (list / dict) 以 JSON 字串儲存"""
+    return tuple(
+        json.dumps(v, ensure_ascii=False) if isinstance(v, (list, dict)) else v
+        for v in (record.get(c) for c in columns)
+    )
+
+
+def _iter_source_rows(source: Path):
+    """
+    以串流方式讀取排行榜快照，回傳 (欄位列表, 依欄位順序逐筆 tuple 的迭代器)：
+      - .csv：第一列為欄位名稱
+      - .jsonl / .ndjson：每行一筆 JSON 物件
+      - .json：JSON 陣列 (或 {"records": [...]})，需整份載入
+    """
+    suffix = source.suffix.lower()
+    if suffix == ".csv":
+        f = open(source, "r", encoding="utf-8-sig", newline="")
+        reader = csv.reader(f)
+        columns = next(reader, [])
+
+        def rows():
+            with f:
+                for row in reader:
+                    # CSV 的空欄位視為 NULL
+                    yield tuple(v if v != "" else None for v in row)
+        return columns, rows()
+
+    if suffix in (".jsonl", ".ndjson"):
+        f = open(source, "r", encoding="utf-8")
+        lines = (line for line in f if line.strip())
+        first_line = next(lines, None)
+        if first_line is None:
+            f.close()
+            return [], iter(())
+        first = json.loads(first_line)
+        columns = list(first.keys())
+
+        def rows():
+            with f:
+                yield _record_to_row(first, columns)
+                for line in lines:
+                    yield _record_to_row(json.loads(line), columns)
+        return columns, rows()
+
+    if suffix == ".json":
+        with open(source, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get("records", [])
+        columns = list(data[0].keys()) if data else []
+        return columns, (_record_to_row(rec, columns) for rec in data)
+
+    raise ValueError(f"⚠ 不支援的檔案格式: {source.suffix} (僅支援 .csv / .json / .jsonl)")
+
+
+def _column_type(column: str) -> str:
+    if column in INTEGER_COLUMNS:
+        return "INTEGER"
+    if column in TEXT_COLUMNS:
+        return "TEXT"
+    return "NUMERIC"
+
+
+def import_leaderboard(source, table_name: str, db_path=DB_FILE, batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """
+    將排行榜快照匯入 `table_name` (不存在則新建，存在則整表替換)。
+    流程：
+      1. 寫入暫存表 `_staging_<table>`，所有批次共用同一個交易，以 executemany 大量寫入
+      2. 全部資料載入後才建立 Rank / AccountId / Nickname 索引
+      3. 在單一交易內刪除舊表、將暫存表改名並更新 PlayerHistory / RankLines / NicknameTrigrams，讀取端不會看到半載入的資料
+    回傳 {"table", "rows", "seconds", "rows_per_sec"}。
+    """
+    source = Path(source)
+    if not SEASON_TABLE_PATTERN.match(table_name):
+        raise ValueError(f"⚠ 資料表名稱格式錯誤: {table_name} (應為 S<賽季>_<Boss>，例如 S80_Binah)")
+
+    columns, rows = _iter_source_rows(source)
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise ValueError(f"⚠ 快照缺少必要欄位: {missing}")
+
+    staging = f"_staging_{table_name}"
+    column_defs = ", ".join(f'"{c}" {_column_type(c)}' for c in columns)
+    placeholders = ", ".join("?" for _ in columns)
+    insert_sql = f'INSERT INTO "{staging}" VALUES ({placeholders})'
+
+    start = time.perf_counter()
+    # isolation_level=None：交易由下方明確控制
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        # WAL 讓 Bot 在匯入期間仍可讀取舊資料表
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-262144")
+
+        conn.execute(f'DROP TABLE IF EXISTS "{staging}"')
+        conn.execute(f'CREATE TABLE "{staging}" ({column_defs})')
+
+        total_rows = 0
+        conn.execute("BEGIN")
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            conn.executemany(insert_sql, batch)
+            total_rows += len(batch)
+            logger.info("已寫入 %d 筆...", total_rows)
+        conn.execute("COMMIT")
+
+        # 索引名稱附帶世代編號，避免與即將被替換的舊表索引衝突
+        generation = time.time_ns()
+        conn.execute("BEGIN")
+        for column in INDEXED_COLUMNS:
+            conn.execute(f'CREATE INDEX "ix_{table_name}_{column}_{generation}" ON "{staging}" ("{column}")')
+        conn.execute("COMMIT")
+
+        seconds = time.perf_counter() - start
+        conn.execute("BEGIN IMMEDIATE")
+        _create_import_log_table(conn)
+        conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+        conn.execute(f'ALTER TABLE "{staging}" RENAME TO "{table_name}"')
+        index_player_history(conn, table_name)
+        materialize_rank_lines(conn, table_name)
+        index_nicknames(conn, table_name)
+        conn.execute(
+            "INSERT INTO ImportLog (SeasonTable, SourceFile, RowCount, Seconds, ImportedAt) VALUES (?, ?, ?, ?, ?)",
+            (table_name, source.name, total_rows, seconds, int(time.time()))
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        conn.execute(f'DROP TABLE IF EXISTS "{staging}"')
+        raise
+    finally:
+        conn.close()
+
+    seconds = time.perf_counter() - start
+    return {
+        "table": table_name,
+        "rows": total_rows,
+        "seconds": seconds,
+        "rows_per_sec": total_rows / seconds if seconds > 0 else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RaidDatabase.db 排行榜工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="匯入排行榜快照至賽季資料表")
+    import_parser.add_argument("source", help="排行榜快照 (.csv / .json / .jsonl)")
+    import_parser.add_argument("table", help="目標資料表名稱，例如 S80_Binah")
+    import_parser.add_argument("--db", default=str(DB_FILE), help="資料庫路徑")
+    import_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="每批 executemany 的筆數")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.command == "import":
+        result = import_leaderboard(args.source, args.table, db_path=args.db, batch_size=args.batch_size)
+        print(f"✅ 已匯入 {result['rows']:,} 筆至 {result['table']}，"
+              f"耗時 {result['seconds']:.2f} 秒 ({result['rows_per_sec']:,.0f} rows/s)")
+
+
+# Bot 內共用的資料庫連線池
+services.register("db", ConnectionPool, close=ConnectionPool.close)
+
+
+if __name__ == "__main__":
+    main()
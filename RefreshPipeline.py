@@ -0,0 +1,223 @@
+# RefreshPipeline.py
+"""
+資料更新流程：依 SchaleDB `raids.json` 的賽季結束時間，自動執行
+  1. schaledb     - DownloadSchaleDBData.py (學生資料與圖片)
+  2. aronaai      - arona_ai_helper.py (日服角色使用資料 -> data.xlsx)
+  3. leaderboard  - 將 db/incoming/ 內的排行榜快照 (S80_Binah.csv 等) 匯入 RaidDatabase.db
+三個階段彼此沒有相依，同時以 JobRunner 在子行程中執行；全部結束後只熱重載一次 DataStore，Bot 不需重新啟動。
+
+排程：任一伺服器 (日服 / 台服) 的總力戰或大決戰結束 REFRESH_DELAY 秒後視為到期
+(arona.ai 與排行榜快照需要一段時間才會更新)，每個賽季結束時間只觸發一次。
+"""
+from pathlib import Path
+from datetime import datetime
+import asyncio
+import json
+import logging
+import os
+import shutil
+import time
+from Services import services
+from JobRunner import runner, SUCCEEDED
+from DataStore import store as data_store
+from RaidDatabase import SEASON_TABLE_PATTERN
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+JSON_DIR = BASE_DIR / "Json"
+RAIDS_JSON = JSON_DIR / "raids.json"
+STATE_FILE = JSON_DIR / "refresh_state.json"
+RAIDS_URL = "https://schaledb.com/data/tw/raids.json"
+
+# 待匯入的排行榜快照，檔名 (不含副檔名) 即為資料表名稱；匯入成功後移至 imported/
+INCOMING_DIR = BASE_DIR / "db" / "incoming"
+IMPORTED_DIR = INCOMING_DIR / "imported"
+LEADERBOARD_SUFFIXES = {".csv", ".json", ".jsonl"}
+
+# 賽季結束後等待多久才更新 (秒)
+REFRESH_DELAY = int(os.environ.get("REFRESH_DELAY", 2 * 60 * 60))
+# 同一個賽季的更新失敗時最多重試的次數 (每次排程檢查重試一次)
+MAX_ATTEMPTS = 3
+# raids.json 重新下載的間隔 (秒)
+RAIDS_MAX_AGE = 6 * 60 * 60
+
+STAGES = ["schaledb", "aronaai", "leaderboard"]
+
+
+def fetch_raids(max_age: int = RAIDS_MAX_AGE) -> dict:
+    """取得 raids.json (本地檔案超過 max_age 秒才重新下載，下載失敗時使用本地檔案)"""
+    try:
+        fresh = time.time() - RAIDS_JSON.stat().st_mtime < max_age
+    except FileNotFoundError:
+        fresh = False
+    if not fresh:
+        try:
+            response = services.resolve("http").get(RAIDS_URL, timeout=30)
+            response.raise_for_status()
+            data = response.json()
+            JSON_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_path = RAIDS_JSON.with_suffix(".json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, RAIDS_JSON)
+            return data
+        except Exception as e:
+            logger.warning("下載 raids.json 失敗，使用本地檔案: %s", e)
+    with open(RAIDS_JSON, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def season_end_times(raids: dict) -> list:
+    """所有伺服器的總力戰與大決戰結束時間 (unix 秒)，由小到大排序"""
+    end_times = set()
+    for server in raids.get("RaidSeasons", []):
+        for key in ("Seasons", "EliminateSeasons"):
+            for season in server.get(key, []):
+                if isinstance(season.get("End"), (int, float)):
+                    end_times.add(int(season["End"]))
+    return sorted(end_times)
+
+
+def due_season_end(end_times: list, last_handled: int, now: float, delay: int = REFRESH_DELAY) -> int | None:
+    """回傳已到期但尚未處理的最新賽季結束時間，沒有則回傳 None"""
+    due = [end for end in end_times if last_handled < end <= now - delay]
+    return due[-1] if due else None
+
+
+def next_refresh_time(end_times: list, now: float, delay: int = REFRESH_DELAY) -> float | None:
+    upcoming = [end + delay for end in end_times if end + delay > now]
+    return upcoming[0] if upcoming else None
+
+
+def load_state() -> dict:
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"last_season_end": 0, "last_run": None, "stages": {}}
+
+
+def save_state(state: dict):
+    JSON_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = STATE_FILE.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, STATE_FILE)
+
+
+def pending_leaderboards() -> list:
+    """db/incoming/ 內檔名符合 S<賽季>_<Boss> 的排行榜快照"""
+    if not INCOMING_DIR.exists():
+        return []
+    return sorted(
+        path for path in INCOMING_DIR.iterdir()
+        if path.is_file() and path.suffix in LEADERBOARD_SUFFIXES and SEASON_TABLE_PATTERN.match(path.stem)
+    )
+
+
+class RefreshPipeline:
+    """執行一次完整的資料更新；同時只會有一次更新在進行"""
+
+    def __init__(self):
+        self.state = load_state()
+        self._lock = asyncio.Lock()
+        self.current_stages = {}  # 階段名稱 -> 目前狀態說明
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def run_script_stage(self, name: str, script: str, *args: str) -> bool:
+        job = runner.start(script, *args)
+        self.current_stages[name] = f"執行中 (工作 #{job.id})"
+        await runner.wait(job)
+        self.current_stages[name] = job.describe()
+        return job.status == SUCCEEDED
+
+    async def run_leaderboard_stage(self) -> bool:
+        """依序匯入待處理的排行榜快照 (同一個資料庫的寫入不並行)"""
+        sources = pending_leaderboards()
+        if not sources:
+            self.current_stages["leaderboard"] = "沒有待匯入的快照"
+            return True
+        ok = True
+        for index, source in enumerate(sources, start=1):
+            self.current_stages["leaderboard"] = f"匯入 {source.name} ({index}/{len(sources)})"
+            job = runner.start("RaidDatabase.py", "import", str(source), source.stem)
+            await runner.wait(job)
+            if job.status == SUCCEEDED:
+                IMPORTED_DIR.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(source), IMPORTED_DIR / source.name)
+            else:
+                ok = False
+                logger.error("匯入 %s 失敗:\n%s", source.name, job.tail())
+        self.current_stages["leaderboard"] = f"已處理 {len(sources)} 個快照" + ("" if ok else " (部分失敗)")
+        return ok
+
+    async def _run_stage(self, name: str) -> bool:
+        try:
+            if name == "schaledb":
+                return await self.run_script_stage(name, "DownloadSchaleDBData.py")
+            if name == "aronaai":
+                return await self.run_script_stage(name, "arona_ai_helper.py")
+            return await self.run_leaderboard_stage()
+        except Exception as e:
+            self.current_stages[name] = f"❌ {e}"
+            logger.error("更新階段 %s 發生錯誤: %s", name, e)
+            return False
+
+    async def run(self, stages: list = STAGES, season_end: int | None = None) -> dict:
+        """
+        同時執行指定的階段，結束後熱重載資料，回傳 {階段: 是否成功}。
+        season_end 為觸發這次更新的賽季結束時間，全部成功時才記錄為已處理；
+        失敗時於下次排程檢查重試，最多 MAX_ATTEMPTS 次。
+        """
+        if self._lock.locked():
+            raise RuntimeError("資料更新已在進行中")
+        async with self._lock:
+            self.current_stages = {name: "等待中" for name in stages}
+            started = time.perf_counter()
+            logger.info("🔄 開始資料更新: %s", ", ".join(stages))
+            results = dict(zip(stages, await asyncio.gather(*(self._run_stage(name) for name in stages))))
+
+            if any(results.values()):
+                try:
+                    await asyncio.to_thread(data_store.reload)
+                except Exception as e:
+                    logger.error("更新後重新載入資料失敗 (保留目前的資料): %s", e)
+
+            self.state["last_run"] = datetime.now().isoformat(timespec="seconds")
+            self.state["stages"] = {name: {"ok": ok, "detail": self.current_stages.get(name)} for name, ok in results.items()}
+            if season_end is not None:
+                attempts = self.state.get("attempts", 0) + 1
+                if all(results.values()) or attempts >= MAX_ATTEMPTS:
+                    if not all(results.values()):
+                        logger.error("賽季 %s 的資料更新已失敗 %s 次，不再自動重試", datetime.fromtimestamp(season_end), attempts)
+                    self.state["last_season_end"] = season_end
+                    attempts = 0
+                self.state["attempts"] = attempts
+            await asyncio.to_thread(save_state, self.state)
+            logger.info("✅ 資料更新結束 (%.0f 秒): %s", time.perf_counter() - started, results)
+            return results
+
+    async def check_schedule(self) -> dict | None:
+        """依賽季結束時間判斷是否需要更新，需要時執行並回傳結果"""
+        if self.running:
+            return None
+        raids = await asyncio.to_thread(fetch_raids)
+        end_times = season_end_times(raids)
+        if not self.state.get("last_season_end"):
+            # 第一次啟用排程：以最近一次結束的賽季為起點，不立即更新
+            self.state["last_season_end"] = due_season_end(end_times, 0, time.time()) or 0
+            await asyncio.to_thread(save_state, self.state)
+            return None
+        season_end = due_season_end(end_times, self.state["last_season_end"], time.time())
+        if season_end is None:
+            return None
+        logger.info("賽季已於 %s 結束，開始排程的資料更新", datetime.fromtimestamp(season_end))
+        return await self.run(season_end=season_end)
+
+
+# 全域共用的更新流程
+pipeline = RefreshPipeline()
@@ -0,0 +1,163 @@
+# Services.py
+"""
+Bot 層級的共用服務 (統計資料、HTTP 連線、資料庫連線池、學生名稱索引、繪圖執行緒池)。
+
+  - register(名稱, factory, close) 只登記建立與關閉的方式，不會立即執行
+  - 第一次使用時才執行 factory (同時多個要求只會初始化一次)，之後所有指令共用同一個實例與其快取；
+    初始化失敗時下次要求會重新嘗試
+      - async 程式碼：`await services.get(名稱)` (於背景執行緒初始化，不阻塞事件迴圈)
+      - 同步程式碼 (含 asyncio.to_thread 內)：`services.resolve(名稱)`
+  - Cog 於 cog_load 以 acquire(self, 名稱...) 宣告使用的服務，cog_unload 時 release(self)；
+    最後一個使用者釋放後呼叫 close 關閉 (之後再使用時重新建立)
+  - 模組層級的程式碼直接 resolve() 而不經過 acquire 的服務 (例如 "http") 以 register(..., pinned=True) 登記，
+    不會因 Cog 釋放而關閉 (其他執行緒可能正在使用)，只在 Bot 結束時由 close() 關閉
+  - Bot 登入後由 warmup() 依序預先初始化，通常使用者第一次下指令時已經完成
+"""
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import logging
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# 共用 HTTP 連線池的大小 (每個主機)
+HTTP_POOL_SIZE = 16
+# 繪圖執行緒數，可由環境變數 RENDER_WORKERS 指定
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", min(4, os.cpu_count() or 1)))
+
+_MISSING = object()
+
+
+class LazyService:
+    """第一次使用時才初始化的服務"""
+
+    def __init__(self, name: str, factory, close=None, pinned: bool = False):
+        self.name = name
+        self.factory = factory
+        self.close_hook = close
+        self.pinned = pinned  # 不隨使用者釋放而關閉
+        self.seconds = None  # 初始化耗時
+        self._value = _MISSING
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not _MISSING
+
+    def resolve(self):
+        """取得服務 (尚未初始化時在目前的執行緒初始化)"""
+        value = self._value
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            if self._value is _MISSING:
+                started = time.perf_counter()
+                try:
+                    value = self.factory()
+                except Exception as e:
+                    logger.error("❌ 初始化 %s 失敗: %s - %s", self.name, e.__class__.__name__, e)
+                    raise
+                self.seconds = time.perf_counter() - started
+                self._value = value
+                logger.info("✅ 已初始化 %s (%.2f 秒)", self.name, self.seconds)
+            return self._value
+
+    async def get(self):
+        if self.loaded:
+            return self._value
+        return await asyncio.to_thread(self.resolve)
+
+    def close(self):
+        with self._lock:
+            value, self._value = self._value, _MISSING
+        if value is _MISSING or self.close_hook is None:
+            return
+        try:
+            self.close_hook(value)
+            logger.info("🔌 已關閉 %s", self.name)
+        except Exception as e:
+            logger.error("關閉 %s 時發生錯誤: %s", self.name, e)
+
+
+class ServiceRegistry:
+    def __init__(self):
+        self._services = {}
+        self._users = {}  # 使用者 (Cog) -> 使用的服務名稱
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory, close=None, pinned: bool = False) -> LazyService:
+        service = LazyService(name, factory, close, pinned)
+        self._services[name] = service
+        return service
+
+    async def get(self, name: str):
+        return await self._services[name].get()
+
+    def resolve(self, name: str):
+        return self._services[name].resolve()
+
+    def loaded(self, name: str) -> bool:
+        return name in self._services and self._services[name].loaded
+
+    def acquire(self, owner, *names: str):
+        """宣告 owner 使用這些服務 (不會立即初始化)"""
+        unknown = [name for name in names if name not in self._services]
+        if unknown:
+            raise KeyError(f"未登記的服務: {', '.join(unknown)}")
+        with self._lock:
+            self._users.setdefault(owner, set()).update(names)
+
+    def release(self, owner):
+        """釋放 owner 使用的服務；沒有其他使用者的服務會被關閉 (pinned 的服務除外)"""
+        with self._lock:
+            names = self._users.pop(owner, set())
+            in_use = set().union(*self._users.values())
+        for name in names - in_use:
+            if not self._services[name].pinned:
+                self._services[name].close()
+
+    def users(self, name: str) -> int:
+        with self._lock:
+            return sum(name in names for names in self._users.values())
+
+    def status(self) -> list:
+        """[(名稱, 是否已初始化, 耗時秒數, 使用者數)]"""
+        return [(name, service.loaded, service.seconds, self.users(name)) for name, service in self._services.items()]
+
+    async def warmup(self, profile=None):
+        """依登記順序初始化所有服務；個別失敗不影響其他服務 (之後使用時會再嘗試)"""
+        for name, service in self._services.items():
+            try:
+                await service.get()
+            except Exception:
+                continue
+            if profile is not None:
+                profile.phases.append((f"warmup:{name}", service.seconds or 0.0))
+
+    def close(self):
+        """關閉所有服務 (Bot 結束時)"""
+        with self._lock:
+            self._users.clear()
+        for service in self._services.values():
+            service.close()
+
+
+def create_http_session(pool_size: int = HTTP_POOL_SIZE) -> requests.Session:
+    """共用的 requests.Session：重複使用 TCP/TLS 連線 (各請求仍需自行指定 timeout)"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# 全域共用的服務
+services = ServiceRegistry()
+# AronaRankLine、StudentNameTranslator、RefreshPipeline 與 utils 直接 resolve("http")，不隨 Cog 卸載而關閉
+services.register("http", create_http_session, close=lambda session: session.close(), pinned=True)
+services.register("render", lambda: ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="render"),
+                  close=lambda executor: executor.shutdown(wait=False))
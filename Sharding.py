@@ -0,0 +1,50 @@
+# Sharding.py
+"""
+多行程部署的設定：由 launcher.py 以環境變數傳給每個 worker 行程。
+
+  - SHARD_COUNT  全部的 shard 數；未設定時以單一行程的 commands.Bot 執行 (與原本相同)
+  - SHARD_IDS    這個 worker 負責的 shard，例如 "0,1,2"
+  - WORKER_ID    worker 編號；0 為主要 worker，只有它會同步斜線指令並執行排程/提醒等只需執行一次的背景任務
+  - DATA_SNAPSHOT  data.xlsx 快照的指標檔 (SheetSnapshot)，設定時不直接解析 data.xlsx
+"""
+from pathlib import Path
+import os
+
+WORKER_ID = int(os.environ.get("WORKER_ID", 0))
+SHARD_COUNT = int(os.environ["SHARD_COUNT"]) if os.environ.get("SHARD_COUNT") else None
+SHARD_IDS = [int(shard_id) for shard_id in os.environ.get("SHARD_IDS", "").split(",") if shard_id.strip()] or None
+DATA_SNAPSHOT = Path(os.environ["DATA_SNAPSHOT"]) if os.environ.get("DATA_SNAPSHOT") else None
+
+
+def is_sharded() -> bool:
+    return SHARD_COUNT is not None
+
+
+def is_primary() -> bool:
+    """只需在一個行程中執行的工作 (指令同步、排程更新、排名提醒、定期同步) 由主要 worker 負責"""
+    return WORKER_ID == 0
+
+
+def worker_suffix() -> str:
+    """各 worker 各自寫入的檔案 (延遲統計、影片紀錄庫) 使用的後綴；單一行程與主要 worker 沿用原本的檔名"""
+    return f".worker{WORKER_ID}" if is_sharded() and not is_primary() else ""
+
+
+def create_bot(**kwargs):
+    """依設定建立 commands.Bot 或負責部分 shard 的 commands.AutoShardedBot"""
+    from discord.ext import commands
+    if not is_sharded():
+        return commands.Bot(**kwargs)
+    return commands.AutoShardedBot(shard_count=SHARD_COUNT, shard_ids=SHARD_IDS, **kwargs)
+
+
+def split_shards(shard_count: int, processes: int) -> list:
+    """將 shard 平均分配給各行程 (連續的區段，較早的行程多分一個)，例如 (5, 2) -> [[0, 1, 2], [3, 4]]"""
+    processes = max(1, min(processes, shard_count))
+    base, extra = divmod(shard_count, processes)
+    groups, start = [], 0
+    for index in range(processes):
+        size = base + (1 if index < extra else 0)
+        groups.append(list(range(start, start + size)))
+        start += size
+    return groups
@@ -0,0 +1,174 @@
+# SheetSnapshot.py
+"""
+data.xlsx 的唯讀快照，供多個 worker 行程共用 (launcher.py 部署時使用)。
+
+  - launcher.py 以 build() 解析一次 data.xlsx，將每個工作表的 DataFrame 序列化後寫入單一檔案
+  - 各 worker 以 mmap 開啟 (同一份檔案內容在作業系統的頁面快取中共用)，只在第一次讀取工作表時反序列化，
+    之後同一份快照 (同一個世代) 的讀取都使用快取的 DataFrame，不需各自以 openpyxl 解析整個 Excel
+  - 快照以版本化的檔名寫入 SNAPSHOT_DIR，完成後才更新指標檔 current.json；
+    worker 監看指標檔的修改時間，舊的快照在被重新載入前仍可繼續使用
+
+檔案格式：MAGIC + 索引長度 (8 bytes, little endian) + JSON 索引 + 各工作表的 pickle。
+格式變更時更新 FORMAT (MAGIC 與指標檔皆會記錄)，舊格式的快照視為不存在，由 launcher.py 重建。
+"""
+from pathlib import Path
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+SNAPSHOT_DIR = BASE_DIR / "snapshots"
+POINTER_FILE = SNAPSHOT_DIR / "current.json"
+FORMAT = 2
+MAGIC = b"ARONASNP%d" % FORMAT
+COLUMNS_KEY = "\0columns"
+# 保留的舊快照數量 (其他 worker 可能仍在使用)
+KEEP_SNAPSHOTS = 3
+
+
+def _frame_key(sheet: str, header) -> str:
+    return f"{sheet}\0{'none' if header is None else header}"
+
+
+def build(xlsx_file: Path, snapshot_dir: Path = SNAPSHOT_DIR) -> Path:
+    """
+    解析 xlsx_file 並寫出快照，回傳快照路徑。
+    每個工作表保存原始格線 (header=None) 與以第一列為欄位的 DataFrame (header=0)，
+    兩者皆直接由 pd.read_excel 產生，讀取結果 (欄位名稱、dtype) 與不使用快照時相同。
+    """
+    import pandas as pd
+
+    started = time.perf_counter()
+    source_mtime = xlsx_file.stat().st_mtime
+    xlsx = pd.ExcelFile(xlsx_file)
+    blobs, index = [], {"source": str(xlsx_file), "source_mtime": source_mtime,
+                        "sheets": list(xlsx.sheet_names), "frames": {}}
+    offset = 0
+
+    def add(key: str, frame):
+        nonlocal offset
+        blob = pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL)
+        index["frames"][key] = [offset, len(blob)]
+        blobs.append(blob)
+        offset += len(blob)
+
+    columns = {}
+    for sheet in xlsx.sheet_names:
+        add(_frame_key(sheet, None), pd.read_excel(xlsx, sheet_name=sheet, header=None))
+        frame = pd.read_excel(xlsx, sheet_name=sheet)
+        columns[sheet] = list(frame.columns)
+        add(_frame_key(sheet, 0), frame)
+    # 各工作表的欄位名稱 (保留原本的型別)，開啟快照時一次載入
+    add(COLUMNS_KEY, columns)
+
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    path = snapshot_dir / f"data-{int(source_mtime * 1000)}.snap"
+    header = json.dumps(index, ensure_ascii=False).encode("utf-8")
+    tmp_path = path.with_suffix(".snap.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, path)
+
+    pointer_tmp = snapshot_dir / "current.json.tmp"
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        json.dump({"path": path.name, "source_mtime": source_mtime, "format": FORMAT}, f)
+    os.replace(pointer_tmp, snapshot_dir / POINTER_FILE.name)
+    _remove_old(snapshot_dir, keep=path)
+    logger.info("📦 已建立 data.xlsx 快照 %s (%s 個工作表，%.1f MB，%.1f 秒)",
+                path.name, len(index["sheets"]), path.stat().st_size / 1024 / 1024, time.perf_counter() - started)
+    return path
+
+
+def _remove_old(snapshot_dir: Path, keep: Path):
+    snapshots = sorted(snapshot_dir.glob("data-*.snap"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for path in snapshots[KEEP_SNAPSHOTS:]:
+        if path == keep:
+            continue
+        try:
+            path.unlink()
+        except OSError:
+            pass  # Windows 上仍被映射的檔案無法刪除，下次再清理
+
+
+def source_mtime(pointer: Path = POINTER_FILE) -> float | None:
+    """指標檔記錄的 data.xlsx 修改時間 (沒有快照或快照為舊格式時為 None)"""
+    try:
+        with open(pointer, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data["source_mtime"] if data.get("format") == FORMAT else None
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return None
+
+
+class SheetSnapshot:
+    """
+    以 mmap 開啟的快照；可在多個執行緒間共用。
+    每個實例對應指標檔的一個世代 (指標檔更新後 DataStore 以 open_current 開啟新的實例)，
+    反序列化後的 DataFrame 快取於實例中，舊世代的快取隨舊實例一併釋放。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{self.path} 不是 data.xlsx 快照")
+        header_length = struct.unpack_from("<Q", self._mmap, len(MAGIC))[0]
+        header_end = len(MAGIC) + 8 + header_length
+        self.index = json.loads(self._mmap[len(MAGIC) + 8:header_end].decode("utf-8"))
+        self._data_start = header_end
+        self.generation = self.path.name
+        self._frames = {}  # key -> 反序列化後的 DataFrame
+        self._frames_lock = threading.Lock()
+        self.sheet_names = self.index["sheets"]
+        self.source_mtime = self.index["source_mtime"]
+        self._columns = self._load(COLUMNS_KEY)
+
+    def _load(self, key: str):
+        entry = self.index["frames"].get(key)
+        if entry is None:
+            raise KeyError(key)
+        offset, length = entry
+        start = self._data_start + offset
+        with memoryview(self._mmap)[start:start + length] as view:
+            return pickle.loads(view)
+
+    def columns(self, sheet: str) -> list:
+        return self._columns[sheet]
+
+    def frame(self, sheet: str, header=0):
+        """
+        與 pd.read_excel(xlsx, sheet_name=sheet, header=header) 相同的 DataFrame (header 只支援 None 與 0)。
+        回傳的是快取的 DataFrame 本身 (同一世代的所有讀取共用)，呼叫端不可原地修改 (包含替換欄位名稱)。
+        """
+        if header not in (None, 0):
+            raise ValueError(f"快照只保存 header=None 與 header=0 的工作表: {header}")
+        key = _frame_key(sheet, header)
+        frame = self._frames.get(key)
+        if frame is None:
+            with self._frames_lock:
+                frame = self._frames.get(key)
+                if frame is None:
+                    frame = self._frames[key] = self._load(key)
+        return frame
+
+    def close(self):
+        self._frames.clear()
+        self._mmap.close()
+
+
+def open_current(pointer: Path = POINTER_FILE) -> SheetSnapshot:
+    """開啟指標檔目前指向的快照"""
+    with open(pointer, "r", encoding="utf-8") as f:
+        name = json.load(f)["path"]
+    return SheetSnapshot(pointer.parent / name)
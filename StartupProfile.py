@@ -0,0 +1,79 @@
+# StartupProfile.py
+"""
+啟動時間的記錄：從 Bot 程式開始執行到可以回應指令 (time-to-ready) 的各階段耗時。
+
+  - 需在 bot_refactored.py 的最前面匯入，匯入時間即為計時起點
+  - checkpoint("名稱") 記錄距離起點的秒數；phase("名稱") 以 with 區塊記錄單一步驟的耗時
+  - finish() 於背景預熱完成後呼叫，輸出報告並附加一行 JSON 至 STARTUP_PROFILE_FILE，方便追蹤每次啟動的變化
+
+匯入時間的細節可另外以 `python -X importtime bot_refactored.py` 查看。
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+STARTED = time.perf_counter()
+# 每次啟動的記錄 (JSON Lines)，可由環境變數 STARTUP_PROFILE_FILE 指定
+PROFILE_FILE = Path(os.environ.get("STARTUP_PROFILE_FILE", Path(__file__).parent / "startup_profile.jsonl"))
+
+
+class StartupProfile:
+    def __init__(self, started: float = STARTED):
+        self.started = started
+        self.checkpoints = []  # [(名稱, 距離起點的秒數)]
+        self.phases = []  # [(名稱, 耗時秒數)]
+        self.finished = False
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def checkpoint(self, name: str):
+        self.checkpoints.append((name, self.elapsed()))
+        logger.debug("⏱ %s: %.3f 秒", name, self.checkpoints[-1][1])
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def at(self, name: str) -> float | None:
+        return next((seconds for checkpoint, seconds in self.checkpoints if checkpoint == name), None)
+
+    def report(self) -> str:
+        lines = [f"{name:<24}{seconds:>8.3f}s" for name, seconds in self.checkpoints]
+        if self.phases:
+            lines.append("-- 各步驟耗時 --")
+            lines += [f"{name:<24}{seconds:>8.3f}s" for name, seconds in sorted(self.phases, key=lambda item: -item[1])]
+        return "\n".join(lines)
+
+    def finish(self, path: Path = PROFILE_FILE, **extra):
+        """記錄完成的時間點，輸出報告並寫入啟動記錄檔 (只有第一次呼叫有效)；extra 會一併寫入記錄"""
+        if self.finished:
+            return
+        self.finished = True
+        self.checkpoint("warmup")
+        logger.info("⏱ 啟動耗時報告：\n%s", self.report())
+        record = {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "checkpoints": {name: round(seconds, 4) for name, seconds in self.checkpoints},
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases},
+            **extra,
+        }
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning("寫入啟動記錄失敗: %s", e)
+
+
+# 全域共用的啟動記錄
+profile = StartupProfile()
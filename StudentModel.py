@@ -0,0 +1,95 @@
+# StudentModel.py
+"""
+Bot 執行期間使用的精簡學生資料。
+
+SchaleDB 的 `students.json` 每位學生都包含技能、能力值等大量巢狀資料，但繪圖只用到十來個欄位。
+DownloadSchaleDBData 下載後將需要的欄位投影成 `Json/students_compact.json`
+({"fields": [...], "students": [[...], ...]}，每位學生一列、不縮排)，
+Bot 啟動與熱重載時只讀取這個檔案並建立 `__slots__` 的 Student 物件。
+"""
+from pathlib import Path
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+JSON_DIR = BASE_DIR / "Json"
+STUDENTS_JSON = JSON_DIR / "students.json"
+STUDENTS_COMPACT_JSON = JSON_DIR / "students_compact.json"
+
+
+class Student:
+    """繪製學生使用率圖所需的欄位"""
+
+    __slots__ = (
+        "id", "name", "star_grade", "bullet_type", "armor_type", "collection_bg",
+        "street_adaptation", "outdoor_adaptation", "indoor_adaptation",
+        "weapon_adaptation_type", "weapon_adaptation_value",
+    )
+
+    def __init__(self, *values):
+        for field, value in zip(self.__slots__, values, strict=True):
+            setattr(self, field, value)
+
+    @classmethod
+    def from_schaledb(cls, raw: dict) -> "Student":
+        """
+        由 SchaleDB students.json 的單一學生資料建立。
+        新加入的學生常缺少部分欄位，除了 Id 以外都以 None 代替 (只影響該學生的繪圖)；缺少 Id 時拋出 KeyError。
+        """
+        weapon = raw.get("Weapon") or {}
+        return cls(
+            raw["Id"], raw.get("Name", str(raw["Id"])), raw.get("StarGrade"), raw.get("BulletType"),
+            raw.get("ArmorType"), raw.get("CollectionBG"),
+            raw.get("StreetBattleAdaptation"), raw.get("OutdoorBattleAdaptation"), raw.get("IndoorBattleAdaptation"),
+            weapon.get("AdaptationType"), weapon.get("AdaptationValue"),
+        )
+
+    def to_row(self) -> list:
+        return [getattr(self, field) for field in self.__slots__]
+
+    def __repr__(self) -> str:
+        return f"Student({self.id}, {self.name!r})"
+
+
+def parse_students(students: dict) -> list:
+    """將完整的 students.json 轉為 Student 列表；無法解析的項目記錄後略過，不影響其他學生"""
+    parsed = []
+    for key, raw in students.items():
+        try:
+            parsed.append(Student.from_schaledb(raw))
+        except (KeyError, TypeError, AttributeError) as e:
+            logger.warning("⚠ 略過無法解析的學生資料 %s: %s", key, e)
+    return parsed
+
+
+def compact_students(students: dict) -> dict:
+    """將完整的 students.json 投影為精簡格式"""
+    return {
+        "fields": list(Student.__slots__),
+        "students": [student.to_row() for student in parse_students(students)],
+    }
+
+
+def dump_compact(students: dict) -> bytes:
+    return json.dumps(compact_students(students), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def load_students(compact_path: Path = STUDENTS_COMPACT_JSON, full_path: Path = STUDENTS_JSON) -> dict:
+    """
+    讀取學生資料，回傳 {學生 ID 字串: Student}。
+    沒有精簡檔 (或欄位與目前版本不同) 時改由完整的 students.json 投影；兩者都沒有時回傳空字典。
+    """
+    if compact_path.exists():
+        with open(compact_path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        if data.get("fields") == list(Student.__slots__):
+            return {str(row[0]): Student(*row) for row in data["students"]}
+        logger.warning("⚠ %s 的欄位與目前版本不同，改為讀取 %s", compact_path, full_path)
+    if not full_path.exists():
+        logger.warning("⚠ 警告：找不到 %s，部分功能可能無法運作。", full_path)
+        return {}
+    with open(full_path, "r", encoding="utf-8") as file:
+        raw_students = json.load(file)
+    return {str(student.id): student for student in parse_students(raw_students)}
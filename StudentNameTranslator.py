@@ -0,0 +1,131 @@
+# StudentNameTranslator.py
+"""
+學生名稱的中文 <-> 日文對照表。
+由本地 `Json/students.json` (tw) 與 `Json/students_jp.json` (jp) 建立一次，
+供 utils.get_data 與 utils.translate_records 共用，不再於每次搜尋時下載。
+"""
+from pathlib import Path
+import json
+import logging
+import os
+import threading
+from Services import services
+
+logger = logging.getLogger(__name__)
+
+
+JSON_DIR = Path(__file__).parent / "Json"
+TW_STUDENTS_JSON = JSON_DIR / "students.json"
+JP_STUDENTS_JSON = JSON_DIR / "students_jp.json"
+
+TW_STUDENTS_URL = 'https://schaledb.com/data/tw/students.json'
+JP_STUDENTS_URL = 'https://schaledb.com/data/jp/students.json'
+
+
+def _download_json(url: str, save_path: Path):
+    """下載 JSON 並以暫存檔 + 改名的方式寫入，避免讀取端讀到寫到一半的檔案"""
+    response = services.resolve("http").get(url, timeout=30)
+    response.raise_for_status()
+    data = response.json()
+    save_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = save_path.with_suffix(save_path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, save_path)
+
+
+class StudentNameTranslator:
+    """中文 <-> 日文學生名稱對照表，檔案更新時於背景重新建立並整組替換"""
+
+    def __init__(self, tw_path: Path = TW_STUDENTS_JSON, jp_path: Path = JP_STUDENTS_JSON):
+        self.tw_path = tw_path
+        self.jp_path = jp_path
+        # (中文 -> 日文, 日文 -> 中文)，以單一 tuple 指派替換，讀取端不需加鎖
+        self._mappings = ({}, {})
+        self._loaded_mtimes = None
+        self._lock = threading.Lock()
+
+    def cn_to_jp(self, name: str) -> str:
+        self.ensure_loaded()
+        return self._mappings[0].get(name, name)
+
+    def jp_to_cn(self, name: str) -> str:
+        self.ensure_loaded()
+        return self._mappings[1].get(name, name)
+
+    def ensure_loaded(self):
+        if self._loaded_mtimes is None:
+            self.refresh()
+
+    def _current_mtimes(self):
+        try:
+            return (self.tw_path.stat().st_mtime, self.jp_path.stat().st_mtime)
+        except FileNotFoundError:
+            return None
+
+    def refresh(self) -> bool:
+        """
+        本地檔案有變動 (或尚未載入) 時重新建立對照表，回傳是否有重新建立。
+        本地缺少學生資料時會先從 SchaleDB 下載一次。
+        """
+        with self._lock:
+            for path, url in ((self.tw_path, TW_STUDENTS_URL), (self.jp_path, JP_STUDENTS_URL)):
+                if not path.exists():
+                    try:
+                        _download_json(url, path)
+                        logger.info("✅ 已下載學生資料: %s", path)
+                    except Exception as e:
+                        logger.error("下載學生資料失敗: %s", e)
+
+            mtimes = self._current_mtimes()
+            if mtimes is None or mtimes == self._loaded_mtimes:
+                if self._loaded_mtimes is None:
+                    # 無法取得學生資料時保持空對照表 (名稱原樣使用)，避免每次查詢都重試
+                    self._loaded_mtimes = ()
+                return False
+
+            try:
+                with open(self.tw_path, "r", encoding="utf-8") as f:
+                    tw_students = json.load(f)
+                with open(self.jp_path, "r", encoding="utf-8") as f:
+                    jp_students = json.load(f)
+            except Exception as e:
+                logger.error("讀取學生資料失敗: %s", e)
+                return False
+
+            # 建立「中文名稱 -> 日文名稱」的字典（完整字串包含括號）
+            cn_to_jp_mapping = {}
+            for student_id, tw_student in tw_students.items():
+                jp_student = jp_students.get(student_id)
+                if tw_student and jp_student:
+                    tw_name = tw_student.get("Name")  # 例如 "沙耶(私服)"
+                    jp_name = jp_student.get("Name")  # 例如 "サヤ（私服）"
+                    if tw_name and jp_name:
+                        cn_to_jp_mapping[tw_name] = jp_name
+            # 建立反向字典「日文名稱 -> 中文名稱」
+            jp_to_cn_mapping = {jp: cn for cn, jp in cn_to_jp_mapping.items()}
+
+            self._mappings = (cn_to_jp_mapping, jp_to_cn_mapping)
+            self._loaded_mtimes = mtimes
+            logger.info("✅ 已建立學生名稱對照表 (%s 位學生)", len(cn_to_jp_mapping))
+            return True
+
+    def refresh_remote(self) -> bool:
+        """從 SchaleDB 重新下載日服學生資料後重新建立對照表 (台服資料由 DownloadSchaleDBData.py 維護)"""
+        try:
+            _download_json(JP_STUDENTS_URL, self.jp_path)
+        except Exception as e:
+            logger.error("下載學生資料失敗: %s", e)
+        return self.refresh()
+
+
+# 全域共用的對照表
+translator = StudentNameTranslator()
+
+
+def _load_translator() -> StudentNameTranslator:
+    translator.ensure_loaded()
+    return translator
+
+
+services.register("names", _load_translator)
@@ -0,0 +1,238 @@
+# VideoClearStore.py
+"""
+/search_video 的本地影片通關紀錄庫。
+
+紀錄依 (boss, 地形, 裝甲, 難度, 是否考慮助戰, 是否顯示 bilibili) 分區，每個分區只向
+kina-ko-m-ochi.com 後端查詢一次 (不帶學生條件)，之後由背景任務定期同步。
+各分區內以「學生 -> 紀錄位元集合」的反向索引處理包含/排除學生，
+篩選只需數次整數位元運算，不必逐筆檢查學生名單。
+後端可能限制單次回傳的筆數 (只回傳列表，沒有總筆數或分頁資訊)，因此建立分區時另以分區內的一位學生為條件查詢一次：
+後端回傳了分區中沒有的紀錄，代表分區被截斷，帶學生條件的搜尋改為直接以條件向後端查詢。
+"""
+from pathlib import Path
+import json
+import logging
+import os
+import threading
+import time
+import AronaRankLine as arona
+import Sharding
+import utils
+
+logger = logging.getLogger(__name__)
+
+
+JSON_DIR = Path(__file__).parent / "Json"
+# 多行程部署時每個 worker 各自保存 (避免互相覆寫)
+STORE_FILE = JSON_DIR / f"video_clears{Sharding.worker_suffix()}.json"
+# 分區超過此秒數未同步即視為過期，由背景任務重新向後端查詢
+PARTITION_MAX_AGE = 60 * 60
+
+
+def build_clear_records(records, battle_field: str, boss_name: str, armor_type: str, difficulty: str):
+    """依條件逐筆篩選已翻譯的影片資料 (generator)，並附上用時"""
+    raid_id = arona.get_raid_id(boss_name)
+    mode = arona.get_mode(raid_id)
+
+    for rec in records:
+        if not (rec.get("battle_field") == battle_field and rec.get("boss_name") == boss_name and rec.get("armor") == armor_type):
+            continue
+        try:
+            score = int(rec.get("score", 0))
+            if arona.determine_difficulty(score, mode) != difficulty:
+                continue
+        except (ValueError, TypeError):
+            continue
+
+        try:
+            used_time_str = arona.format_time(arona.calculate_used_time(score, difficulty, raid_id)) if raid_id != 0 else "無法計算"
+        except ValueError:
+            used_time_str = "無法計算"
+        yield {"score": score, "used_time_str": used_time_str, "students": rec.get("students", []), "url": rec.get("url")}
+
+
+class VideoPartition:
+    """單一查詢條件下的通關紀錄 (依分數由高到低排序) 與學生位元索引"""
+
+    def __init__(self, records: list, synced_at: float, complete: bool = False):
+        self.records = sorted(records, key=lambda r: r["score"], reverse=True)
+        self.synced_at = synced_at
+        # 是否確認包含該條件的所有紀錄 (未被後端截斷)；未確認時帶學生條件的搜尋直接查詢後端
+        self.complete = complete
+        # 第 i 個位元代表第 i 筆紀錄
+        self.all_bits = (1 << len(self.records)) - 1
+        self.student_bits = {}
+        for index, rec in enumerate(self.records):
+            for student in rec["students"]:
+                self.student_bits[student] = self.student_bits.get(student, 0) | (1 << index)
+
+    def query(self, include_list: list, exclude_list: list) -> list:
+        """回傳包含所有 include_list 學生且不含任何 exclude_list 學生的紀錄 (保持分數排序)"""
+        bits = self.all_bits
+        for student in include_list:
+            bits &= self.student_bits.get(student, 0)
+            if not bits:
+                return []
+        for student in exclude_list:
+            bits &= ~self.student_bits.get(student, 0)
+
+        results = []
+        while bits:
+            lowest = bits & -bits
+            results.append(self.records[lowest.bit_length() - 1])
+            bits ^= lowest
+        return results
+
+    def probe_student(self) -> str | None:
+        """
+        用於確認分區是否完整的學生：不在每筆紀錄中、且出現次數最多。
+        若分區被截斷，以此學生為條件的查詢幾乎一定會回傳分區以外的紀錄。
+        """
+        candidates = [(bits.bit_count(), student) for student, bits in self.student_bits.items() if bits != self.all_bits]
+        return max(candidates)[1] if candidates else None
+
+
+def _record_key(record: dict) -> tuple:
+    return record.get("url"), record["score"], tuple(record["students"])
+
+
+def partition_key(boss_name: str, battle_field: str, armor_type: str, difficulty: str,
+                  consider_helper: bool, bilibili_display: bool) -> str:
+    return "|".join([boss_name, battle_field, armor_type, difficulty, str(consider_helper), str(bilibili_display)])
+
+
+class VideoClearStore:
+    """以分區為單位保存、查詢與同步影片通關紀錄"""
+
+    def __init__(self, store_file: Path = STORE_FILE, max_age: float = PARTITION_MAX_AGE):
+        self.store_file = store_file
+        self.max_age = max_age
+        self._partitions = {}  # key -> (查詢條件, VideoPartition)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._loaded = False
+
+    def _fetch_partition(self, conditions: tuple) -> VideoPartition:
+        """向後端查詢整個分區 (不帶學生條件)，翻譯並計算用時後建立分區"""
+        boss_name, battle_field, armor_type, difficulty, consider_helper, bilibili_display = conditions
+        records = utils.get_data(armor_type, battle_field, boss_name, difficulty, consider_helper, bilibili_display, "", "")
+        clears = list(build_clear_records(utils.translate_records(records), battle_field, boss_name, armor_type, difficulty))
+        partition = VideoPartition(clears, time.time())
+        partition.complete = self._verify_complete(conditions, partition)
+        return partition
+
+    def _verify_complete(self, conditions: tuple, partition: VideoPartition) -> bool:
+        """以一位學生為條件再查詢一次；回傳的紀錄都已在分區內時視為完整"""
+        student = partition.probe_student()
+        if student is None:
+            return True  # 沒有紀錄，或每位學生都出現在每筆紀錄中 (無法以學生條件區分)
+        known = {_record_key(record) for record in partition.records}
+        probe = self._fetch_filtered(conditions, [student], [])
+        missing = sum(1 for record in probe if _record_key(record) not in known)
+        if missing:
+            logger.info("分區 %s 被後端截斷 (%s 筆，包含 %s 的查詢另有 %s 筆)，帶學生條件的搜尋將直接查詢後端",
+                        partition_key(*conditions), len(partition.records), student, missing)
+        return not missing
+
+    def _fetch_filtered(self, conditions: tuple, include_list: list, exclude_list: list) -> list:
+        """將學生條件一併交給後端查詢 (不保存)，用於分區可能被截斷的情況"""
+        boss_name, battle_field, armor_type, difficulty, consider_helper, bilibili_display = conditions
+        records = utils.get_data(armor_type, battle_field, boss_name, difficulty, consider_helper, bilibili_display,
+                                 ",".join(exclude_list), ",".join(include_list))
+        clears = build_clear_records(utils.translate_records(records), battle_field, boss_name, armor_type, difficulty)
+        return sorted(clears, key=lambda r: r["score"], reverse=True)
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.store_file.exists():
+            return
+        try:
+            with open(self.store_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error("讀取影片紀錄庫失敗: %s", e)
+            return
+        for entry in data.get("partitions", []):
+            conditions = tuple(entry["conditions"])
+            partition = VideoPartition(entry["records"], entry["synced_at"], entry.get("complete", False))
+            self._partitions[partition_key(*conditions)] = (conditions, partition)
+
+    def save(self):
+        """以暫存檔 + 改名的方式寫入紀錄庫"""
+        with self._lock:
+            partitions = list(self._partitions.values())
+        data = {"partitions": [
+            {"conditions": list(conditions), "synced_at": partition.synced_at, "complete": partition.complete,
+             "records": partition.records}
+            for conditions, partition in partitions
+        ]}
+        with self._save_lock:
+            self.store_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.store_file.with_suffix(self.store_file.suffix + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.store_file)
+
+    def get_partition(self, boss_name: str, battle_field: str, armor_type: str, difficulty: str,
+                      consider_helper: bool, bilibili_display: bool) -> VideoPartition:
+        """取得分區；本地尚無此分區時向後端查詢一次並保存"""
+        conditions = (boss_name, battle_field, armor_type, difficulty, consider_helper, bilibili_display)
+        key = partition_key(*conditions)
+        with self._lock:
+            self._load()
+            entry = self._partitions.get(key)
+        if entry is not None:
+            return entry[1]
+
+        partition = self._fetch_partition(conditions)
+        with self._lock:
+            self._partitions[key] = (conditions, partition)
+        self.save()
+        return partition
+
+    def search(self, boss_name: str, battle_field: str, armor_type: str, difficulty: str,
+               consider_helper: bool, bilibili_display: bool,
+               include_list: list, exclude_list: list) -> list:
+        conditions = (boss_name, battle_field, armor_type, difficulty, consider_helper, bilibili_display)
+        partition = self.get_partition(*conditions)
+        if not partition.complete and (include_list or exclude_list):
+            # 分區只有後端回傳的前幾筆，符合學生條件的紀錄可能不在其中
+            logger.debug("分區 %s 不完整，改以學生條件向後端查詢", partition_key(*conditions))
+            return self._fetch_filtered(conditions, include_list, exclude_list)
+        return partition.query(include_list, exclude_list)
+
+    def sync(self) -> int:
+        """重新查詢所有過期的分區，回傳更新的分區數量"""
+        with self._lock:
+            self._load()
+            now = time.time()
+            stale = [conditions for conditions, partition in self._partitions.values()
+                     if now - partition.synced_at > self.max_age]
+
+        updated = 0
+        for conditions in stale:
+            try:
+                partition = self._fetch_partition(conditions)
+            except Exception as e:
+                logger.error("同步影片紀錄失敗 %s: %s", partition_key(*conditions), e)
+                continue
+            with self._lock:
+                self._partitions[partition_key(*conditions)] = (conditions, partition)
+            updated += 1
+        if updated:
+            self.save()
+        return updated
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._load()
+            return {
+                "partitions": len(self._partitions),
+                "records": sum(len(p.records) for _c, p in self._partitions.values()),
+            }
+
+
+# 全域共用的紀錄庫
+store = VideoClearStore()
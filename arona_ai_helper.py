@@ -6,17 +6,13 @@
 
 
 import io
+import os
 import sys
 import requests
 import time
 import re
 from openpyxl import Workbook
 
-if sys.stdout.encoding != 'utf-8':
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-if sys.stderr.encoding != 'utf-8':
-    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
-
 def get_json(url):
     """用 requests 抓取 JSON 資料，失敗時傳回 None"""
     try:
@@ -71,97 +67,49 @@ def format_sheet_name(s):
     return s[:31]
 
 
-def main():
-    # 設定各項 URL 與參數（參考原本的 factInfo）
-    fact_info = {
-        "eraid": {"id": 10, "endDate": "2024-05-22 03:59", "min": 1},
-        "raid": {"id": 61, "endDate": "2024-01-10 03:59", "min": 47},
-        "minRaidSeparateDay": 28,
-        "lagDay": 182,
-        "summaryRank": ["1000", "5000", "10000", "20000"],
-        "raidUrl": "https://media.arona.ai/data/v3/raid/<id>/total",
-        "eraidUrl": "https://media.arona.ai/data/v3/eraid/<id>/total",
-        "raidInfo": "https://schaledb.com/data/tw/raids.json",
-        "studentUrl": "https://schaledb.com/data/tw/students.json"
-    }
-
-    # 取得學生資料
-    std_info = get_json(fact_info["studentUrl"])
-    if std_info is None:
-        print("Fail to fetch student info!")
-        return
-
-    # 取得 raid 資料
-    raid_info = get_json(fact_info["raidInfo"])
-    if raid_info is None:
-        print("Fail to fetch raid info!")
-        return
-
-    # 處理目前 TW 服的 Raid 賽季
-    try:
-        curr_tw_raid = raid_info["RaidSeasons"][1]["Seasons"][-1]
-        if curr_tw_raid["End"] > time.time():
-            curr_tw_raid = raid_info["RaidSeasons"][1]["Seasons"][-2]
-    except Exception as e:
-        print("Error processing current Taiwan raid season:", e)
-        return
-
-    jp_raids = raid_info["RaidSeasons"][0]["Seasons"]
-    raid_map = {}
-    ref_jp_raid = len(jp_raids) - 1
-    while ref_jp_raid >= 0 and not is_same_raid(jp_raids[ref_jp_raid], curr_tw_raid):
-        curr_raid = jp_raids[ref_jp_raid]
-        try:
-            raid_name = raid_info["Raid"][curr_raid["RaidId"] - 1]["Name"] + " " + (curr_raid["Terrain"])
-        except Exception as e:
-            print("Error processing raid name:", e)
-            raid_name = ""
-        # 以 SeasonDisplay 作為 key，值儲存名稱資訊
-        raid_map[curr_raid["SeasonDisplay"]] = {"name": raid_name}
-        ref_jp_raid -= 1
-
-    # 處理目前 TW 服的 ERAID 賽季
-    try:
-        curr_tw_eraid = raid_info["RaidSeasons"][1]["EliminateSeasons"][-1]
-        if curr_tw_eraid["End"] > time.time():
-            curr_tw_eraid = raid_info["RaidSeasons"][1]["EliminateSeasons"][-2]
-    except Exception as e:
-        print("Error processing current Taiwan eraid season:", e)
-        return
-
-    jp_eraids = raid_info["RaidSeasons"][0]["EliminateSeasons"]
-    eraid_map = {}
-    ref_jp_eraid = len(jp_eraids) - 1
-    while ref_jp_eraid >= 0 and not is_same_raid(jp_eraids[ref_jp_eraid], curr_tw_eraid):
-        curr_eraid = jp_eraids[ref_jp_eraid]
-        try:
-            eraid_name = raid_info["Raid"][curr_eraid["RaidId"] - 1]["Name"] + " " + (curr_eraid["Terrain"])
-        except Exception as e:
-            print("Error processing eraid name:", e)
-            eraid_name = ""
-        eraid_map[curr_eraid["SeasonDisplay"]] = {"name": eraid_name}
-        ref_jp_eraid -= 1
-
-    # 分別依 raid 與 eraid 取得資料
-    search_raid = {}
-    for raid_id in raid_map.keys():
-        url = fact_info["raidUrl"].replace("<id>", str(raid_id))
-        print("Getting raid info for", raid_id, raid_map[raid_id]["name"])
-        retrieved_info = get_json(url)
-        if retrieved_info is not None:
-            search_raid[raid_id] = retrieved_info
-
-    search_eraid = {}
-    for eraid_id in eraid_map.keys():
-        url = fact_info["eraidUrl"].replace("<id>", str(eraid_id))
-        print("Getting eraid info for", eraid_id, eraid_map[eraid_id]["name"])
-        retrieved_info = get_json(url)
-        if retrieved_info is not None:
-            search_eraid[eraid_id] = retrieved_info
-
-    student_map = {}  # 用來儲存每位學生在各場戰役的詳細資料
-    rank_map = {}     # 用來彙整每個階層的資料
-    time_map = {}     # 用來儲存各場戰役對應的時間標記
+def add_usage(char_usage, battle_name, std_info, summary_rank, student_map, rank_map):
+    """
+    將單場戰役的角色使用資料 (characterUsage 的 "r" 欄位) 累加至 student_map 與 rank_map。
+    各階層的使用次數會扣除上一個階層的數量 (例如 5000 名內 - 1000 名內)。
+    """
+    for rank_range, std_dict in char_usage.items():
+        for std_id, usage_list in std_dict.items():
+            std_entry = std_info.get(std_id, {})
+            std_nm = std_entry.get("Name", "")
+            is_limited = std_entry.get("IsLimited", False)
+            if rank_range in summary_rank:
+                rank_index = summary_rank.index(rank_range)
+                if rank_range not in rank_map:
+                    rank_map[rank_range] = {}
+                if std_id not in rank_map[rank_range]:
+                    rank_map[rank_range][std_id] = {"id": std_id, "stdNm": std_nm, "max": -1, "isLimited": is_limited, "cnt": 0}
+                use_cnt = sum(usage_list)
+                if rank_index != 0:
+                    prev_rank = summary_rank[rank_index - 1]
+                    if prev_rank in char_usage and std_id in char_usage[prev_rank]:
+                        use_cnt -= sum(char_usage[prev_rank][std_id])
+                if use_cnt > 0:
+                    rank_map[rank_range][std_id][battle_name] = use_cnt
+                    rank_map[rank_range][std_id]["max"] = max(rank_map[rank_range][std_id]["max"], use_cnt)
+                    rank_map[rank_range][std_id]["cnt"] += 1
+
+            if std_id not in student_map:
+                student_map[std_id] = {}
+            if battle_name not in student_map[std_id]:
+                student_map[std_id][battle_name] = {}
+            student_map[std_id][battle_name][rank_range] = usage_list
+
+
+def aggregate_usage(search_raid, search_eraid, raid_map, eraid_map, std_info, summary_rank):
+    """
+    彙整各場總力戰/大決戰的角色使用資料，回傳 (student_map, rank_map, time_map)：
+      - student_map: 每位學生在各場戰役的詳細資料
+      - rank_map: 各階層的彙整資料
+      - time_map: 各場戰役對應的時間標記 (用於排序欄位)
+    """
+    student_map = {}
+    rank_map = {}
+    time_map = {}
 
     # 處理 raid 資料
     for no_raid, curr_raid_info in search_raid.items():
@@ -173,32 +121,7 @@ def main():
         time_map[key_time] = raid_name
 
         char_usage = curr_raid_info.get("characterUsage", {}).get("r", {})
-        for rank_range, std_dict in char_usage.items():
-            for std_id, usage_list in std_dict.items():
-                std_entry = std_info.get(std_id, {})
-                std_nm = std_entry.get("Name", "")
-                is_limited = std_entry.get("IsLimited", False)
-                if rank_range in fact_info["summaryRank"]:
-                    rank_index = fact_info["summaryRank"].index(rank_range)
-                    if rank_range not in rank_map:
-                        rank_map[rank_range] = {}
-                    if std_id not in rank_map[rank_range]:
-                        rank_map[rank_range][std_id] = {"id": std_id, "stdNm": std_nm, "max": -1, "isLimited": is_limited, "cnt": 0}
-                    use_cnt = sum(usage_list)
-                    if rank_index != 0:
-                        prev_rank = fact_info["summaryRank"][rank_index - 1]
-                        if prev_rank in char_usage and std_id in char_usage[prev_rank]:
-                            use_cnt -= sum(char_usage[prev_rank][std_id])
-                    if use_cnt > 0:
-                        rank_map[rank_range][std_id][raid_name] = use_cnt
-                        rank_map[rank_range][std_id]["max"] = max(rank_map[rank_range][std_id]["max"], use_cnt)
-                        rank_map[rank_range][std_id]["cnt"] += 1
-
-                if std_id not in student_map:
-                    student_map[std_id] = {}
-                if raid_name not in student_map[std_id]:
-                    student_map[std_id][raid_name] = {}
-                student_map[std_id][raid_name][rank_range] = usage_list
+        add_usage(char_usage, raid_name, std_info, summary_rank, student_map, rank_map)
 
     # 處理 eraid 資料
     for no_eraid, curr_eraid_info in search_eraid.items():
@@ -214,32 +137,13 @@ def main():
             # 為了避免 key 重複，將 eraid_time 與 eraid_name 連接起來作為 key
             time_map[str(eraid_time) + eraid_name] = eraid_name
             char_usage = battle_data.get("r", {})
-            for rank_range, std_dict in char_usage.items():
-                for std_id, usage_list in std_dict.items():
-                    std_entry = std_info.get(std_id, {})
-                    std_nm = std_entry.get("Name", "")
-                    is_limited = std_entry.get("IsLimited", False)
-                    if rank_range in fact_info["summaryRank"]:
-                        rank_index = fact_info["summaryRank"].index(rank_range)
-                        if rank_range not in rank_map:
-                            rank_map[rank_range] = {}
-                        if std_id not in rank_map[rank_range]:
-                            rank_map[rank_range][std_id] = {"id": std_id, "stdNm": std_nm, "max": -1, "isLimited": is_limited, "cnt": 0}
-                        use_cnt = sum(usage_list)
-                        if rank_index != 0:
-                            prev_rank = fact_info["summaryRank"][rank_index - 1]
-                            if prev_rank in char_usage and std_id in char_usage[prev_rank]:
-                                use_cnt -= sum(char_usage[prev_rank][std_id])
-                        if use_cnt > 0:
-                            rank_map[rank_range][std_id][eraid_name] = use_cnt
-                            rank_map[rank_range][std_id]["max"] = max(rank_map[rank_range][std_id]["max"], use_cnt)
-                            rank_map[rank_range][std_id]["cnt"] += 1
-                    if std_id not in student_map:
-                        student_map[std_id] = {}
-                    if eraid_name not in student_map[std_id]:
-                        student_map[std_id][eraid_name] = {}
-                    student_map[std_id][eraid_name][rank_range] = usage_list
+            add_usage(char_usage, eraid_name, std_info, summary_rank, student_map, rank_map)
+
+    return student_map, rank_map, time_map
 
+
+def build_workbook(student_map, rank_map, time_map, summary_rank) -> Workbook:
+    """依彙整結果建立 data.xlsx 的工作簿 (各階層 Summary 工作表 + 每位學生的明細工作表)"""
     # 建立 Excel 工作簿
     wb = Workbook()
     # 刪除預設的工作表
@@ -254,9 +158,9 @@ def main():
         raid_array_by_date.append(time_map[t])
 
     # 建立依各階層統計的 Summary 工作表
-    # 依照 fact_info["summaryRank"] 的順序處理（若該階層有資料）
+    # 依照 summary_rank 的順序處理（若該階層有資料）
     previous_rank = None
-    for i, rank_range in enumerate(fact_info["summaryRank"]):
+    for i, rank_range in enumerate(summary_rank):
         if rank_range not in rank_map:
             continue
         data_array = list(rank_map[rank_range].values())
@@ -295,7 +199,7 @@ def main():
                     "9": "共計"
                 })
                 # 依照各階層顯示數值，若無資料則填 0
-                for rank in fact_info["summaryRank"]:
+                for rank in summary_rank:
                     if rank in raids[raid_name]:
                         use_arr = raids[raid_name][rank]
                         total = sum(use_arr)
@@ -333,11 +237,116 @@ def main():
             row = [row_data.get(col, "") for col in student_header]
             ws.append(row)
 
-    # 寫出 Excel 檔案
+    return wb
+
+
+def main():
+    # 設定各項 URL 與參數（參考原本的 factInfo）
+    fact_info = {
+        "eraid": {"id": 10, "endDate": "2024-05-22 03:59", "min": 1},
+        "raid": {"id": 61, "endDate": "2024-01-10 03:59", "min": 47},
+        "minRaidSeparateDay": 28,
+        "lagDay": 182,
+        "summaryRank": ["1000", "5000", "10000", "20000"],
+        "raidUrl": "https://media.arona.ai/data/v3/raid/<id>/total",
+        "eraidUrl": "https://media.arona.ai/data/v3/eraid/<id>/total",
+        "raidInfo": "https://schaledb.com/data/tw/raids.json",
+        "studentUrl": "https://schaledb.com/data/tw/students.json"
+    }
+
+    # 取得學生資料
+    std_info = get_json(fact_info["studentUrl"])
+    if std_info is None:
+        print("Fail to fetch student info!")
+        sys.exit(1)
+
+    # 取得 raid 資料
+    raid_info = get_json(fact_info["raidInfo"])
+    if raid_info is None:
+        print("Fail to fetch raid info!")
+        sys.exit(1)
+
+    # 處理目前 TW 服的 Raid 賽季
+    try:
+        curr_tw_raid = raid_info["RaidSeasons"][1]["Seasons"][-1]
+        if curr_tw_raid["End"] > time.time():
+            curr_tw_raid = raid_info["RaidSeasons"][1]["Seasons"][-2]
+    except Exception as e:
+        print("Error processing current Taiwan raid season:", e)
+        sys.exit(1)
+
+    jp_raids = raid_info["RaidSeasons"][0]["Seasons"]
+    raid_map = {}
+    ref_jp_raid = len(jp_raids) - 1
+    while ref_jp_raid >= 0 and not is_same_raid(jp_raids[ref_jp_raid], curr_tw_raid):
+        curr_raid = jp_raids[ref_jp_raid]
+        try:
+            raid_name = raid_info["Raid"][curr_raid["RaidId"] - 1]["Name"] + " " + (curr_raid["Terrain"])
+        except Exception as e:
+            print("Error processing raid name:", e)
+            raid_name = ""
+        # 以 SeasonDisplay 作為 key，值儲存名稱資訊
+        raid_map[curr_raid["SeasonDisplay"]] = {"name": raid_name}
+        ref_jp_raid -= 1
+
+    # 處理目前 TW 服的 ERAID 賽季
+    try:
+        curr_tw_eraid = raid_info["RaidSeasons"][1]["EliminateSeasons"][-1]
+        if curr_tw_eraid["End"] > time.time():
+            curr_tw_eraid = raid_info["RaidSeasons"][1]["EliminateSeasons"][-2]
+    except Exception as e:
+        print("Error processing current Taiwan eraid season:", e)
+        sys.exit(1)
+
+    jp_eraids = raid_info["RaidSeasons"][0]["EliminateSeasons"]
+    eraid_map = {}
+    ref_jp_eraid = len(jp_eraids) - 1
+    while ref_jp_eraid >= 0 and not is_same_raid(jp_eraids[ref_jp_eraid], curr_tw_eraid):
+        curr_eraid = jp_eraids[ref_jp_eraid]
+        try:
+            eraid_name = raid_info["Raid"][curr_eraid["RaidId"] - 1]["Name"] + " " + (curr_eraid["Terrain"])
+        except Exception as e:
+            print("Error processing eraid name:", e)
+            eraid_name = ""
+        eraid_map[curr_eraid["SeasonDisplay"]] = {"name": eraid_name}
+        ref_jp_eraid -= 1
+
+    # 分別依 raid 與 eraid 取得資料
+    search_raid = {}
+    for raid_id in raid_map.keys():
+        url = fact_info["raidUrl"].replace("<id>", str(raid_id))
+        print("Getting raid info for", raid_id, raid_map[raid_id]["name"])
+        retrieved_info = get_json(url)
+        if retrieved_info is not None:
+            search_raid[raid_id] = retrieved_info
+
+    search_eraid = {}
+    for eraid_id in eraid_map.keys():
+        url = fact_info["eraidUrl"].replace("<id>", str(eraid_id))
+        print("Getting eraid info for", eraid_id, eraid_map[eraid_id]["name"])
+        retrieved_info = get_json(url)
+        if retrieved_info is not None:
+            search_eraid[eraid_id] = retrieved_info
+
+    # 全部賽季都取得失敗時不覆寫 data.xlsx，並以非零狀態結束 (Bot 不會熱重載)
+    if (raid_map or eraid_map) and not search_raid and not search_eraid:
+        print("Fail to fetch any raid / eraid data!")
+        sys.exit(1)
+
+    student_map, rank_map, time_map = aggregate_usage(search_raid, search_eraid, raid_map, eraid_map, std_info, fact_info["summaryRank"])
+    wb = build_workbook(student_map, rank_map, time_map, fact_info["summaryRank"])
+
+    # 寫出 Excel 檔案 (先寫入暫存檔再改名，執行中的 Bot 熱重載時不會讀到寫到一半的檔案)
     output_filename = "data.xlsx"
-    wb.save(output_filename)
+    tmp_filename = output_filename + ".tmp"
+    wb.save(tmp_filename)
+    os.replace(tmp_filename, output_filename)
     print(f"Excel file '{output_filename}' has been created.")
 
 
 if __name__ == '__main__':
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    if sys.stderr.encoding != 'utf-8':
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
     main()
\ No newline at end of file
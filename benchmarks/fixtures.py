@@ -0,0 +1,104 @@
+# benchmarks/fixtures.py
+"""
+效能測試用的固定測資 (以固定亂數種子產生，每次執行內容相同)：
+  - arona.ai 角色使用資料的紀錄檔 (arona_ai_helper 彙整用)
+  - 台服排行榜快照 CSV (匯入 RaidDatabase 用)
+  - 學生資料與素材 (ImageFactory 用，直接使用 repo 內的素材)
+"""
+from pathlib import Path
+import csv
+import json
+import random
+
+SEED = 20240522
+SUMMARY_RANK = ["1000", "5000", "10000", "20000"]
+ARMOR_TYPES = ["LightArmor", "HeavyArmor", "Unarmed", "ElasticArmor"]
+
+
+def make_aronaai_recording(n_raids: int = 12, n_eraids: int = 4, n_students: int = 200, seed: int = SEED) -> dict:
+    """
+    產生與 arona.ai `/raid/<id>/total`、`/eraid/<id>/total` 回應相同結構的資料，
+    格式為 {"std_info": ..., "raid_map": ..., "eraid_map": ..., "search_raid": ..., "search_eraid": ...}
+    """
+    rng = random.Random(seed)
+    student_ids = [str(10000 + i) for i in range(n_students)]
+    std_info = {sid: {"Name": f"學生{sid}", "IsLimited": rng.random() < 0.3} for sid in student_ids}
+
+    def char_usage():
+        usage = {}
+        counts = {sid: [0] * 7 for sid in student_ids}
+        for rank in SUMMARY_RANK:
+            # 人數越多的階層使用次數越多，且包含上一階層的數量
+            scale = int(rank) // 20
+            for sid in rng.sample(student_ids, k=n_students // 2):
+                counts[sid] = [c + rng.randint(0, scale) for c in counts[sid]]
+            usage[rank] = {sid: list(c) for sid, c in counts.items() if sum(c) > 0}
+        return {"r": usage}
+
+    raid_map, search_raid = {}, {}
+    for i in range(n_raids):
+        season = 60 + i
+        raid_map[season] = {"name": f"Boss{i % 12} Outdoor"}
+        search_raid[season] = {"trophyCutByTime": {"id": [1700000000 + season * 1000]}, "characterUsage": char_usage()}
+
+    eraid_map, search_eraid = {}, {}
+    for i in range(n_eraids):
+        season = 10 + i
+        eraid_map[season] = {"name": f"Boss{i % 12} Street"}
+        search_eraid[season] = {
+            "trophyCutByTime": {"id": [1700000500 + season * 1000]},
+            "characterUsage": {f"eraid_{season}_{armor}": char_usage() for armor in ARMOR_TYPES[:3]},
+        }
+    return {"std_info": std_info, "raid_map": raid_map, "eraid_map": eraid_map,
+            "search_raid": search_raid, "search_eraid": search_eraid}
+
+
+def load_aronaai_recording(path: Path) -> dict:
+    """讀取紀錄檔；JSON 的物件鍵為字串，賽季編號轉回整數以符合 arona_ai_helper 的用法"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    for key in ("raid_map", "eraid_map", "search_raid", "search_eraid"):
+        data[key] = {int(season): value for season, value in data[key].items()}
+    return data
+
+
+def save_aronaai_recording(data: dict, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def write_leaderboard_csv(path: Path, rows: int = 100_000, eliminate: bool = False, seed: int = SEED):
+    """產生排行榜快照 CSV，分數隨名次遞減，暱稱約有 1% 重複"""
+    rng = random.Random(seed)
+    columns = ["Rank", "AccountId", "Nickname", "BestRankingPoint", "RepresentCharacterUniqueId"]
+    if eliminate:
+        columns += ARMOR_TYPES[:3]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for rank in range(1, rows + 1):
+            score = 45_000_000 - rank * (40_000_000 // rows)
+            nickname = f"Sensei{rng.randint(0, rows - rows // 100)}"
+            row = [rank, 1_000_000 + rank, nickname, score, 10000 + rank % 200]
+            if eliminate:
+                row += [score // 3 + rng.randint(-50_000, 50_000) for _ in range(3)]
+            writer.writerow(row)
+
+
+def find_xlsx_targets(arona_stats) -> dict:
+    """從 data.xlsx 中找出可用來測試的賽季、裝甲類型與學生"""
+    import pandas as pd
+    summary = pd.read_excel(arona_stats.xlsx, sheet_name="Summary - Rank 1000", nrows=1)
+    raid_column = next(c for c in summary.columns if "總力戰" in str(c))
+    eraid_column = next(c for c in summary.columns if "大決戰" in str(c))
+    student_sheet = next(s for s in arona_stats.xlsx.sheet_names if s.isdigit())
+    student_name = str(pd.read_excel(arona_stats.xlsx, sheet_name="Summary - Rank 1000", usecols=["stdNm"]).iloc[0, 0])
+    return {
+        "raid_season": int(str(raid_column).split(" ")[0][1:]),
+        "eraid_season": int(str(eraid_column).split(" ")[0][1:]),
+        "eraid_armor": next(a for a in ARMOR_TYPES if a in str(eraid_column)),
+        "student_id": student_sheet,
+        "student_name": student_name,
+    }
@@ -0,0 +1,192 @@
+# benchmarks/gateway_memory.py
+"""
+比較兩種 gateway 模式 (GatewayConfig 的 minimal / all) 的快取記憶體與事件處理時間。
+
+不連線 Discord：以合成的 gateway 事件 (GUILD_CREATE、成員、PRESENCE_UPDATE、MESSAGE_CREATE) 直接餵給 discord.py 的
+ConnectionState，只送出該模式的 intents 會收到的事件 (與 Discord 伺服器端的過濾相同)：
+  - all：GUILD_CREATE 附上完整成員與上線狀態 (相當於啟動時 chunk 完成)，並收到上線狀態與訊息事件
+  - minimal：GUILD_CREATE 只有 Bot 自己，沒有上線狀態與訊息事件
+
+每個模式在獨立的子行程中執行，分別記錄 RSS 增加量 (有 /proc 時)、tracemalloc 的 Python 物件記憶體與處理時間。
+
+用法：
+    python3 benchmarks/gateway_memory.py
+    python3 benchmarks/gateway_memory.py --guilds 2000 --members 300 --events 50000
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+BOT_ID = 10 ** 17
+JOINED_AT = "2024-01-01T00:00:00+00:00"
+
+
+def rss_bytes() -> int | None:
+    """目前的 RSS (只支援有 /proc 的系統)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def user_payload(user_id: int) -> dict:
+    return {"id": str(user_id), "username": f"user{user_id}", "global_name": f"User {user_id}",
+            "discriminator": "0", "avatar": None}
+
+
+def member_payload(user_id: int, role_id: int) -> dict:
+    return {"user": user_payload(user_id), "roles": [str(role_id)], "joined_at": JOINED_AT,
+            "deaf": False, "mute": False, "flags": 0}
+
+
+def presence_payload(user_id: int, guild_id: int) -> dict:
+    return {"user": {"id": str(user_id)}, "guild_id": str(guild_id), "status": "online",
+            "activities": [{"name": "Blue Archive", "type": 0}], "client_status": {"mobile": "online"}}
+
+
+class SyntheticGateway:
+    """依 intents 產生 Discord 會送出的合成事件"""
+
+    def __init__(self, guilds: int, members: int, channels: int, roles: int):
+        self.guilds = guilds
+        self.members = members
+        self.channels = channels
+        self.roles = roles
+
+    def guild_id(self, index: int) -> int:
+        return (index + 1) * 10 ** 9
+
+    def user_id(self, guild_index: int, member_index: int) -> int:
+        return guild_index * self.members + member_index + 1
+
+    def guild_create(self, index: int, intents) -> dict:
+        guild_id = self.guild_id(index)
+        role_id = guild_id + 1
+        members = [member_payload(BOT_ID, role_id)]
+        presences = []
+        # 成員清單：有 members intent 時 discord.py 會 chunk 取得全部成員；沒有時只有 Bot 自己
+        if intents.members or intents.presences:
+            members += [member_payload(self.user_id(index, m), role_id) for m in range(self.members)]
+        if intents.presences:
+            presences = [presence_payload(self.user_id(index, m), guild_id) for m in range(0, self.members, 4)]
+        return {
+            "id": str(guild_id), "name": f"Guild {index}", "owner_id": str(self.user_id(index, 0)),
+            "member_count": self.members + 1, "large": False, "features": [],
+            "roles": [
+                {"id": str(guild_id + r), "name": "@everyone" if r == 0 else f"role{r}", "color": 0, "hoist": False,
+                 "position": r, "permissions": "0", "managed": False, "mentionable": False}
+                for r in range(self.roles)],
+            "channels": [
+                {"id": str(guild_id + 1000 + c), "name": f"channel{c}", "type": 0, "position": c,
+                 "permission_overwrites": [], "nsfw": False, "parent_id": None}
+                for c in range(self.channels)],
+            "members": members, "presences": presences, "voice_states": [], "threads": [],
+            "emojis": [], "stickers": [], "stage_instances": [], "guild_scheduled_events": [],
+        }
+
+    def events(self, count: int, intents):
+        """上線狀態與訊息事件 (各佔一半)，沒有對應的 intent 時 Discord 不會送出"""
+        for n in range(count):
+            guild_index = n % self.guilds
+            guild_id = self.guild_id(guild_index)
+            user_id = self.user_id(guild_index, n % self.members)
+            if n % 2 == 0:
+                if intents.presences:
+                    yield "presence_update", presence_payload(user_id, guild_id)
+            elif intents.guild_messages:
+                yield "message_create", {
+                    "id": str(10 ** 15 + n), "channel_id": str(guild_id + 1000 + n % self.channels),
+                    "guild_id": str(guild_id), "author": user_payload(user_id),
+                    "member": {"roles": [], "joined_at": JOINED_AT, "deaf": False, "mute": False, "flags": 0},
+                    "content": "學生使用率是多少？" * 4, "timestamp": JOINED_AT, "edited_timestamp": None,
+                    "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+                    "attachments": [], "embeds": [], "pinned": False, "type": 0,
+                }
+
+
+async def measure(mode: str, args) -> dict:
+    import GatewayConfig
+    from discord.ext import commands
+    from discord.user import ClientUser
+
+    options = GatewayConfig.client_options(mode)
+    bot = commands.Bot(**options)
+    # 與登入時相同：設定事件迴圈 (dispatch 以 task 執行事件處理器)
+    await bot._async_setup_hook()
+    state = bot._connection
+    state.user = ClientUser(state=state, data=user_payload(BOT_ID))
+    gateway = SyntheticGateway(args.guilds, args.members, args.channels, args.roles)
+
+    rss_before = rss_bytes()
+    tracemalloc.start()
+    started = time.perf_counter()
+    for index in range(args.guilds):
+        state._add_guild_from_data(gateway.guild_create(index, options["intents"]))
+    received = 0
+    for event, payload in gateway.events(args.events, options["intents"]):
+        getattr(state, f"parse_{event}")(payload)
+        received += 1
+        if received % 1000 == 0:
+            await asyncio.sleep(0)  # 讓事件處理器 (on_message 的指令解析) 執行
+    pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    await asyncio.gather(*pending, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    traced, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = rss_bytes()
+
+    return {
+        "mode": mode,
+        "intents": options["intents"].value,
+        "cached_members": sum(len(guild._members) for guild in state._guilds.values()),
+        "cached_users": len(state._users),
+        "cached_messages": len(state._messages) if state._messages is not None else 0,
+        "events_received": received,
+        "python_mb": traced / 1024 / 1024,
+        "rss_mb": (rss_after - rss_before) / 1024 / 1024 if rss_before is not None else None,
+        "seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比較 minimal / all 兩種 gateway 模式的快取記憶體")
+    parser.add_argument("--guilds", type=int, default=1000)
+    parser.add_argument("--members", type=int, default=200, help="每個伺服器的成員數")
+    parser.add_argument("--channels", type=int, default=20, help="每個伺服器的頻道數")
+    parser.add_argument("--roles", type=int, default=10, help="每個伺服器的身分組數")
+    parser.add_argument("--events", type=int, default=20000, help="上線狀態與訊息事件數")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(measure(args.child, args))))
+        return
+
+    import GatewayConfig
+    results = []
+    for mode in GatewayConfig.MODES:
+        # 各模式在獨立的行程中測量，避免彼此的記憶體互相影響
+        output = subprocess.run([sys.executable, __file__, "--child", mode, *sys.argv[1:]],
+                                capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{args.guilds} 個伺服器 x {args.members} 位成員，{args.events} 個上線狀態/訊息事件\n")
+    print(f"{'模式':<10}{'成員快取':>10}{'使用者快取':>10}{'訊息快取':>10}{'收到事件':>10}{'Python MB':>11}{'RSS MB':>9}{'秒':>8}")
+    for result in results:
+        rss = f"{result['rss_mb']:.1f}" if result["rss_mb"] is not None else "-"
+        print(f"{result['mode']:<10}{result['cached_members']:>10}{result['cached_users']:>10}{result['cached_messages']:>10}"
+              f"{result['events_received']:>10}{result['python_mb']:>11.1f}{rss:>9}{result['seconds']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
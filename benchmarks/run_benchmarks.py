@@ -0,0 +1,411 @@
+# benchmarks/run_benchmarks.py
+"""
+核心資料處理流程 (不經過 Discord) 的效能測試。
+
+測試項目：
+  - AronaStatistics：get_raid_stats / get_student_stats / get_student_usage (使用 repo 內的 data.xlsx)
+  - ImageFactory.StudentUsageImageGenerator (需要 Json/students.json、CollectionBG、studentsimage 與字型，缺少時略過)
+  - AronaRankLine：單筆與陣列版的難度判斷與用時計算
+  - RaidDatabase / RaidAnalytics：在 10 萬筆的合成排行榜上執行 GLRankLine 使用的查詢
+  - arona_ai_helper：以紀錄的 arona.ai JSON 彙整角色使用資料並產生 Excel
+
+每個項目先預熱，再執行多次計算 p50 / p95 延遲與每秒次數，另以 tracemalloc 單獨執行一次測量記憶體峰值。
+結果寫入 benchmarks/results/<commit>.json，可用 --compare 與先前的結果比較。
+
+用法：
+    python3 benchmarks/run_benchmarks.py
+    python3 benchmarks/run_benchmarks.py --only rankline --iterations 50
+    python3 benchmarks/run_benchmarks.py --compare benchmarks/results/<舊 commit>.json
+    python3 benchmarks/run_benchmarks.py --recording aronaai_dump.json   # 使用實際錄下的 arona.ai 資料
+"""
+from pathlib import Path
+from datetime import datetime, timezone
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+# ImageFactory 與 data.xlsx 皆以相對路徑讀取素材
+os.chdir(ROOT)
+
+import numpy as np
+import fixtures
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = Path(__file__).parent / "results"
+# AronaRankLine 測試使用的 Boss (顯示名稱)
+RANKLINE_BOSS = "薇娜"
+# p50 變慢超過此比例時視為效能退化
+DEFAULT_THRESHOLD = 0.10
+
+
+class SkipBenchmark(Exception):
+    """缺少素材或相依套件時略過該項目"""
+
+
+class BenchmarkSuite:
+    """收集各項目的測試函式；setup 失敗時整組略過"""
+
+    def __init__(self, name: str, setup):
+        self.name = name
+        self.setup = setup
+        self.cases = []  # [(名稱, 函式(context))]
+
+    def case(self, name: str):
+        def decorator(func):
+            self.cases.append((name, func))
+            return func
+        return decorator
+
+
+def measure(func, context, iterations: int, warmup: int) -> dict:
+    """執行並回傳延遲 (毫秒) 的 p50 / p95、每秒次數與記憶體峰值"""
+    for _ in range(warmup):
+        func(context)
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func(context)
+        samples.append(time.perf_counter() - start)
+
+    # tracemalloc 會拖慢執行，記憶體峰值另外執行一次測量
+    tracemalloc.start()
+    func(context)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "p50_ms": _percentile(samples, 50) * 1000,
+        "p95_ms": _percentile(samples, 95) * 1000,
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "ops_per_sec": len(samples) / sum(samples) if sum(samples) > 0 else None,
+        "peak_kib": peak / 1024,
+    }
+
+
+def _percentile(sorted_samples: list, percent: float) -> float:
+    index = min(len(sorted_samples) - 1, int(round(percent / 100 * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+# ----------------------------------------------------------------------
+# AronaStatistics
+# ----------------------------------------------------------------------
+
+def _setup_statistics(args):
+    from AronaStatistics import AronaStatistics
+    xlsx_file = ROOT / "data.xlsx"
+    if not xlsx_file.exists():
+        raise SkipBenchmark("找不到 data.xlsx")
+    arona_stats = AronaStatistics(str(xlsx_file))
+    return {"stats": arona_stats, **fixtures.find_xlsx_targets(arona_stats)}
+
+
+statistics_suite = BenchmarkSuite("statistics", _setup_statistics)
+
+
+@statistics_suite.case("get_raid_stats")
+def _raid_stats(ctx):
+    ctx["stats"].get_raid_stats(ctx["raid_season"], 1000)
+
+
+@statistics_suite.case("get_student_stats")
+def _student_stats(ctx):
+    ctx["stats"].get_student_stats(ctx["student_id"], ctx["eraid_season"], ctx["eraid_armor"])
+
+
+@statistics_suite.case("get_student_usage")
+def _student_usage(ctx):
+    ctx["stats"].get_student_usage(ctx["student_name"], 1000)
+
+
+# ----------------------------------------------------------------------
+# ImageFactory
+# ----------------------------------------------------------------------
+
+def _setup_image(args):
+    import StudentModel
+    if not StudentModel.STUDENTS_COMPACT_JSON.exists() and not StudentModel.STUDENTS_JSON.exists():
+        raise SkipBenchmark("找不到 Json/students.json (請先執行 DownloadSchaleDBData.py)")
+    from AronaStatistics import AronaStatistics
+    from ImageFactory import ImageFactory, load_assets
+
+    students = StudentModel.load_students()
+    arona_stats = AronaStatistics(str(ROOT / "data.xlsx"))
+    targets = fixtures.find_xlsx_targets(arona_stats)
+    student_info = students.get(targets["student_id"])
+    if student_info is None:
+        raise SkipBenchmark(f"students.json 中沒有學生 {targets['student_id']}")
+
+    required = [
+        ROOT / "CollectionBG" / f"{student_info.collection_bg}.jpg",
+        ROOT / "studentsimage" / f"{student_info.id}.webp",
+        ROOT / "Font" / "msjhbd.ttc",
+    ]
+    missing = [str(p.relative_to(ROOT)) for p in required if not p.exists()]
+    if missing:
+        raise SkipBenchmark(f"缺少圖片素材: {', '.join(missing)}")
+
+    _sheet, _title, usage = arona_stats.get_student_stats(targets["student_id"], targets["eraid_season"], targets["eraid_armor"])
+    if usage is None:
+        raise SkipBenchmark("data.xlsx 中找不到學生的使用資料")
+    return {"factory": ImageFactory, "student_info": student_info, "usage": usage, "assets": load_assets()}
+
+
+image_suite = BenchmarkSuite("image", _setup_image)
+
+
+@image_suite.case("StudentUsageImageGenerator")
+def _usage_image(ctx):
+    ctx["factory"].StudentUsageImageGenerator(ctx["student_info"], ctx["usage"], ctx["assets"])
+
+
+# ----------------------------------------------------------------------
+# AronaRankLine
+# ----------------------------------------------------------------------
+
+def _setup_rankline(args):
+    import AronaRankLine as arona
+    # 以顯示名稱查詢 (raid_scoring.json 的 name)；查不到時為 0，會改用預設模式而不是薇娜的 3 分鐘表
+    raid_id = arona.get_raid_id(RANKLINE_BOSS)
+    assert raid_id != 0, f"raid_scoring.json 中找不到 {RANKLINE_BOSS}"
+    rng = np.random.default_rng(fixtures.SEED)
+    scores = rng.integers(1_000_000, 50_000_000, size=args.rankline_scores * 2)
+    # 只保留可以算出用時的分數 (落在難度區間間隙的分數在兩種版本都無法計算)，
+    # 單筆版本因此不需要捕捉例外，實作出錯時會直接讓測試失敗
+    used_time = arona.calculate_used_time_array(scores, raid_id, arona.determine_difficulty_array(scores, raid_id))
+    scores = scores[~np.isnan(used_time)][:args.rankline_scores]
+    return {"arona": arona, "raid_id": raid_id, "mode": arona.get_mode(raid_id),
+            "scores": scores, "score_list": scores.tolist()}
+
+
+rankline_suite = BenchmarkSuite("rankline", _setup_rankline)
+
+
+@rankline_suite.case("scalar_difficulty_and_time")
+def _scalar_scoring(ctx):
+    arona, raid_id, mode = ctx["arona"], ctx["raid_id"], ctx["mode"]
+    for score in ctx["score_list"]:
+        difficulty = arona.determine_difficulty(score, mode)
+        arona.calculate_used_time(score, difficulty, raid_id)
+
+
+@rankline_suite.case("array_difficulty_and_time")
+def _array_scoring(ctx):
+    arona, raid_id = ctx["arona"], ctx["raid_id"]
+    codes = arona.determine_difficulty_array(ctx["scores"], raid_id)
+    arona.difficulty_names(codes)
+    arona.calculate_used_time_array(ctx["scores"], raid_id, codes)
+
+
+# ----------------------------------------------------------------------
+# RaidDatabase / RaidAnalytics (GLRankLine 的查詢)
+# ----------------------------------------------------------------------
+
+def _setup_sqlite(args):
+    import sqlite3
+    import RaidDatabase
+    import RaidAnalytics
+
+    workdir = Path(tempfile.mkdtemp(prefix="arona_bench_"))
+    db_path = workdir / "RaidDatabase.db"
+    csv_path = workdir / "leaderboard.csv"
+    table_name = "S80_Binah"
+    fixtures.write_leaderboard_csv(csv_path, rows=args.rows)
+    # 匯入過程的進度訊息不列入輸出
+    logging.getLogger("RaidDatabase").setLevel(logging.WARNING)
+    RaidDatabase.import_leaderboard(csv_path, table_name, db_path=db_path)
+
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    nicknames = [row[0] for row in conn.execute(f'SELECT Nickname FROM "{table_name}" ORDER BY random() LIMIT 256')]
+    return {
+        "db": RaidDatabase, "analytics": RaidAnalytics, "conn": conn, "db_path": db_path,
+        "table": table_name, "nicknames": nicknames, "cursor": 0, "rows": args.rows,
+    }
+
+
+sqlite_suite = BenchmarkSuite("sqlite", _setup_sqlite)
+
+
+def _next_nickname(ctx) -> str:
+    ctx["cursor"] = (ctx["cursor"] + 1) % len(ctx["nicknames"])
+    return ctx["nicknames"][ctx["cursor"]]
+
+
+@sqlite_suite.case("nickname_lookup")
+def _nickname_lookup(ctx):
+    ctx["conn"].execute(f'SELECT * FROM "{ctx["table"]}" WHERE Nickname = ?', (_next_nickname(ctx),)).fetchall()
+
+
+@sqlite_suite.case("search_nicknames")
+def _search_nicknames(ctx):
+    ctx["db"].search_nicknames(ctx["conn"], ctx["table"], _next_nickname(ctx)[:-1], limit=5)
+
+
+@sqlite_suite.case("get_rank_lines")
+def _rank_lines(ctx):
+    ctx["db"].get_rank_lines(ctx["conn"], ctx["table"])
+
+
+@sqlite_suite.case("get_player_history")
+def _player_history(ctx):
+    ctx["db"].get_player_history(ctx["conn"], _next_nickname(ctx))
+
+
+@sqlite_suite.case("compute_table_analytics")
+def _table_analytics(ctx):
+    ctx["analytics"].compute_table_analytics(ctx["conn"], ctx["table"])
+
+
+# ----------------------------------------------------------------------
+# arona_ai_helper
+# ----------------------------------------------------------------------
+
+def _setup_aronaai(args):
+    import arona_ai_helper as helper
+    if args.recording:
+        recording = fixtures.load_aronaai_recording(Path(args.recording))
+    else:
+        recording = fixtures.make_aronaai_recording()
+    maps = helper.aggregate_usage(
+        recording["search_raid"], recording["search_eraid"], recording["raid_map"], recording["eraid_map"],
+        recording["std_info"], fixtures.SUMMARY_RANK,
+    )
+    return {"helper": helper, "recording": recording, "maps": maps}
+
+
+aronaai_suite = BenchmarkSuite("aronaai", _setup_aronaai)
+
+
+@aronaai_suite.case("aggregate_usage")
+def _aggregate_usage(ctx):
+    r = ctx["recording"]
+    ctx["helper"].aggregate_usage(r["search_raid"], r["search_eraid"], r["raid_map"], r["eraid_map"],
+                                  r["std_info"], fixtures.SUMMARY_RANK)
+
+
+@aronaai_suite.case("build_workbook")
+def _build_workbook(ctx):
+    student_map, rank_map, time_map = ctx["maps"]
+    wb = ctx["helper"].build_workbook(student_map, rank_map, time_map, fixtures.SUMMARY_RANK)
+    wb.save(io.BytesIO())
+
+
+SUITES = [statistics_suite, image_suite, rankline_suite, sqlite_suite, aronaai_suite]
+
+
+# ----------------------------------------------------------------------
+# 執行與比較
+# ----------------------------------------------------------------------
+
+def git_revision() -> str | None:
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        return f"{sha}-dirty" if dirty else sha
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> dict:
+    results, skipped = {}, {}
+    for suite in SUITES:
+        if args.only and suite.name not in args.only:
+            continue
+        try:
+            context = suite.setup(args)
+        except SkipBenchmark as e:
+            skipped[suite.name] = str(e)
+            print(f"⏭ {suite.name}: 略過 ({e})")
+            continue
+
+        for case_name, func in suite.cases:
+            name = f"{suite.name}.{case_name}"
+            iterations = max(1, args.iterations // 10) if suite.name == "image" else args.iterations
+            results[name] = measure(func, context, iterations, args.warmup)
+            r = results[name]
+            print(f"{name:<45} p50 {r['p50_ms']:>10.3f} ms  p95 {r['p95_ms']:>10.3f} ms  "
+                  f"{r['ops_per_sec']:>10.1f} ops/s  peak {r['peak_kib']:>10.1f} KiB")
+
+        if "conn" in context:
+            context["conn"].close()
+
+    return {
+        "revision": git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {"iterations": args.iterations, "warmup": args.warmup, "rows": args.rows,
+                       "rankline_scores": args.rankline_scores, "recording": args.recording},
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """列出 p50 變慢超過 threshold 的項目，回傳 [(名稱, 舊 p50, 新 p50, 變化比例)]"""
+    regressions = []
+    print(f"\n與 {baseline.get('revision') or '基準'} 比較 (p50)：")
+    for name, result in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if old is None:
+            print(f"  {name:<45} (新項目)")
+            continue
+        change = (result["p50_ms"] - old["p50_ms"]) / old["p50_ms"] if old["p50_ms"] > 0 else 0.0
+        flag = "⚠" if change > threshold else " "
+        print(f"{flag} {name:<45} {old['p50_ms']:>10.3f} -> {result['p50_ms']:>10.3f} ms ({change:+.1%})")
+        if change > threshold:
+            regressions.append((name, old["p50_ms"], result["p50_ms"], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="核心資料處理流程的效能測試")
+    parser.add_argument("--iterations", type=int, default=20, help="每個項目的計時次數")
+    parser.add_argument("--warmup", type=int, default=2, help="計時前的預熱次數")
+    parser.add_argument("--rows", type=int, default=100_000, help="合成排行榜的筆數")
+    parser.add_argument("--rankline-scores", type=int, default=10_000, help="分數計算測試的分數筆數")
+    parser.add_argument("--recording", help="錄下的 arona.ai JSON (預設使用合成資料)")
+    parser.add_argument("--only", nargs="+", choices=[s.name for s in SUITES], help="只執行指定項目")
+    parser.add_argument("--output", help="結果 JSON 路徑 (預設 benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="與先前的結果 JSON 比較")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="視為退化的 p50 變慢比例")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    report = run(args)
+
+    if args.output:
+        output = Path(args.output)
+    else:
+        # 不在 git 工作目錄時改以時間命名
+        output = RESULTS_DIR / f"{report['revision'] or datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 結果已寫入 {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,35 @@
 # bot_refactored.py
-from pathlib import Path
+# 最先匯入：以匯入時間作為啟動計時的起點
+from StartupProfile import profile as startup_profile
 import discord
-from discord.ext import commands
 import os
-import json
 import asyncio
+import logging
+import GatewayConfig
+import PerfMonitor
+import Sharding
+from Services import services
+# 匯入時登記服務 "data"；pandas、PIL 與 data.xlsx 的解析延到登入後的預熱
+import DataStore
+
+logger = logging.getLogger(__name__)
+
+# --- 日誌設定 ---
+def setup_logging():
+    """
+    設定根 logger。等級由環境變數 LOG_LEVEL 決定 (預設 INFO)，
+    設為 DEBUG 可顯示各模組的除錯訊息；未啟用的等級不會格式化訊息。
+    """
+    level_name = os.environ.get("LOG_LEVEL", "INFO").upper()
+    level = getattr(logging, level_name, logging.INFO)
+    logging.basicConfig(
+        level=level,
+        # 多行程部署時於每行加上 worker 編號
+        format="%(asctime)s [%(levelname)s] " + (f"[w{Sharding.WORKER_ID}] " if Sharding.is_sharded() else "") + "%(name)s: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    # discord.py 本身的除錯訊息 (gateway 事件) 量很大，最低只顯示到 INFO
+    logging.getLogger("discord").setLevel(max(level, logging.INFO))
 
 # --- 設定檔載入 ---
 def load_config():
@@ -16,72 +41,74 @@ def load_config():
         with open("OWNER_ID.txt", "r") as owner_file:
             config['OWNER_ID'] = int(owner_file.read().strip())
     except FileNotFoundError as e:
-        print(f"❌ 錯誤：找不到設定檔 {e.filename}，請確認文件存在！")
+        logger.error("❌ 錯誤：找不到設定檔 %s，請確認文件存在！", e.filename)
         exit(1)
     except (ValueError, TypeError):
-        print("❌ 錯誤：OWNER_ID.txt 的內容格式不正確。")
+        logger.error("❌ 錯誤：OWNER_ID.txt 的內容格式不正確。")
         exit(1)
     return config
 
-# --- 資料檔載入 ---
-def load_data_files():
-
-    data = {}
-    JSON_DIR = Path(__file__).parent / "Json"
-    JSON_DIR.mkdir(parents=True, exist_ok=True)
-    STUDENTS_JSON = JSON_DIR / "students.json"
-    ID_NAME_MAPPING_JSON = JSON_DIR / "id_name_mapping.json"
-    files_to_load = {
-        STUDENTS_JSON : "all_student_data",
-        ID_NAME_MAPPING_JSON : "id_name_mapping"
-    }
-    for file_path, data_key in files_to_load.items():
-        if os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as file:
-                data[data_key] = json.load(file)
-            print(f"✅ 成功載入 {file_path}")
-        else:
-            print(f"⚠ 警告：找不到 {file_path}，部分功能可能無法運作。")
-            data[data_key] = {}
-    return data
-
 async def main():
+    setup_logging()
     config = load_config()
-    data_files = load_data_files()
 
     if not os.path.exists("data.xlsx"):
-        print("❌ 錯誤：找不到 `data.xlsx`，請確認檔案已生成！")
+        logger.error("❌ 錯誤：找不到 `data.xlsx`，請確認檔案已生成！")
         exit(1)
-
-    intents = discord.Intents.all()
-    bot = commands.Bot(command_prefix="!", intents=intents)
+    # intents 與成員/訊息快取依 BOT_INTENTS 決定 (預設 minimal)
+    options = GatewayConfig.client_options()
+    logger.info("📡 gateway intents 模式: %s (intents 值 %s)", GatewayConfig.BOT_INTENTS, options["intents"].value)
+    # 由 launcher.py 啟動時為負責部分 shard 的 AutoShardedBot，否則為單一行程的 commands.Bot
+    bot = Sharding.create_bot(tree_cls=PerfMonitor.InstrumentedCommandTree, **options)
+    if Sharding.is_sharded():
+        logger.info("🧩 worker %s 負責 shard %s (共 %s 個)", Sharding.WORKER_ID, Sharding.SHARD_IDS, Sharding.SHARD_COUNT)
 
     bot.owner_id = config['OWNER_ID']
-    bot.all_student_data = data_files.get('all_student_data', {})
-    bot.id_name_mapping = data_files.get('id_name_mapping', {})
+    # 各 Cog 共用的服務 (Cog 載入/卸載時以 services.acquire/release 管理)
+    bot.services = services
+    startup_profile.checkpoint("imports")
 
     cogs_dir = "cogs"
     for filename in os.listdir(cogs_dir):
         if filename.endswith(".py") and not filename.startswith("__"):
             try:
-                await bot.load_extension(f"{cogs_dir}.{filename[:-3]}")
-                print(f"🔩 已載入 Cog: {filename}")
+                with startup_profile.phase(f"cog:{filename[:-3]}"):
+                    await bot.load_extension(f"{cogs_dir}.{filename[:-3]}")
+                logger.info("🔩 已載入 Cog: %s", filename)
             except Exception as e:
-                print(f"❌ 載入 Cog {filename} 失敗: {e.__class__.__name__} - {e}")
+                logger.error("❌ 載入 Cog %s 失敗: %s - %s", filename, e.__class__.__name__, e)
+    startup_profile.checkpoint("cogs")
+
+    async def warmup():
+        """登入後於背景初始化較重的服務 (data.xlsx 與繪圖素材)，之後輸出啟動耗時報告"""
+        await services.warmup(startup_profile)
+        if Sharding.is_sharded():
+            startup_profile.finish(worker=Sharding.WORKER_ID, shards=Sharding.SHARD_IDS)
+        else:
+            startup_profile.finish()
 
     @bot.event
     async def on_ready():
-        print(f'✅ 已登入：{bot.user}')
+        logger.info('✅ 已登入：%s', bot.user)
+        if startup_profile.at("ready") is None:
+            startup_profile.checkpoint("ready")
+            bot.warmup_task = asyncio.create_task(warmup(), name="warmup")
         await bot.change_presence(status=discord.Status.online)
+        if not Sharding.is_primary():
+            return  # 斜線指令是全域的，只需由主要 worker 同步一次
         try:
-            synced = await bot.tree.sync()
-            print(f"🔄 成功同步 {len(synced)} 個應用程式指令")
+            with startup_profile.phase("tree_sync"):
+                synced = await bot.tree.sync()
+            logger.info("🔄 成功同步 %s 個應用程式指令", len(synced))
         except Exception as e:
-            print(f"❌ 同步指令失敗: {e}")
+            logger.error("❌ 同步指令失敗: %s", e)
 
     # --- 啟動 Bot ---
-    async with bot:
-        await bot.start(config['TOKEN'])
+    try:
+        async with bot:
+            await bot.start(config['TOKEN'])
+    finally:
+        services.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
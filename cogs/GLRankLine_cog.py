@@ -1,17 +1,21 @@
 from pathlib import Path
-import sys
 import discord
 from discord.ext import commands, tasks  
 from discord import app_commands
 import sqlite3
+import asyncio
+import logging
 import AronaRankLine as arona
+import PerfMonitor
+import RaidAnalytics
+from Services import services
+import Sharding
+from RaidDatabase import (
+    DB_FILE, ARMOR_COLUMNS, RANK_LINE_RANKS, list_season_tables, parse_table_name,
+    sync_derived_tables, get_player_history, get_rank_lines, materialize_rank_lines, search_nicknames
+)
 
-
-DB_Path = Path(__file__).parent.parent / "db"
-LINUX_DB = DB_Path / "Linux" / "RaidDatabase.db"
-WINDOWS_DB = DB_Path / "Windows" / "RaidDatabase.db"
-
-DB_FILE = LINUX_DB if sys.platform.startswith("linux") else WINDOWS_DB
+logger = logging.getLogger(__name__)
 
 # Loading PNG (Boss Icons)
 PNG_PATH = Path(__file__).parent.parent / "PNG"
@@ -41,25 +45,12 @@ BOSS_ICON_MAPPING = {
     "EN0006": RAID_PATH / "EN0006.png"
 }
 
-BOSS_RAID_ID = { "薇娜": 1, "赫賽德": 2, "白&黑": 3, "耶羅尼姆斯": 4, "KAITEN FX Mk.0": 5, "佩洛洛吉拉": 6, "霍德": 7, "高茲": 8, "葛利果": 9, "氣墊船": 10, "黑影": 11, "Geburah": 12 }
-BOSS_NAME_MAP = {
-    "Binah"  : "薇娜",
-    "Chesed" : "赫賽德",
-    "EN0005" : "葛利果",
-    "EN0010"  : "Geburah",
-    "Goz"    : "高茲",
-    "Hieronymus" : "耶羅尼姆斯",
-    "HOD"    : "霍德",
-    "KaitenFxMk0" : "KAITEN FX Mk.0",
-    "Perorozilla" : "佩洛洛吉拉",
-    "ShiroKuro" : "白&黑",
-    "HoverCraft" : "氣墊船",
-    "EN0006" : "黑影"
-}
-
 STUDENT_IMAGE_PATH = Path(__file__).parent.parent / "studentsimage"
 
 
+def format_used_time(used_time: float | None) -> str:
+    """格式化預先計算的用時，無法計算時顯示「計算錯誤」"""
+    return arona.format_time(used_time) if used_time is not None else "計算錯誤"
 
 
 class GLRankLineCog(commands.Cog):
@@ -67,28 +58,34 @@ class GLRankLineCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.db_path = DB_FILE
+        self.db = None
+        self.table_list = []
+
+    async def cog_load(self):
+        services.acquire(self, "db")
+        self.db = services.resolve("db")
         self.table_list = self._get_db_tables()
         self._create_warnings_table()
-        self.check_rank_warnings.start()
+        if Sharding.is_primary():  # 多行程部署時只由主要 worker 發送提醒，避免重複
+            self.check_rank_warnings.start()
 
     def cog_unload(self):
         self.check_rank_warnings.cancel()
+        services.release(self)
 
     def _get_db_tables(self) -> list:
         if not self.db_path.exists(): return []
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'S%' ORDER BY name DESC")
-                return [row[0] for row in cursor.fetchall()]
+            with self.db.connection() as conn:
+                return list_season_tables(conn)
         except sqlite3.Error as e:
-            print(f"SQLite 錯誤: {e}")
+            logger.error("SQLite 錯誤: %s", e)
             return []
 
     def _create_warnings_table(self):
         """建立用於儲存排名提醒的資料表"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS RankWarnings (
@@ -101,14 +98,21 @@ class GLRankLineCog(commands.Cog):
                 """)
                 conn.commit()
         except sqlite3.Error as e:
-            print(f"建立 RankWarnings 資料表時發生錯誤: {e}")
+            logger.error("建立 RankWarnings 資料表時發生錯誤: %s", e)
 
     @tasks.loop(minutes=5.0)
     async def check_rank_warnings(self):
         """背景任務：每5分鐘檢查一次排名"""
-        print("[INFO] 正在執行排名提醒檢查...")
+        logger.debug("正在執行排名提醒檢查...")
+        # 重新讀取資料表列表，讓 RaidDatabase.py 新匯入的賽季不需重啟即可使用
+        self.table_list = self._get_db_tables()
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            # 為新加入的賽季資料表補上跨賽季玩家索引、分數線與暱稱搜尋索引
+            await asyncio.to_thread(sync_derived_tables, self.db_path)
+        except sqlite3.Error as e:
+            logger.error("更新玩家歷史索引/分數線/暱稱索引時資料庫出錯: %s", e)
+        try:
+            with self.db.connection() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
@@ -131,7 +135,7 @@ class GLRankLineCog(commands.Cog):
                             if 0 < (current_rank - target_rank) <= 100:
                                 user = await self.bot.fetch_user(warning['DiscordUserId'])
                                 if user:
-                                    print(f"[INFO] 玩家 {user.name} ({warning['AccountId']}) 排名 {current_rank} 已接近目標 {target_rank}，準備發送提醒。")
+                                    logger.info("玩家 %s (%s) 排名 %s 已接近目標 %s，準備發送提醒。", user.name, warning['AccountId'], current_rank, target_rank)
                                     await user.send(f"**【總力戰排名提醒】**\n<@{warning['DiscordUserId']}> 您的排名 **{current_rank}** 快到目標 **{target_rank}** 了，請準備卷分！")
                                     
                                     # 更新資料庫，標記為已通知
@@ -139,12 +143,12 @@ class GLRankLineCog(commands.Cog):
                                     update_cursor.execute("UPDATE RankWarnings SET Notified = 1 WHERE DiscordUserId = ?", (warning['DiscordUserId'],))
                                     conn.commit()
                     except Exception as e:
-                        print(f"處理單個排名提醒時出錯 (DiscordUserId: {warning['DiscordUserId']}): {e}")
+                        logger.error("處理單個排名提醒時出錯 (DiscordUserId: %s): %s", warning['DiscordUserId'], e)
 
         except sqlite3.Error as e:
-            print(f"檢查排名提醒時資料庫出錯: {e}")
+            logger.error("檢查排名提醒時資料庫出錯: %s", e)
         except Exception as e:
-            print(f"執行排名提醒任務時發生未知錯誤: {e}")
+            logger.error("執行排名提醒任務時發生未知錯誤: %s", e)
 
     @check_rank_warnings.before_loop
     async def before_check_rank_warnings(self):
@@ -163,7 +167,7 @@ class GLRankLineCog(commands.Cog):
         latest_table = self.table_list[0]
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(f'SELECT Rank FROM "{latest_table}" WHERE AccountId = ?', (uid,))
                 rank_row = cursor.fetchone()
@@ -195,7 +199,7 @@ class GLRankLineCog(commands.Cog):
     async def glwarnrankclear(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.db.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("DELETE FROM RankWarnings WHERE DiscordUserId = ?", (interaction.user.id,))
                 conn.commit()
@@ -226,10 +230,10 @@ class GLRankLineCog(commands.Cog):
             embed.set_thumbnail(url=f"attachment://{char_id}.webp")
         
         field_value = f"**總分: {data['BestRankingPoint']:,}**\n"
-        mode = "3min" if raid_id in [1, 5] else "4min"
+        mode = arona.get_mode(raid_id)
 
         if is_eliminate:
-            armor_cols = [c for c in ['LightArmor', 'HeavyArmor', 'Unarmed', 'ElasticArmor'] if c in columns]
+            armor_cols = [c for c in ARMOR_COLUMNS if c in columns]
             for armor in armor_cols:
                 armor_score = data[armor]
                 if not armor_score or armor_score == 0: continue
@@ -268,11 +272,142 @@ class GLRankLineCog(commands.Cog):
         view = GLRankUserView(self, nickname)
         await interaction.response.send_message(f"正在查詢玩家 **{nickname}** 的資訊，請選擇一個賽季：", view=view, ephemeral=True)
 
+    @glrankuser.autocomplete("nickname")
+    async def glrankuser_nickname_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        """以最新賽季的暱稱索引提供模糊搜尋候選"""
+        if not self.table_list or not current.strip():
+            return []
+        try:
+            with self.db.connection() as conn:
+                matches = search_nicknames(conn, self.table_list[0], current, limit=25)
+        except sqlite3.Error:
+            return []
+        return [app_commands.Choice(name=nickname[:100], value=nickname[:100]) for nickname, _similarity in matches]
+
+    @app_commands.command(name="glanalytics", description="顯示台服總力/大決戰的分數百分位、難度分布與用時分布")
+    @app_commands.describe(
+        top_percent="查詢前 X% 的分數線 (可選，例如 0.5)",
+        difficulty="顯示用時分布的難度 (可選，預設為最高難度)",
+        under="統計用時低於此時間的人數 (可選，格式 分:秒，例如 2:30)"
+    )
+    @app_commands.choices(difficulty=[
+        app_commands.Choice(name=d, value=d) for d in ["LUNATIC", "TORMENT", "INSANE", "EXTREME", "HARDCORE"]
+    ])
+    async def glanalytics(self, interaction: discord.Interaction, top_percent: float = None, difficulty: str = None, under: str = None):
+        if not self.table_list:
+            await interaction.response.send_message("錯誤：找不到任何總力戰資料庫或資料表。", ephemeral=True)
+            return
+        under_seconds = None
+        if under:
+            try:
+                minutes, seconds = under.split(":")
+                under_seconds = int(minutes) * 60 + float(seconds)
+            except ValueError:
+                await interaction.response.send_message("⚠ `under` 格式錯誤，請使用 分:秒，例如 `2:30`。", ephemeral=True)
+                return
+        options = {"top_percent": top_percent, "difficulty": difficulty, "under_seconds": under_seconds}
+        view = GLAnalyticsView(self, options)
+        await interaction.response.send_message("請選擇您想分析的總力戰或大決戰賽季：", view=view, ephemeral=True)
+
+    def _create_analytics_embed(self, analytics: RaidAnalytics.TableAnalytics, top_percent: float | None,
+                                difficulty: str | None, under_seconds: float | None) -> discord.Embed:
+        """(輔助函式) 將分析結果整理為 Embed"""
+        season_display, _internal_boss_key, display_boss_name, _raid_id = parse_table_name(analytics.table_name)
+        embed = discord.Embed(
+            title=f"S{season_display} - {display_boss_name} 分數分析",
+            description=f"共 **{analytics.player_count:,}** 位玩家",
+            color=discord.Color.teal()
+        )
+
+        percents = list(RaidAnalytics.DEFAULT_TOP_PERCENTS)
+        if top_percent is not None and top_percent not in percents:
+            percents = sorted(percents + [top_percent])
+        percentile_lines = []
+        for percent in percents:
+            score = analytics.score_at_top_percent(percent)
+            if score is not None:
+                marker = " ◀" if percent == top_percent else ""
+                percentile_lines.append(f"前 {percent:g}%: **{score:,}**{marker}")
+        embed.add_field(name="總分百分位", value="\n".join(percentile_lines) or "無資料", inline=False)
+
+        for column in analytics.column_stats:
+            counts = analytics.difficulty_counts(column)
+            if not counts:
+                continue
+            lines = [f"{d}: {c:,} 人" for d, c in counts.items()]
+
+            target = difficulty if difficulty in counts else next(iter(counts))
+            if under_seconds is not None:
+                cleared = analytics.count_cleared_under(column, target, under_seconds)
+                lines.append(f"{target} 用時 < {arona.format_time(under_seconds)[:5]}: **{cleared:,}** 人")
+
+            histogram = [bucket for bucket in analytics.time_histogram(column, target) if bucket[2] > 0]
+            if histogram:
+                peak = max(c for _start, _end, c in histogram)
+                lines.append(f"**{target} 用時分布**")
+                for start, end, count in histogram:
+                    bar = "█" * max(1, round(count / peak * 10))
+                    lines.append(f"`{start // 60}:{start % 60:02d}-{end // 60}:{end % 60:02d}` {bar} {count:,}")
+
+            name = "難度分布" if column == "BestRankingPoint" else f"{column} 難度分布"
+            embed.add_field(name=name, value="\n".join(lines)[:1024], inline=False)
+        return embed
+
+    @app_commands.command(name="glrankhistory", description="顯示玩家在所有總力戰/大決戰賽季的排名紀錄")
+    async def glrankhistory(self, interaction: discord.Interaction, nickname: str):
+        await interaction.response.defer()
+        PerfMonitor.mark(interaction, "defer")
+        try:
+            with self.db.connection() as conn:
+                history = get_player_history(conn, nickname)
+        except sqlite3.Error as e:
+            await interaction.followup.send(f"處理您的請求時資料庫發生錯誤：{e}", ephemeral=True)
+            return
+
+        if not history:
+            await interaction.followup.send(f"在所有賽季中找不到玩家 **{nickname}** 的排名資料。")
+            return
+
+        PerfMonitor.mark(interaction, "data")
+
+        # 依 AccountId 分組，每位玩家一個 Embed (Discord 單則訊息最多 10 個 Embed)
+        history_by_account = {}
+        for account_id, row_nickname, season_table, _season, rank, best_ranking_point in history:
+            history_by_account.setdefault(account_id, []).append((row_nickname, season_table, rank, best_ranking_point))
+
+        embeds = []
+        for account_id, rows in list(history_by_account.items())[:10]:
+            lines = []
+            for row_nickname, season_table, rank, best_ranking_point in rows[:30]:
+                season_display, _internal_boss_key, display_boss_name, _raid_id = parse_table_name(season_table)
+                # 快照中可能有名次但沒有分數的紀錄
+                score = f"{best_ranking_point:,}" if best_ranking_point is not None else "無分數"
+                line = f"**S{season_display} {display_boss_name}** — 第 {rank} 名 ({score})"
+                if row_nickname != nickname:
+                    line += f" `{row_nickname}`"
+                lines.append(line)
+            if len(rows) > 30:
+                lines.append(f"...(另有 {len(rows) - 30} 個賽季)")
+            embed = discord.Embed(
+                title=f"{nickname} 的歷史排名",
+                description="\n".join(lines),
+                color=discord.Color.gold()
+            )
+            embed.set_footer(text=f"UID: {account_id}・共 {len(rows)} 個賽季")
+            embeds.append(embed)
+
+        content = None
+        if len(history_by_account) > 10:
+            content = f"找到了 {len(history_by_account)} 位名為 **{nickname}** 的玩家，僅顯示前 10 位。"
+        PerfMonitor.mark(interaction, "render")
+        await interaction.followup.send(content=content, embeds=embeds)
+        PerfMonitor.mark(interaction, "send")
+
 
 async def setup(bot: commands.Bot):
     """用於將此 Cog 加入 Bot 的函式"""
     await bot.add_cog(GLRankLineCog(bot))
-    print("GLRankLineCog has been loaded.")
+    logger.info("GLRankLineCog has been loaded.")
 
 class PaginatedUserView(discord.ui.View):
     def __init__(self, all_user_data: list, cog: GLRankLineCog, context: dict, timeout=180):
@@ -320,22 +455,19 @@ class GLRankUserSelect(discord.ui.Select):
         super().__init__(placeholder="選擇一個賽季...", min_values=1, max_values=1, options=options[:25])
 
     async def callback(self, interaction: discord.Interaction):
+        PerfMonitor.start(interaction, "glrankuser/select")
         await interaction.response.defer(ephemeral=False, thinking=True)
+        PerfMonitor.mark(interaction, "defer")
         table_name = self.values[0]
 
         try:
-            with sqlite3.connect(self.cog.db_path) as conn:
+            with self.cog.db.connection() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 cursor.execute(f'PRAGMA table_info("{table_name}")')
                 columns = [row[1] for row in cursor.fetchall()]
-                is_eliminate = any(armor in columns for armor in ['LightArmor', 'HeavyArmor', 'Unarmed', 'ElasticArmor'])
-                parts = table_name.split('_', 1)
-                boss_name_from_table = parts[1]
-                season_display = int(parts[0].replace('S', ''))
-                internal_boss_key = next((key for key in BOSS_NAME_MAP.keys() if key.lower() in boss_name_from_table.lower()), None)
-                display_boss_name = BOSS_NAME_MAP.get(internal_boss_key, boss_name_from_table)
-                raid_id = BOSS_RAID_ID.get(display_boss_name, 0)
+                is_eliminate = any(armor in columns for armor in ARMOR_COLUMNS)
+                season_display, _internal_boss_key, display_boss_name, raid_id = parse_table_name(table_name)
                 
                 context = {
                     "season_display": season_display, "display_boss_name": display_boss_name,
@@ -346,9 +478,14 @@ class GLRankUserSelect(discord.ui.Select):
                 cursor.execute(query, (self.nickname,))
                 all_data = cursor.fetchall()
                 num_results = len(all_data)
+                PerfMonitor.mark(interaction, "data")
 
                 if num_results == 0:
-                    await interaction.followup.send(f"在賽季 **{table_name}** 中找不到玩家 **{self.nickname}** 的排名資料。")
+                    message = f"在賽季 **{table_name}** 中找不到玩家 **{self.nickname}** 的排名資料。"
+                    suggestions = [nickname for nickname, _similarity in search_nicknames(conn, table_name, self.nickname, limit=5)]
+                    if suggestions:
+                        message += "\n您是不是要找：" + "、".join(f"**{nickname}**" for nickname in suggestions)
+                    await interaction.followup.send(message)
                 elif num_results == 1:
                     embed, student_file = await self.cog._create_user_rank_embed(all_data[0], **context)
                     await interaction.followup.send(embed=embed, file=student_file)
@@ -360,9 +497,12 @@ class GLRankUserSelect(discord.ui.Select):
                         f"找到了 {num_results} 位名為 **{self.nickname}** 的玩家，正在顯示第 1 位:",
                         embed=first_embed, file=first_file, view=view
                     )
+                PerfMonitor.mark(interaction, "send")
         except Exception as e:
+            PerfMonitor.finish(interaction, failed=True)
             await interaction.followup.send(f"處理您的請求時發生未預期的錯誤：{e}", ephemeral=True)
-            print(f"Callback 執行 '{table_name}' 時出錯: {e}")
+            logger.error("Callback 執行 '%s' 時出錯: %s", table_name, e)
+        PerfMonitor.finish(interaction)
 
 class GLRankUserView(discord.ui.View):
     def __init__(self, cog: GLRankLineCog, nickname: str):
@@ -375,78 +515,93 @@ class GLRankLineSelect(discord.ui.Select):
         options = [discord.SelectOption(label=table, description=f"查詢 {table} 的分數線") for table in cog.table_list]
         super().__init__(placeholder="選擇一個賽季...", min_values=1, max_values=1, options=options[:25])
     async def callback(self, interaction: discord.Interaction):
+        PerfMonitor.start(interaction, "glrainline/select")
         await interaction.response.defer()
+        PerfMonitor.mark(interaction, "defer")
         table_name = self.values[0]
         try:
-            with sqlite3.connect(self.cog.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                cursor.execute(f'PRAGMA table_info("{table_name}")')
-                columns = [row[1] for row in cursor.fetchall()]
-                is_eliminate = any(armor in columns for armor in ['LightArmor', 'HeavyArmor', 'Unarmed', 'ElasticArmor'])
-                
-                parts = table_name.split('_', 1)
-                boss_name_from_table = parts[1]
-                season_display = int(parts[0].replace('S', ''))
-                
-                internal_boss_key = next((key for key in BOSS_NAME_MAP.keys() if key.lower() in boss_name_from_table.lower()), None)
-                display_boss_name = BOSS_NAME_MAP.get(internal_boss_key, boss_name_from_table)
-                raid_id = BOSS_RAID_ID.get(display_boss_name, 0)
-                
-                ranks_to_query = [1, 1000, 5000, 10001, 50001]
-                query = f'SELECT * FROM "{table_name}" WHERE Rank IN ({",".join(map(str, ranks_to_query))})'
-                cursor.execute(query)
-                db_results = {row['Rank']: row for row in cursor.fetchall()}
-
-                raid_type_str = '大決戰' if is_eliminate else '總力戰'
-                embed_title = f"S{season_display} - {display_boss_name} {raid_type_str} 分數線"
-                embed_color = discord.Color.red() if is_eliminate else discord.Color.blue()
-                embed = discord.Embed(title=embed_title, color=embed_color)
-
-                boss_icon_file = None
-                if internal_boss_key and BOSS_ICON_MAPPING.get(internal_boss_key, "").exists():
-                    boss_icon_file = discord.File(BOSS_ICON_MAPPING[internal_boss_key], filename=BOSS_ICON_MAPPING[internal_boss_key].name)
-                    embed.set_thumbnail(url=f"attachment://{BOSS_ICON_MAPPING[internal_boss_key].name}")
-
-                for rank in ranks_to_query:
-                    data = db_results.get(rank)
-                    if not data:
-                        embed.add_field(name=f"第 {rank} 名", value="無資料", inline=False)
-                        continue
-
-                    emoji = TIER_MAPPING.get(rank, "")  # Get emoji if rank matches, else empty string
-                    field_name = f"{emoji} 第 {rank} 名".strip() # .strip() removes leading space if no emoji
-                    
-                    field_value = f"**{data['Nickname']}**\n總分: **{data['BestRankingPoint']:,}**\n"
-                    mode = "3min" if raid_id in [1, 5] else "4min"
-
-                    if is_eliminate:
-                        armor_cols = [c for c in ['LightArmor', 'HeavyArmor', 'Unarmed', 'ElasticArmor'] if c in columns]
-                        for armor in armor_cols:
-                            armor_score = data[armor]
-                            if not armor_score or armor_score == 0: continue
-                            difficulty = arona.determine_difficulty(int(armor_score), mode)
-                            try:
-                                used_time_sec = arona.calculate_used_time(int(armor_score), difficulty, raid_id)
-                                field_value += f"> **{armor}**: {armor_score:,} ({difficulty} - {arona.format_time(used_time_sec)})\n"
-                            except Exception:
-                                field_value += f"> **{armor}**: {armor_score:,} ({difficulty} - 計算錯誤)\n"
-                    else:
-                        difficulty = arona.determine_difficulty(int(data['BestRankingPoint']), mode)
-                        try:
-                            used_time_sec = arona.calculate_used_time(int(data['BestRankingPoint']), difficulty, raid_id)
-                            field_value += f"難度: **{difficulty}**\n用時: **{arona.format_time(used_time_sec)}**"
-                        except Exception:
-                             field_value += f"難度: **{difficulty}**\n用時: **計算錯誤**"
-                    
-                    embed.add_field(name=field_name, value=field_value, inline=False)
-            
-                await interaction.followup.send(embed=embed, file=boss_icon_file)
+            with self.cog.db.connection() as conn:
+                rank_lines = get_rank_lines(conn, table_name)
+                if rank_lines is None:
+                    # 尚未預先計算 (例如手動加入的資料表)，於此計算一次後寫入 RankLines
+                    materialize_rank_lines(conn, table_name)
+                    conn.commit()
+                    rank_lines = get_rank_lines(conn, table_name)
+            is_eliminate, lines = rank_lines
+            PerfMonitor.mark(interaction, "data")
+            season_display, internal_boss_key, display_boss_name, _raid_id = parse_table_name(table_name)
+
+            raid_type_str = '大決戰' if is_eliminate else '總力戰'
+            embed_title = f"S{season_display} - {display_boss_name} {raid_type_str} 分數線"
+            embed_color = discord.Color.red() if is_eliminate else discord.Color.blue()
+            embed = discord.Embed(title=embed_title, color=embed_color)
+
+            boss_icon_file = None
+            if internal_boss_key and BOSS_ICON_MAPPING.get(internal_boss_key, "").exists():
+                boss_icon_file = discord.File(BOSS_ICON_MAPPING[internal_boss_key], filename=BOSS_ICON_MAPPING[internal_boss_key].name)
+                embed.set_thumbnail(url=f"attachment://{BOSS_ICON_MAPPING[internal_boss_key].name}")
+
+            for rank in RANK_LINE_RANKS:
+                details = lines.get(rank)
+                if not details:
+                    embed.add_field(name=f"第 {rank} 名", value="無資料", inline=False)
+                    continue
+
+                emoji = TIER_MAPPING.get(rank, "")  # Get emoji if rank matches, else empty string
+                field_name = f"{emoji} 第 {rank} 名".strip() # .strip() removes leading space if no emoji
+
+                # 第一列固定為總分 (ColumnOrder = 0)，大決戰其後為各裝甲分數
+                _column, nickname, best_ranking_point, difficulty, used_time = details[0]
+                field_value = f"**{nickname}**\n總分: **{best_ranking_point:,}**\n"
+
+                if is_eliminate:
+                    for armor, _nickname, armor_score, difficulty, used_time in details[1:]:
+                        field_value += f"> **{armor}**: {armor_score:,} ({difficulty} - {format_used_time(used_time)})\n"
+                else:
+                    field_value += f"難度: **{difficulty}**\n用時: **{format_used_time(used_time)}**"
+
+                embed.add_field(name=field_name, value=field_value, inline=False)
+            PerfMonitor.mark(interaction, "render")
+
+            await interaction.followup.send(embed=embed, file=boss_icon_file)
+            PerfMonitor.mark(interaction, "send")
         except Exception as e:
+            PerfMonitor.finish(interaction, failed=True)
             await interaction.followup.send(f"處理您的請求時發生未預期的錯誤：{e}")
-            print(f"Callback 執行 '{table_name}' 時出錯: {e}")
+            logger.error("Callback 執行 '%s' 時出錯: %s", table_name, e)
+        PerfMonitor.finish(interaction)
 
 class GLRankLineView(discord.ui.View):
     def __init__(self, cog: GLRankLineCog):
         super().__init__(timeout=300)
-        self.add_item(GLRankLineSelect(cog))
\ No newline at end of file
+        self.add_item(GLRankLineSelect(cog))
+
+class GLAnalyticsSelect(discord.ui.Select):
+    def __init__(self, cog: GLRankLineCog, analytics_options: dict):
+        self.cog = cog
+        self.analytics_options = analytics_options
+        options = [discord.SelectOption(label=table, description=f"分析 {table} 的分數分布") for table in cog.table_list]
+        super().__init__(placeholder="選擇一個賽季...", min_values=1, max_values=1, options=options[:25])
+
+    async def callback(self, interaction: discord.Interaction):
+        PerfMonitor.start(interaction, "glanalytics/select")
+        await interaction.response.defer()
+        PerfMonitor.mark(interaction, "defer")
+        table_name = self.values[0]
+        try:
+            analytics = await asyncio.to_thread(RaidAnalytics.get_table_analytics, self.cog.db, table_name)
+            PerfMonitor.mark(interaction, "data")
+            embed = self.cog._create_analytics_embed(analytics, **self.analytics_options)
+            PerfMonitor.mark(interaction, "render")
+            await interaction.followup.send(embed=embed)
+            PerfMonitor.mark(interaction, "send")
+        except Exception as e:
+            PerfMonitor.finish(interaction, failed=True)
+            await interaction.followup.send(f"處理您的請求時發生未預期的錯誤：{e}")
+            logger.error("Callback 執行 '%s' 時出錯: %s", table_name, e)
+        PerfMonitor.finish(interaction)
+
+class GLAnalyticsView(discord.ui.View):
+    def __init__(self, cog: GLRankLineCog, options: dict):
+        super().__init__(timeout=300)
+        self.add_item(GLAnalyticsSelect(cog, options))
@@ -1,17 +1,47 @@
 # cogs/admin_cog.py
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 import os
 import sys
 import asyncio
-import subprocess
+import logging
+from DataStore import store as data_store
+from JobRunner import runner, Job, SUCCEEDED, FAILED, CANCELLED
+from Services import services
+
+logger = logging.getLogger(__name__)
+
+# 執行腳本時更新進度訊息的間隔 (秒)
+PROGRESS_INTERVAL = 5
 
 
 class AdminCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.watch_data_files.start()
+
+    async def cog_load(self):
+        services.acquire(self, "data")
+
+    def cog_unload(self):
+        self.watch_data_files.cancel()
+        services.release(self)
+
+    async def reload_data(self, force: bool = False) -> bool:
+        """於背景執行緒重新載入 data.xlsx 與 Json/，完成後整份替換；回傳是否已替換"""
+        return await asyncio.to_thread(data_store.reload, force)
+
+    @tasks.loop(minutes=1.0)
+    async def watch_data_files(self):
+        """背景任務：data.xlsx 或 Json/ 內的學生資料有變動時自動熱重載"""
+        if not data_store.loaded:
+            return  # 第一次載入由 Bot 登入後的預熱負責
+        try:
+            await self.reload_data()
+        except Exception as e:
+            logger.error("熱重載資料時發生錯誤 (保留目前的資料): %s", e)
 
     def restart_bot(self):
         """輔助函式，使用 execv 重新啟動 Bot"""
@@ -26,57 +56,126 @@ class AdminCog(commands.Cog):
         await asyncio.sleep(2)
         self.restart_bot()
 
+    @app_commands.command(name="reload_data", description="重新載入 data.xlsx 與學生資料，不需重啟 Bot（只有作者能用）")
+    async def reload_data_command(self, interaction: discord.Interaction):
+        if interaction.user.id != self.bot.owner_id:
+            await interaction.response.send_message("⚠ 你沒有權限執行此命令！", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True)
+        try:
+            await self.reload_data(force=True)
+        except Exception as e:
+            await interaction.followup.send(f"❌ 重新載入失敗，繼續使用目前的資料：{e}", ephemeral=True)
+            return
+        snapshot = data_store.current
+        await interaction.followup.send(
+            f"✅ 已載入第 {data_store.version} 版資料 ({len(snapshot.students)} 位學生，"
+            f"{snapshot.loaded_at:%Y-%m-%d %H:%M:%S})",
+            ephemeral=True,
+        )
+
+    def _job_embed(self, job: Job) -> discord.Embed:
+        color = {SUCCEEDED: discord.Color.green(), FAILED: discord.Color.red(), CANCELLED: discord.Color.dark_grey()}.get(job.status, discord.Color.blue())
+        embed = discord.Embed(title=f"🖥 {job.describe()}", color=color)
+        embed.description = f"```\n{job.tail() or '(尚無輸出)'}\n```"
+        embed.set_footer(text=f"共 {job.line_count} 行輸出" + ("" if job.finished else f"，可用 /job_cancel {job.id} 取消"))
+        return embed
+
+    async def _report_progress(self, interaction: discord.Interaction, job: Job):
+        """定期以執行中的輸出更新訊息；互動權杖過期 (15 分鐘) 後改於結束時私訊擁有者"""
+        message = await interaction.followup.send(embed=self._job_embed(job), ephemeral=True, wait=True)
+        while not job.finished:
+            try:
+                await asyncio.wait_for(asyncio.shield(job.done.wait()), PROGRESS_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await message.edit(embed=self._job_embed(job))
+            except discord.HTTPException:
+                message = None
+                break
+        if message is None:
+            await job.done.wait()
+            try:
+                owner = await self.bot.fetch_user(self.bot.owner_id)
+                await owner.send(embed=self._job_embed(job))
+            except discord.HTTPException as e:
+                logger.error("無法通知工作 #%s 的結果: %s", job.id, e)
+
+    async def _send_result(self, interaction: discord.Interaction, content: str):
+        """以互動回覆結果；長時間的工作可能超過互動權杖的 15 分鐘期限，此時改為私訊擁有者"""
+        try:
+            await interaction.followup.send(content, ephemeral=True)
+        except discord.HTTPException:
+            try:
+                owner = await self.bot.fetch_user(self.bot.owner_id)
+                await owner.send(content)
+            except discord.HTTPException as e:
+                logger.error("無法通知執行結果: %s (%s)", e, content)
+
     async def _execute_script(self, interaction: discord.Interaction, script_name: str):
         """
-        執行外部 Python 腳本的通用函式。
+        在背景執行外部 Python 腳本，並持續回報輸出。
         - script_name: 要執行的腳本檔案名稱 (例如: "arona_ai_helper.py")
         """
         if interaction.user.id != self.bot.owner_id:
             await interaction.followup.send("⚠ 你沒有權限執行此命令！", ephemeral=True)
             return
 
-        script_path = os.path.join(os.getcwd(), script_name)
-        if not os.path.exists(script_path):
-            await interaction.followup.send(f"❌ 找不到 `{script_name}`，請確認檔案是否存在。", ephemeral=True)
+        try:
+            job = runner.start(script_name)
+        except (FileNotFoundError, RuntimeError) as e:
+            await interaction.followup.send(f"❌ 無法執行：{e}", ephemeral=True)
             return
+        await self._report_progress(interaction, job)
 
+        # 只有腳本成功結束時才熱重載新的資料
+        if job.status != SUCCEEDED:
+            return
         try:
-            # 使用 sys.executable 確保跨平台相容性 (Windows/Linux)
-            # 這會使用當前執行 Bot 的 Python 解譯器來跑腳本
-            python_executable = sys.executable
-            
-            process = subprocess.Popen(
-                [python_executable, script_path], 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.PIPE, 
-                text=True, 
-                encoding='utf-8'
-            )
-            
-            # 等待腳本執行完成並取得輸出
-            stdout, stderr = process.communicate()
-            output = (stdout + "\n" + stderr).strip()
-
-            if not output:
-                output = "✅ 腳本執行成功，但沒有輸出。"
-
-            # 限制輸出長度以避免超過 Discord 字元限制
-            if len(output) > 1900:
-                output = output[:1900] + "\n...(輸出過長，已截斷)"
-
-            embed = discord.Embed(
-                title=f"🖥 執行 `{script_name}` 結果", 
-                description=f"```\n{output}\n```", 
-                color=discord.Color.blue()
-            )
-            await interaction.followup.send(embed=embed, ephemeral=True)
-            
-            # 腳本執行完畢後，通知並重啟 Bot
-            await interaction.followup.send(f"🔄 **`{script_name}` 執行完畢，正在重新啟動 Bot...**", ephemeral=True)
-            self.restart_bot()
-
+            await self.reload_data(force=True)
         except Exception as e:
-            await interaction.followup.send(f"❌ 執行 `{script_name}` 失敗：{e}", ephemeral=True)
+            await self._send_result(interaction, f"⚠ `{script_name}` 執行完畢，但重新載入資料失敗：{e}")
+            return
+        await self._send_result(interaction, f"🔄 **`{script_name}` 執行完畢，已重新載入資料。**")
+
+    def _is_owner(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.bot.owner_id
+
+    @app_commands.command(name="jobs", description="列出背景執行的腳本工作（只有作者能用）")
+    async def jobs(self, interaction: discord.Interaction):
+        if not self._is_owner(interaction):
+            await interaction.response.send_message("⚠ 你沒有權限執行此命令！", ephemeral=True)
+            return
+        jobs = runner.list()
+        if not jobs:
+            await interaction.response.send_message("目前沒有任何工作。", ephemeral=True)
+            return
+        lines = [f"{job.describe()} - {job.created_at:%m-%d %H:%M:%S}" for job in jobs]
+        embed = discord.Embed(title="🖥 背景工作", description="\n".join(lines)[:4000], color=discord.Color.blue())
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="job_log", description="查看背景工作的最新輸出（只有作者能用）")
+    async def job_log(self, interaction: discord.Interaction, job_id: int):
+        if not self._is_owner(interaction):
+            await interaction.response.send_message("⚠ 你沒有權限執行此命令！", ephemeral=True)
+            return
+        job = runner.get(job_id)
+        if job is None:
+            await interaction.response.send_message(f"❌ 找不到工作 #{job_id}", ephemeral=True)
+            return
+        await interaction.response.send_message(embed=self._job_embed(job), ephemeral=True)
+
+    @app_commands.command(name="job_cancel", description="取消執行中的背景工作（只有作者能用）")
+    async def job_cancel(self, interaction: discord.Interaction, job_id: int):
+        if not self._is_owner(interaction):
+            await interaction.response.send_message("⚠ 你沒有權限執行此命令！", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True)
+        if await runner.cancel(job_id):
+            await interaction.followup.send(f"🛑 已取消工作 #{job_id}", ephemeral=True)
+        else:
+            await interaction.followup.send(f"⚠ 工作 #{job_id} 不存在或已結束", ephemeral=True)
 
 
     @app_commands.command(name="exec_helper", description="執行 Arona AI Helper（只有作者能用）")
@@ -0,0 +1,109 @@
+# cogs/perf_cog.py
+import discord
+from discord.ext import commands, tasks
+from discord import app_commands
+from pathlib import Path
+import asyncio
+import logging
+import os
+import PerfMonitor
+import Sharding
+import utils
+from StartupProfile import profile as startup_profile
+
+logger = logging.getLogger(__name__)
+
+# Prometheus 文字檔輸出位置，可由環境變數 PERF_METRICS_FILE 指定
+# (多行程部署時各 worker 分別寫入 perf_metrics.worker<N>.prom)
+METRICS_FILE = Path(os.environ.get("PERF_METRICS_FILE", Path(__file__).parent.parent / f"perf_metrics{Sharding.worker_suffix()}.prom"))
+# 設定 PERF_HTTP_PORT 時於 127.0.0.1 提供 /metrics (多行程部署時 worker N 使用 PERF_HTTP_PORT + N)
+HTTP_PORT = str(int(os.environ["PERF_HTTP_PORT"]) + Sharding.WORKER_ID) if os.environ.get("PERF_HTTP_PORT") else None
+
+
+class PerfCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.http_server = None
+        self.dump_metrics.start()
+
+    async def cog_load(self):
+        if HTTP_PORT:
+            try:
+                self.http_server = await asyncio.start_server(self._handle_http, "127.0.0.1", int(HTTP_PORT))
+                logger.info("📈 已於 http://127.0.0.1:%s/metrics 提供延遲統計", HTTP_PORT)
+            except (OSError, ValueError) as e:
+                logger.error("啟動延遲統計 HTTP 端點失敗: %s", e)
+
+    async def cog_unload(self):
+        self.dump_metrics.cancel()
+        if self.http_server is not None:
+            self.http_server.close()
+            await self.http_server.wait_closed()
+
+    async def _handle_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """極簡的 HTTP 端點：任何 GET 都回傳 Prometheus 文字格式"""
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            if request_line.startswith(b"GET /metrics"):
+                body = PerfMonitor.registry.render_prometheus().encode("utf-8")
+                status = b"200 OK"
+            else:
+                body, status = b"not found\n", b"404 Not Found"
+            writer.write(b"HTTP/1.1 " + status + b"\r\n"
+                         b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                         b"Connection: close\r\n\r\n" + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        PerfMonitor.finish(interaction)
+
+    @tasks.loop(minutes=1.0)
+    async def dump_metrics(self):
+        """背景任務：定期將延遲統計寫入 Prometheus 文字檔"""
+        try:
+            await asyncio.to_thread(PerfMonitor.registry.dump, METRICS_FILE)
+        except Exception as e:
+            logger.error("寫入延遲統計檔案時發生錯誤: %s", e)
+
+    @app_commands.command(name="perf", description="顯示各指令的延遲統計（只有作者能用）")
+    async def perf(self, interaction: discord.Interaction):
+        if interaction.user.id != self.bot.owner_id:
+            await interaction.response.send_message("⚠ 你沒有權限執行此命令！", ephemeral=True)
+            return
+
+        summary = PerfMonitor.registry.summary()
+        if not summary and not startup_profile.finished:
+            await interaction.response.send_message("目前還沒有任何指令的統計資料。", ephemeral=True)
+            return
+
+        errors = PerfMonitor.registry.errors()
+        embed = discord.Embed(title="📈 指令延遲統計", description="單位：毫秒 (p50 / p95 為最近的數據)", color=discord.Color.blue())
+        by_command = {}
+        for command, stage, count, avg, p50, p95 in summary:
+            by_command.setdefault(command, []).append(f"{stage:<7}{count:>6}{avg * 1000:>9.1f}{p50 * 1000:>9.1f}{p95 * 1000:>9.1f}")
+
+        # 依整體 p95 由慢到快排序，連同啟動耗時與快取最多顯示 25 個欄位 (Discord 限制)
+        if startup_profile.finished:
+            embed.add_field(name="⏱ 啟動耗時", value="```\n" + startup_profile.report()[:1000] + "\n```", inline=False)
+        cache = utils.video_query_cache.stats()
+        embed.add_field(
+            name="🎬 影片查詢快取",
+            value=(f"```\n{'entries':<10}{cache['entries']:>8}\n{'hits':<10}{cache['hits']:>8}\n{'misses':<10}{cache['misses']:>8}\n"
+                   f"{'coalesced':<10}{cache['coalesced']:>8}\n{'hit_rate':<10}{cache['hit_rate']:>8.1%}\n```"),
+            inline=False)
+        totals = {command: p95 for command, stage, _count, _avg, _p50, p95 in summary if stage == "total"}
+        for command in sorted(by_command, key=lambda c: totals.get(c, 0), reverse=True)[:23]:
+            header = f"{'stage':<7}{'count':>6}{'avg':>9}{'p50':>9}{'p95':>9}"
+            name = f"/{command}" + (f" (錯誤 {errors[command]} 次)" if command in errors else "")
+            embed.add_field(name=name, value="```\n" + "\n".join([header, *by_command[command]])[:1000] + "\n```", inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(PerfCog(bot))
@@ -0,0 +1,107 @@
+# cogs/refresh_cog.py
+import discord
+from discord.ext import commands, tasks
+from discord import app_commands
+from datetime import datetime
+import asyncio
+import logging
+import time
+import RefreshPipeline
+from RefreshPipeline import pipeline
+from Services import services
+import Sharding
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        if Sharding.is_primary():  # 多行程部署時只由主要 worker 執行更新
+            self.scheduled_refresh.start()
+
+    async def cog_load(self):
+        services.acquire(self, "data", "http")
+
+    def cog_unload(self):
+        self.scheduled_refresh.cancel()
+        services.release(self)
+
+    @tasks.loop(minutes=15.0)
+    async def scheduled_refresh(self):
+        """背景任務：賽季結束一段時間後自動執行資料更新"""
+        try:
+            results = await pipeline.check_schedule()
+            if results is not None and not all(results.values()):
+                logger.warning("⚠ 排程的資料更新有階段失敗: %s", results)
+        except Exception as e:
+            logger.error("檢查資料更新排程時發生錯誤: %s", e)
+
+    @scheduled_refresh.before_loop
+    async def before_scheduled_refresh(self):
+        await self.bot.wait_until_ready()
+
+    @app_commands.command(name="refresh_status", description="顯示資料更新排程與上次結果（只有作者能用）")
+    async def refresh_status(self, interaction: discord.Interaction):
+        if interaction.user.id != self.bot.owner_id:
+            await interaction.response.send_message("⚠ 你沒有權限執行此命令！", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True)
+
+        embed = discord.Embed(title="🗓 資料更新", color=discord.Color.blue())
+        try:
+            raids = await asyncio.to_thread(RefreshPipeline.fetch_raids)
+            next_time = RefreshPipeline.next_refresh_time(RefreshPipeline.season_end_times(raids), time.time())
+            embed.add_field(name="下次排程", value=f"<t:{int(next_time)}:F>" if next_time else "沒有即將結束的賽季", inline=False)
+        except Exception as e:
+            embed.add_field(name="下次排程", value=f"無法取得 raids.json：{e}", inline=False)
+
+        state = pipeline.state
+        if pipeline.running:
+            embed.add_field(name="執行中", value="\n".join(f"**{name}**: {detail}" for name, detail in pipeline.current_stages.items()), inline=False)
+        if state.get("last_run"):
+            lines = [f"{'✅' if stage['ok'] else '❌'} **{name}**: {stage['detail']}" for name, stage in state.get("stages", {}).items()]
+            embed.add_field(name=f"上次更新 ({state['last_run']})", value="\n".join(lines)[:1000] or "-", inline=False)
+        if state.get("last_season_end"):
+            embed.set_footer(text=f"已處理的賽季結束時間：{datetime.fromtimestamp(state['last_season_end']):%Y-%m-%d %H:%M}")
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    async def _send_result(self, interaction: discord.Interaction, content: str):
+        """以互動回覆結果；完整的更新常超過互動權杖的 15 分鐘期限，此時改為私訊擁有者"""
+        try:
+            await interaction.followup.send(content, ephemeral=True)
+        except discord.HTTPException:
+            try:
+                owner = await self.bot.fetch_user(self.bot.owner_id)
+                await owner.send(content)
+            except discord.HTTPException as e:
+                logger.error("無法通知資料更新結果: %s (%s)", e, content)
+
+    @app_commands.command(name="refresh_now", description="立即執行資料更新（只有作者能用）")
+    @app_commands.choices(stage=[
+        app_commands.Choice(name="全部", value="all"),
+        app_commands.Choice(name="SchaleDB 學生資料與圖片", value="schaledb"),
+        app_commands.Choice(name="arona.ai 使用資料 (data.xlsx)", value="aronaai"),
+        app_commands.Choice(name="排行榜快照匯入", value="leaderboard"),
+    ])
+    async def refresh_now(self, interaction: discord.Interaction, stage: str = "all"):
+        if interaction.user.id != self.bot.owner_id:
+            await interaction.response.send_message("⚠ 你沒有權限執行此命令！", ephemeral=True)
+            return
+        if pipeline.running:
+            await interaction.response.send_message("⚠ 資料更新已在進行中，可用 /refresh_status 查看進度。", ephemeral=True)
+            return
+        await interaction.response.send_message("🔄 已開始資料更新，可用 /refresh_status 查看進度。", ephemeral=True)
+
+        stages = RefreshPipeline.STAGES if stage == "all" else [stage]
+        try:
+            results = await pipeline.run(stages)
+        except RuntimeError as e:
+            await self._send_result(interaction, f"⚠ {e}")
+            return
+        lines = [f"{'✅' if ok else '❌'} **{name}**: {pipeline.current_stages.get(name)}" for name, ok in results.items()]
+        await self._send_result(interaction, "資料更新結束：\n" + "\n".join(lines))
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(RefreshCog(bot))
@@ -1,18 +1,32 @@
 # cogs/search_cog.py
-from pathlib import Path
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
-import json
 import asyncio
+import logging
 from typing import Optional
-import AronaRankLine as arona
-import utils
+from StudentNameTranslator import translator
+from VideoClearStore import store as video_store
+from PerfMonitor import mark
+from Services import services
+import Sharding
+
+logger = logging.getLogger(__name__)
+
+
+def search_video_pipeline(armor_type: str, battle_field: str, boss_name: str, difficulty: str,
+                          consider_helper: bool, bilibili_display: bool,
+                          exclude_students: str | None, include_students: str | None) -> list:
+    """
+    影片搜尋流程：由本地影片紀錄庫取得該條件的分區 (本地沒有時才向後端查詢)，
+    再以學生位元索引篩選包含/排除學生。回傳依分數排序的結果列表，直接交給 PaginationView 分頁。
+    """
+    include_list = [s.strip() for s in include_students.split(',') if s.strip()] if include_students else []
+    exclude_list = [s.strip() for s in exclude_students.split(',') if s.strip()] if exclude_students else []
+    return video_store.search(boss_name, battle_field, armor_type, difficulty,
+                              consider_helper, bilibili_display, include_list, exclude_list)
 
 
-JSON_DIR = Path(__file__).parent.parent / "Json"
-TL_JSON = JSON_DIR / "TL.json"
-CACHED_JSON = JSON_DIR / "cache.json"
 class PaginationView(discord.ui.View):
     """用於搜尋結果的分頁視圖"""
     def __init__(self, results: list, page_size: int = 5):
@@ -73,6 +87,34 @@ class PaginationView(discord.ui.View):
 class SearchCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.refresh_student_names.start()
+        self.sync_video_store.start()
+
+    async def cog_load(self):
+        services.acquire(self, "names", "http")
+
+    def cog_unload(self):
+        self.refresh_student_names.cancel()
+        self.sync_video_store.cancel()
+        services.release(self)
+
+    @tasks.loop(hours=6.0)
+    async def refresh_student_names(self):
+        """背景任務：重新下載日服學生資料並更新中日名稱對照表 (多行程部署時由主要 worker 下載，其他 worker 只重新讀取檔案)"""
+        try:
+            await asyncio.to_thread(translator.refresh_remote if Sharding.is_primary() else translator.refresh)
+        except Exception as e:
+            logger.error("更新學生名稱對照表時發生錯誤: %s", e)
+
+    @tasks.loop(minutes=30.0)
+    async def sync_video_store(self):
+        """背景任務：重新向後端查詢已過期的影片紀錄分區"""
+        try:
+            updated = await asyncio.to_thread(video_store.sync)
+            if updated:
+                logger.info("✅ 已同步 %s 個影片紀錄分區", updated)
+        except Exception as e:
+            logger.error("同步影片紀錄庫時發生錯誤: %s", e)
 
     @app_commands.command(name="search_video", description="依據條件搜尋總力戰影片資料")
     @app_commands.choices(battle_field=[
@@ -119,60 +161,32 @@ class SearchCog(commands.Cog):
         include_students: str = None, exclude_students: str = None
     ):
         await interaction.response.defer()
+        mark(interaction, "defer")
 
         consider_helper_bool = considerhelper.lower() == "true"
         bilibili_display_bool = bilibilidisplay.lower() == "true"
 
         try:
-            await asyncio.to_thread(utils.get_data, armor_type, battle_field, boss_name, difficulty, consider_helper_bool, bilibili_display_bool, exclude_students, include_students)
-            await asyncio.to_thread(utils.replace_student_names, CACHED_JSON, TL_JSON)
+            results = await asyncio.to_thread(
+                search_video_pipeline, armor_type, battle_field, boss_name, difficulty,
+                consider_helper_bool, bilibili_display_bool, exclude_students, include_students
+            )
         except Exception as e:
             await interaction.followup.send(f"從後端 API 獲取資料時發生錯誤: {e}", ephemeral=True)
             return
-
-        try:
-            with open(TL_JSON, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception as e:
-            await interaction.followup.send(f"讀取處理後的資料失敗: {e}", ephemeral=True)
-            return
-
-        boss_raid_id_map = { "薇娜": 1, "赫賽德": 2, "白&黑": 3, "耶羅尼姆斯": 4, "KAITEN FX Mk.0": 5, "佩洛洛吉拉": 6, "霍德": 7, "高茲": 8, "葛利果": 9, "氣墊船": 10, "黑影": 11, "Geburah": 12 }
-        raid_id = boss_raid_id_map.get(boss_name, 0)
-        mode = "3min" if boss_name in ["薇娜", "KAITEN FX Mk.0"] else "4min"
-        
-        include_list = [s.strip() for s in include_students.split(',') if s.strip()] if include_students else []
-        exclude_list = [s.strip() for s in exclude_students.split(',') if s.strip()] if exclude_students else []
-        
-        results = []
-        for rec in data:
-            if not (rec.get("battle_field") == battle_field and rec.get("boss_name") == boss_name and rec.get("armor") == armor_type):
-                continue
-            try:
-                score = int(rec.get("score", 0))
-                if arona.determine_difficulty(score, mode) != difficulty:
-                    continue
-            except (ValueError, TypeError):
-                continue
-            
-            students = rec.get("students", [])
-            if (include_list and not all(inc in students for inc in include_list)) or \
-               (exclude_list and any(exc in students for exc in exclude_list)):
-                continue
-
-            used_time_str = arona.format_time(arona.calculate_used_time(score, difficulty, raid_id)) if raid_id != 0 else "無法計算"
-            results.append({"score": score, "used_time_str": used_time_str, "students": students, "url": rec.get("url")})
+        mark(interaction, "data")
 
         if not results:
             embed = discord.Embed(title="搜尋結果", description="沒有找到符合條件的結果。", color=discord.Color.red())
             await interaction.followup.send(embed=embed)
             return
-        
-        results.sort(key=lambda x: x["score"], reverse=True)
+
         view = PaginationView(results, page_size=5)
         embed = view.create_embed()
+        mark(interaction, "render")
         message = await interaction.followup.send(embed=embed, view=view)
         view.message = message
+        mark(interaction, "send")
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(SearchCog(bot))
\ No newline at end of file
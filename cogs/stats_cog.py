@@ -3,12 +3,19 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import asyncio
-from AronaStatistics import AronaStatistics
+from DataStore import store as data_store, DATA_UNAVAILABLE
+from PerfMonitor import mark
+from Services import services
 
 class StatsCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.arona_stats = AronaStatistics("data.xlsx")
+
+    async def cog_load(self):
+        services.acquire(self, "data")
+
+    def cog_unload(self):
+        services.release(self)
 
     @staticmethod
     def get_rank_range_str(rank: int) -> str:
@@ -27,14 +34,21 @@ class StatsCog(commands.Cog):
     @app_commands.command(name="raid_stats", description="取得 總力戰 角色使用統計")
     async def raid_stats(self, interaction: discord.Interaction, season: int, rank: int):
         await interaction.response.defer()
+        mark(interaction, "defer")
         try:
             rank_str = self.get_rank_range_str(rank)
         except ValueError as e:
             await interaction.followup.send(str(e))
             return
 
-        raid_name = self.arona_stats.get_raid_name(season)
-        data = self.arona_stats.get_raid_stats(season, rank)
+        snapshot = await data_store.wait_loaded()
+        if snapshot is None:
+            await interaction.followup.send(DATA_UNAVAILABLE)
+            return
+        arona_stats = snapshot.stats
+        raid_name = arona_stats.get_raid_name(season)
+        data = arona_stats.get_raid_stats(season, rank)
+        mark(interaction, "data")
 
         if not data:
             await interaction.followup.send(f"⚠ 無法取得 `{raid_name}` {rank_str} 的數據")
@@ -46,7 +60,9 @@ class StatsCog(commands.Cog):
         )
         for name, count in data[:10]:
             embed.add_field(name=name, value=f"使用次數: `{count}`", inline=False)
+        mark(interaction, "render")
         await interaction.followup.send(embed=embed)
+        mark(interaction, "send")
 
     @app_commands.command(name="eraid_stats", description="取得 大決戰 角色使用統計")
     @app_commands.choices(armor_type=[
@@ -57,18 +73,25 @@ class StatsCog(commands.Cog):
     ])
     async def eraid_stats(self, interaction: discord.Interaction, season: int, armor_type: str, rank: int):
         await interaction.response.defer()
+        mark(interaction, "defer")
         try:
             rank_str = self.get_rank_range_str(rank)
         except ValueError as e:
             await interaction.followup.send(str(e))
             return
 
-        eraid_name = self.arona_stats.get_eraid_name(season, armor_type)
+        snapshot = await data_store.wait_loaded()
+        if snapshot is None:
+            await interaction.followup.send(DATA_UNAVAILABLE)
+            return
+        arona_stats = snapshot.stats
+        eraid_name = arona_stats.get_eraid_name(season, armor_type)
         try:
-            data = self.arona_stats.get_eraid_stats(season, armor_type, rank)
+            data = arona_stats.get_eraid_stats(season, armor_type, rank)
         except ValueError as e:
             await interaction.followup.send(str(e))
             return
+        mark(interaction, "data")
 
         if not data:
             await interaction.followup.send(f"⚠ 該季 S{season} {armor_type} 類型的角色數據不存在！")
@@ -80,18 +103,26 @@ class StatsCog(commands.Cog):
         )
         for name, count in data[:10]:
             embed.add_field(name=name, value=f"使用次數: {count}", inline=False)
+        mark(interaction, "render")
         await interaction.followup.send(embed=embed)
+        mark(interaction, "send")
 
     @app_commands.command(name="stuusage", description="取得指定學生前20筆使用率統計")
     async def stuusage(self, interaction: discord.Interaction, stu_name: str, rank: int):
         await interaction.response.defer()
+        mark(interaction, "defer")
         try:
             rank_str = self.get_rank_range_str(rank)
         except ValueError as e:
             await interaction.followup.send(str(e), ephemeral=True)
             return
             
-        result = await asyncio.to_thread(self.arona_stats.get_student_usage, stu_name, rank)
+        snapshot = await data_store.wait_loaded()
+        if snapshot is None:
+            await interaction.followup.send(DATA_UNAVAILABLE)
+            return
+        result = await asyncio.to_thread(snapshot.stats.get_student_usage, stu_name, rank)
+        mark(interaction, "data")
 
         embed = discord.Embed(
             title=f"📊 {stu_name} 的使用率 (來自 {rank_str})",
@@ -105,8 +136,10 @@ class StatsCog(commands.Cog):
             formatted_lines = [f"• {line}" for line in result.strip().split('\n') if line]
             description_text += "\n".join(formatted_lines)
             embed.description = description_text
-            
+        mark(interaction, "render")
+
         await interaction.followup.send(embed=embed)
+        mark(interaction, "send")
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(StatsCog(bot))
\ No newline at end of file
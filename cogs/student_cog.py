@@ -2,16 +2,27 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from AronaStatistics import AronaStatistics
-from ImageFactory import ImageFactory
+import asyncio
+from DataStore import store as data_store, DATA_UNAVAILABLE
+from PerfMonitor import mark
+from Services import services
 
 class StudentCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.arona_stats = AronaStatistics("data.xlsx")
-        # 從 bot 物件獲取共用資料
-        self.id_name_mapping = bot.id_name_mapping
-        self.all_student_data = bot.all_student_data
+
+    async def cog_load(self):
+        services.acquire(self, "data", "render")
+
+    def cog_unload(self):
+        services.release(self)
+
+    async def render(self, student_info, usage, assets):
+        """於共用的繪圖執行緒池中產生學生使用率圖，不阻塞事件迴圈"""
+        from ImageFactory import ImageFactory  # 已於載入資料時匯入
+        executor = await services.get("render")
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, ImageFactory.StudentUsageImageGenerator, student_info, usage, assets)
 
     @app_commands.command(name="eraid_stats_stu", description="取得特定角色的大決戰數據")
     @app_commands.choices(armor_type=[
@@ -22,23 +33,30 @@ class StudentCog(commands.Cog):
     ])
     async def eraid_stats_stu(self, interaction: discord.Interaction, stu_name: str, seasons: int, armor_type: str):
         await interaction.response.defer()
+        mark(interaction, "defer")
 
-        student_id = next((sid for sid, name in self.id_name_mapping.items() if name == stu_name), None)
+        # 同一個指令內使用同一版本的資料 (熱重載只替換 data_store.current)
+        data = await data_store.wait_loaded()
+        if data is None:
+            await interaction.followup.send(DATA_UNAVAILABLE)
+            return
+        student_id = data.find_student_id(stu_name)
         if student_id is None:
             await interaction.followup.send(f"⚠ 找不到 `{stu_name}` 的對應 ID")
             return
 
-        _sheet_name, raid_title, two_dim_data = self.arona_stats.get_student_stats(student_id, seasons, armor_type)
+        _sheet_name, raid_title, two_dim_data = data.stats.get_student_stats(student_id, seasons, armor_type)
         if two_dim_data is None:
             await interaction.followup.send(f"⚠ 找不到 `{stu_name}` S{seasons} {armor_type} 大決戰的數據")
             return
 
-        student_info = self.all_student_data.get(str(student_id))
+        mark(interaction, "data")
+        student_info = data.students.get(str(student_id))
         if student_info is None:
             await interaction.followup.send(f"⚠ 錯誤：找不到 `{stu_name}` (`{student_id}`) 的相關資料")
             return
 
-        image_bytes = ImageFactory.StudentUsageImageGenerator(student_info, two_dim_data)
+        image_bytes = await self.render(student_info, two_dim_data, data.assets)
         file = discord.File(image_bytes, filename="student_usage.png")
         embed = discord.Embed(
             title=f"📊 {stu_name} 的大決戰使用數據",
@@ -46,28 +64,36 @@ class StudentCog(commands.Cog):
             color=discord.Color.purple()
         )
         embed.set_image(url="attachment://student_usage.png")
+        mark(interaction, "render")
         await interaction.followup.send(embed=embed, file=file)
+        mark(interaction, "send")
 
     @app_commands.command(name="raid_stats_stu", description="取得特定角色的總力戰數據")
     async def raid_stats_stu(self, interaction: discord.Interaction, stu_name: str, seasons: int):
         await interaction.response.defer()
+        mark(interaction, "defer")
 
-        student_id = next((sid for sid, name in self.id_name_mapping.items() if name == stu_name), None)
+        data = await data_store.wait_loaded()
+        if data is None:
+            await interaction.followup.send(DATA_UNAVAILABLE)
+            return
+        student_id = data.find_student_id(stu_name)
         if student_id is None:
             await interaction.followup.send(f"⚠ 找不到 `{stu_name}` 的對應 ID")
             return
 
-        _sheet_name, raid_title, two_dim_data = self.arona_stats.get_student_stats_raid(student_id, seasons)
+        _sheet_name, raid_title, two_dim_data = data.stats.get_student_stats_raid(student_id, seasons)
         if two_dim_data is None:
             await interaction.followup.send(f"⚠ 找不到 `{stu_name}` S{seasons} 總力戰的數據")
             return
 
-        student_info = self.all_student_data.get(str(student_id))
+        mark(interaction, "data")
+        student_info = data.students.get(str(student_id))
         if student_info is None:
             await interaction.followup.send(f"⚠ 錯誤：找不到 `{stu_name}` (`{student_id}`) 的相關資料")
             return
 
-        image_bytes = ImageFactory.StudentUsageImageGenerator(student_info, two_dim_data)
+        image_bytes = await self.render(student_info, two_dim_data, data.assets)
         file = discord.File(image_bytes, filename="student_usage.png")
         embed = discord.Embed(
             title=f"📊 {stu_name} 的總力戰使用數據",
@@ -75,7 +101,9 @@ class StudentCog(commands.Cog):
             color=discord.Color.dark_blue()
         )
         embed.set_image(url="attachment://student_usage.png")
+        mark(interaction, "render")
         await interaction.followup.send(embed=embed, file=file)
+        mark(interaction, "send")
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(StudentCog(bot))
\ No newline at end of file
@@ -1,24 +1,34 @@
 # cogs/timeline_cog.py
 import discord
+import asyncio
 from discord.ext import commands
 from discord import app_commands
 import AronaRankLine as arona
+from PerfMonitor import mark
+from Services import services
 
 class TimelineCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    async def cog_load(self):
+        services.acquire(self, "http")
+
+    def cog_unload(self):
+        services.release(self)
+
     @app_commands.command(name="raidline", description="顯示指定賽季的總力戰分數線")
     async def raidline(self, interaction: discord.Interaction, sensons: int):
         await interaction.response.defer()
+        mark(interaction, "defer")
 
-        raid_data = arona.get_json(f"https://blue.triple-lab.com/raid/{sensons}")
+        raid_data = await asyncio.to_thread(arona.get_json, f"https://blue.triple-lab.com/raid/{sensons}")
         if raid_data is None:
             await interaction.followup.send("無法取得總力戰資料！")
             return
         rank_results = arona.get_rank_results(raid_data)
 
-        raid_info = arona.get_json("https://schaledb.com/data/tw/raids.json")
+        raid_info = await asyncio.to_thread(arona.get_json, "https://schaledb.com/data/tw/raids.json")
         if raid_info is None:
             await interaction.followup.send("無法取得 raidInfo 資料！")
             return
@@ -31,10 +41,11 @@ class TimelineCog(commands.Cog):
         terrain = season_data.get("Terrain", "未知地型")
         raid_id = season_data.get("RaidId", 0)
         boss_name = arona.get_boss_info(raid_info, raid_id)
+        mark(interaction, "data")
         
         header = f"S{sensons} - {terrain} {boss_name} 的總力戰分數"
         embed = discord.Embed(title=header, color=discord.Color.blue())
-        mode = "3min" if raid_id in [1, 5] else "4min"
+        mode = arona.get_mode(raid_id)
 
         for rank in arona.RANKS:
             score = rank_results.get(rank)
@@ -52,19 +63,22 @@ class TimelineCog(commands.Cog):
                 value = f"{score:,}\n({difficulty}難度) (用時 計算錯誤)"
             
             embed.add_field(name=f"第{rank}名", value=value, inline=False)
+        mark(interaction, "render")
         await interaction.followup.send(embed=embed)
+        mark(interaction, "send")
 
     @app_commands.command(name="eraidline", description="顯示指定賽季的大決戰分數線")
     async def eraidline(self, interaction: discord.Interaction, sensons: int):
         await interaction.response.defer()
+        mark(interaction, "defer")
         
-        eraid_data = arona.get_json(f"https://blue.triple-lab.com/eraid/{sensons}")
+        eraid_data = await asyncio.to_thread(arona.get_json, f"https://blue.triple-lab.com/eraid/{sensons}")
         if eraid_data is None:
             await interaction.followup.send("無法取得大決戰資料！")
             return
         rank_results = arona.get_rank_results(eraid_data)
         
-        raid_info = arona.get_json("https://schaledb.com/data/tw/raids.json")
+        raid_info = await asyncio.to_thread(arona.get_json, "https://schaledb.com/data/tw/raids.json")
         if raid_info is None:
             await interaction.followup.send("無法取得 raidInfo 資料！")
             return
@@ -77,6 +91,7 @@ class TimelineCog(commands.Cog):
         terrain = season_data.get("Terrain", "未知地型")
         raid_id = season_data.get("RaidId", 0)
         boss_name = arona.get_boss_info(raid_info, raid_id)
+        mark(interaction, "data")
         
         header = f"S{sensons} - {terrain} {boss_name} 的大決戰分數"
         embed = discord.Embed(title=header, color=discord.Color.green())
@@ -85,8 +100,10 @@ class TimelineCog(commands.Cog):
             score = rank_results.get(rank, "無資料")
             formatted_score = f"{int(score):,}" if str(score).isdigit() else score
             embed.add_field(name=f"第{rank}名", value=formatted_score, inline=False)
+        mark(interaction, "render")
     
         await interaction.followup.send(embed=embed)
+        mark(interaction, "send")
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(TimelineCog(bot))
\ No newline at end of file
@@ -0,0 +1,180 @@
+# launcher.py
+"""
+多行程部署：將 Discord shard 分配給多個 worker 行程 (各自執行 bot_refactored.py 的 AutoShardedBot)。
+
+  - shard 數預設使用 Discord 建議值 (GET /gateway/bot)，平均分配給 --processes 個 worker
+  - 依 Discord 的 identify 限制 (每 5 秒 max_concurrency 個 shard) 錯開各 worker 的啟動時間
+  - 解析一次 data.xlsx 並寫出共用快照 (SheetSnapshot)，worker 以 mmap 讀取，不各自解析 Excel；
+    data.xlsx 更新後自動重建快照，worker 由 AdminCog 的檔案監看熱重載
+  - worker 異常結束時自動重新啟動 (指數退避)；Ctrl+C / SIGTERM 時結束所有 worker
+
+用法：
+    python3 launcher.py                          # shard 數依 Discord 建議，worker 數 = CPU 核心數
+    python3 launcher.py --shards 8 --processes 4
+"""
+from pathlib import Path
+import argparse
+import logging
+import math
+import os
+import signal
+import subprocess
+import sys
+import time
+import requests
+import SheetSnapshot
+from Sharding import split_shards
+
+logger = logging.getLogger("launcher")
+
+BASE_DIR = Path(__file__).parent
+XLSX_FILE = BASE_DIR / "data.xlsx"
+GATEWAY_URL = "https://discord.com/api/v10/gateway/bot"
+# identify 的時間窗 (秒)：每個時間窗最多 max_concurrency 個 shard 連線
+IDENTIFY_WINDOW = 5
+# worker 持續執行超過此秒數後，重新計算重啟的退避時間
+STABLE_SECONDS = 300
+MAX_RESTART_DELAY = 60
+TERMINATE_TIMEOUT = 15
+
+
+def recommended_shards(token: str) -> tuple[int, int]:
+    """Discord 建議的 shard 數與 identify 的 max_concurrency"""
+    response = requests.get(GATEWAY_URL, headers={"Authorization": f"Bot {token}"}, timeout=15)
+    response.raise_for_status()
+    data = response.json()
+    return data["shards"], data.get("session_start_limit", {}).get("max_concurrency", 1)
+
+
+def refresh_snapshot(force: bool = False) -> bool:
+    """data.xlsx 比快照新時重建快照，回傳是否有重建；失敗時保留舊的快照"""
+    try:
+        xlsx_mtime = XLSX_FILE.stat().st_mtime
+    except FileNotFoundError:
+        logger.error("❌ 找不到 %s", XLSX_FILE)
+        return False
+    if not force and SheetSnapshot.source_mtime() == xlsx_mtime:
+        return False
+    try:
+        SheetSnapshot.build(XLSX_FILE)
+        return True
+    except Exception as e:
+        logger.error("❌ 建立 data.xlsx 快照失敗 (worker 繼續使用舊的快照): %s", e)
+        return False
+
+
+class Worker:
+    def __init__(self, worker_id: int, shard_ids: list, shard_count: int):
+        self.worker_id = worker_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.process = None
+        self.started_at = 0.0
+        self.failures = 0
+        self.restart_at = None
+
+    def start(self):
+        env = dict(
+            os.environ,
+            WORKER_ID=str(self.worker_id),
+            SHARD_COUNT=str(self.shard_count),
+            SHARD_IDS=",".join(map(str, self.shard_ids)),
+            DATA_SNAPSHOT=str(SheetSnapshot.POINTER_FILE),
+            PYTHONIOENCODING="utf-8",
+        )
+        self.process = subprocess.Popen([sys.executable, str(BASE_DIR / "bot_refactored.py")], cwd=BASE_DIR, env=env)
+        self.started_at = time.monotonic()
+        self.restart_at = None
+        logger.info("🚀 worker %s 已啟動 (pid %s，shard %s)", self.worker_id, self.process.pid, self.shard_ids)
+
+    def check(self):
+        """worker 結束時排程重新啟動"""
+        if self.process is None or self.restart_at is not None:
+            return
+        returncode = self.process.poll()
+        if returncode is None:
+            return
+        if time.monotonic() - self.started_at > STABLE_SECONDS:
+            self.failures = 0
+        delay = min(MAX_RESTART_DELAY, 2 ** self.failures)
+        self.failures += 1
+        self.restart_at = time.monotonic() + delay
+        logger.warning("⚠ worker %s 已結束 (結束碼 %s)，%s 秒後重新啟動", self.worker_id, returncode, delay)
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以多個 worker 行程執行 sharded Bot")
+    parser.add_argument("--shards", default="auto", help="shard 總數 (預設 auto：使用 Discord 建議值)")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="worker 行程數 (預設為 CPU 核心數，不超過 shard 數)")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="每 5 秒可 identify 的 shard 數 (預設使用 Discord 回傳值)")
+    parser.add_argument("--snapshot-interval", type=float, default=30, help="檢查 data.xlsx 是否更新的間隔 (秒)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] [launcher] %(message)s",
+                        datefmt="%Y-%m-%d %H:%M:%S")
+
+    max_concurrency = args.max_concurrency or 1
+    if args.shards == "auto":
+        try:
+            token = (BASE_DIR / "TOKEN.txt").read_text().strip()
+            shard_count, discord_concurrency = recommended_shards(token)
+            max_concurrency = args.max_concurrency or discord_concurrency
+        except Exception as e:
+            logger.error("❌ 無法取得建議的 shard 數，請以 --shards 指定: %s", e)
+            sys.exit(1)
+    else:
+        shard_count = int(args.shards)
+
+    groups = split_shards(shard_count, args.processes)
+    logger.info("🧩 %s 個 shard 分配給 %s 個 worker: %s", shard_count, len(groups), groups)
+
+    refresh_snapshot(force=SheetSnapshot.source_mtime() is None)
+    workers = [Worker(worker_id, shard_ids, shard_count) for worker_id, shard_ids in enumerate(groups)]
+
+    stopping = False
+
+    def request_stop(*_args):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    try:
+        # 依 identify 限制錯開各 worker 的啟動 (同一個 worker 內的 shard 由 discord.py 自行排隊)
+        for worker in workers:
+            if stopping:
+                break
+            worker.start()
+            time.sleep(math.ceil(len(worker.shard_ids) / max_concurrency) * IDENTIFY_WINDOW)
+
+        next_snapshot_check = time.monotonic() + args.snapshot_interval
+        while not stopping:
+            time.sleep(1)
+            now = time.monotonic()
+            for worker in workers:
+                worker.check()
+                if worker.restart_at is not None and now >= worker.restart_at:
+                    worker.start()
+            if now >= next_snapshot_check:
+                refresh_snapshot()
+                next_snapshot_check = now + args.snapshot_interval
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info("🛑 正在結束所有 worker...")
+        for worker in workers:
+            worker.stop()
+        deadline = time.monotonic() + TERMINATE_TIMEOUT
+        for worker in workers:
+            if worker.process is None:
+                continue
+            try:
+                worker.process.wait(timeout=max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                worker.process.kill()
+
+
+if __name__ == "__main__":
+    main()
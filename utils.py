@@ -1,11 +1,15 @@
 
-from pathlib import Path
-import pandas as pd
-import asyncio
-import AronaRankLine as determine_difficulty
 import json
-import requests
+import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
+from StudentNameTranslator import translator
+from Services import services
+
+logger = logging.getLogger(__name__)
+
 def get_student_usage_stats(usage_data: list) -> list:
     """
     接收學生使用狀況資料的二維陣列，每個內部陣列包含完整列資料：
@@ -30,14 +34,14 @@ def get_student_usage_stats(usage_data: list) -> list:
     注意：當該列的排名為 "10000以下" 時，將強制把「借用」數據設為 0。
     """
     if not isinstance(usage_data, list):
-        print("資料錯誤：輸入應為二維陣列", flush=True)
+        logger.error("資料錯誤：輸入應為二維陣列")
         return None
 
     processed = []
     for idx, row in enumerate(usage_data):
         # 確認每列至少有 3 個元素（排名、至少一筆數據、共計）
         if not isinstance(row, list) or len(row) < 3:
-            print(f"資料錯誤：第 {idx+1} 個內部陣列格式不正確", flush=True)
+            logger.error("資料錯誤：第 %s 個內部陣列格式不正確", idx+1)
             return None
 
         # 取出中間欄位：捨棄第一欄（排名）與最後一欄（共計）
@@ -47,113 +51,187 @@ def get_student_usage_stats(usage_data: list) -> list:
         try:
             usage_row_int = [int(x) for x in usage_row]
         except Exception as e:
-            print(f"資料轉換錯誤：第 {idx+1} 個內部陣列無法轉換為整數: {e}", flush=True)
+            logger.error("資料轉換錯誤：第 %s 個內部陣列無法轉換為整數: %s", idx+1, e)
             return None
 
         processed.append(usage_row_int)
 
-    print("轉換後的學生使用狀況資料：", flush=True)
-    for row in processed:
-        print(row, flush=True)
+    logger.debug("轉換後的學生使用狀況資料：%s", processed)
     return processed
 
 
-jp_url = 'https://schaledb.com/data/jp/students.json'
-tw_url = 'https://schaledb.com/data/tw/students.json'
+# 影片資料欄位的日->中翻譯對照表
+BOSS_NAME_MAPPING = {
+    "ビナー": "薇娜",
+    "ケセド": "赫賽德",
+    "シロ&クロ": "白&黑",
+    "ヒエロニムス": "耶羅尼姆斯",
+    "KAITEN FX Mk.0": "KAITEN FX Mk.0",
+    "ペロロジラ": "佩洛洛吉拉",
+    "ホド": "霍德",
+    "ゴズ": "高茲",
+    "グレゴリオ": "葛利果",
+    "ホバークラフト": "氣墊船",
+    "クロカゲ": "黑影",
+    "ゲブラ": "Geburah",
+    "コクマー": "Chokmah"
+}
+ARMOR_MAPPING = {
+    "弾力装甲": "彈力裝甲",
+    "特殊装甲": "特殊裝甲",
+    "重装甲": "重裝甲",
+    "軽装備": "輕裝備"
+}
+BATTLE_FIELD_MAPPING = {
+    "市街地": "城鎮戰",
+    "屋外": "野戰",
+    "屋内": "室內戰"
+}
 
-def replace_student_names(input_json: str, output_json: str):
+
+def translate_records(records):
     """
-    讀取轉換後的 JSON，進行學生名稱替換（依據學生對照表）以及
-    armor、boss-name、battle-field 欄位的翻譯，再輸出最終 JSON 檔
+    逐筆翻譯影片資料 (generator)：學生名稱依學生對照表替換為中文，
+    armor、boss_name、battle_field 欄位翻譯為中文。
+    每筆紀錄為 get_data 回傳的 dict，包含 "students" 列表。
     """
-    # 1) 取得學生對照資料，建立中文->日文以及日文->中文對照表
-    try:
-        jp_response = requests.get(jp_url)
-        tw_response = requests.get(tw_url)
-        jp_students = jp_response.json()
-        tw_students = tw_response.json()
-    except Exception as e:
-        print(f"下載學生資料失敗: {e}")
-        return
+    for rec in records:
+        if "students" in rec and isinstance(rec["students"], list):
+            rec["students"] = [translator.jp_to_cn(name) for name in rec["students"]]
+        if rec.get("armor") is not None:
+            rec["armor"] = ARMOR_MAPPING.get(rec["armor"], rec["armor"])
+        if rec.get("boss_name") is not None:
+            rec["boss_name"] = BOSS_NAME_MAPPING.get(rec["boss_name"], rec["boss_name"])
+        if rec.get("battle_field") is not None:
+            rec["battle_field"] = BATTLE_FIELD_MAPPING.get(rec["battle_field"], rec["battle_field"])
+        yield rec
 
-    # 建立「中文名稱 -> 日文名稱」的字典（完整字串包含括號）
-    cn_to_jp_mapping = {}
-    for student_id in tw_students:
-        tw_student = tw_students.get(student_id)
-        jp_student = jp_students.get(student_id)
-        if tw_student and jp_student:
-            tw_name = tw_student.get("Name")  # 例如 "沙耶(私服)"
-            jp_name = jp_student.get("Name")  # 例如 "サヤ（私服）"
-            if tw_name and jp_name:
-                cn_to_jp_mapping[tw_name] = jp_name
-    # 建立反向字典「日文名稱 -> 中文名稱」
-    jp_to_cn_mapping = {jp: cn for cn, jp in cn_to_jp_mapping.items()}
 
-    # 2) 定義額外欄位的翻譯對照表
-    boss_name_mapping = {
-        "ビナー": "薇娜",
-        "ケセド": "赫賽德",
-        "シロ&クロ": "白&黑",
-        "ヒエロニムス": "耶羅尼姆斯",
-        "KAITEN FX Mk.0": "KAITEN FX Mk.0",
-        "ペロロジラ": "佩洛洛吉拉",
-        "ホド": "霍德",
-        "ゴズ": "高茲",
-        "グレゴリオ": "葛利果",
-        "ホバークラフト": "氣墊船",
-        "クロカゲ": "黑影",
-        "ゲブラ": "Geburah",
-        "コクマー": "Chokmah"
-    }
-    armor_mapping = {
-        "弾力装甲": "彈力裝甲",
-        "特殊装甲": "特殊裝甲",
-        "重装甲": "重裝甲",
-        "軽装備": "輕裝備"
-    }
-    battle_field_mapping = {
-        "市街地": "城鎮戰",
-        "屋外": "野戰",
-        "屋内": "室內戰"
-    }
+# 影片查詢結果快取：同一組條件在 TTL 內直接使用快取，不再向後端發送請求
+VIDEO_CACHE_TTL = 15 * 60
+VIDEO_CACHE_SIZE = 256
+# 影片查詢後端的逾時 (秒)
+VIDEO_QUERY_TIMEOUT = 30
 
-    # 3) 讀取 JSON 檔（假設其結構為 data.json 的格式：列表，每筆紀錄包含 "students" 列表）
-    with open(input_json, "r", encoding="utf-8") as f:
-        records = json.load(f)
 
-    # 4) 替換學生名稱：針對 rec["students"] 中每個名稱，若在對照表中則替換為中文名稱
-    for rec in records:
-        if "students" in rec and isinstance(rec["students"], list):
-            rec["students"] = [jp_to_cn_mapping.get(name, name) for name in rec["students"]]
+class VideoQueryCache:
+    """
+    以正規化後的 payload 為鍵的 TTL + LRU 快取。
+    同一組條件同時有多個查詢時只會送出一次請求，其餘查詢等待同一個結果 (request coalescing)。
+    """
 
-    # 5) 替換其他欄位：armor, boss_name, battle_field
-    for rec in records:
-        if "armor" in rec and rec["armor"] is not None:
-            original = rec["armor"]
-            if original in armor_mapping:
-                rec["armor"] = armor_mapping[original]
-        if "boss_name" in rec and rec["boss_name"] is not None:
-            original = rec["boss_name"]
-            if original in boss_name_mapping:
-                rec["boss_name"] = boss_name_mapping[original]
-        if "battle_field" in rec and rec["battle_field"] is not None:
-            original = rec["battle_field"]
-            if original in battle_field_mapping:
-                rec["battle_field"] = battle_field_mapping[original]
+    def __init__(self, ttl: float = VIDEO_CACHE_TTL, max_size: int = VIDEO_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (過期時間, 紀錄列表)
+        self._in_flight = {}  # key -> [threading.Event, 結果, 例外]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
 
-    # 6) 輸出最終 JSON
-    with open(output_json, "w", encoding="utf-8") as f:
-        json.dump(records, f, indent=4, ensure_ascii=False)
+    @staticmethod
+    def make_key(payload: dict) -> str:
+        """學生名單順序不影響查詢結果，排序後再序列化為鍵"""
+        normalized = dict(payload)
+        normalized["includeStudents"] = sorted(payload.get("includeStudents", []))
+        normalized["excludeStudents"] = sorted(payload.get("excludeStudents", []))
+        return json.dumps(normalized, ensure_ascii=False, sort_keys=True)
 
-    print(f"✅ 學生及其他欄位翻譯完成，輸出：{output_json}")
+    def get_or_fetch(self, payload: dict, fetch) -> list:
+        key = self.make_key(payload)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+            waiter = self._in_flight.get(key)
+            if waiter is None:
+                waiter = [threading.Event(), None, None]
+                self._in_flight[key] = waiter
+                self.misses += 1
+                owner = True
+            else:
+                self.coalesced += 1
+                owner = False
 
+        if not owner:
+            waiter[0].wait()
+            if waiter[2] is not None:
+                raise waiter[2]
+            return waiter[1]
 
+        try:
+            data = fetch(payload)
+        except Exception as e:
+            waiter[2] = e
+            raise
+        else:
+            waiter[1] = data
+            with self._lock:
+                self._entries[key] = (time.monotonic() + self.ttl, data)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+            return data
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            waiter[0].set()
 
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
 
-def get_data(armor_type: str, battle_field: str, boss_name: str,
-                     difficulty: str, considerHelper_bool: bool, bilibiliDisplay_bool: bool,exclude_students: str, include_students: str):
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": (self.hits + self.coalesced) / total if total else 0.0,
+            }
+
+
+video_query_cache = VideoQueryCache()
+
+
+def _post_video_query(payload: dict) -> list:
+    """向 kina-ko-m-ochi.com 後端發送查詢，回傳紀錄列表"""
     url = "https://kina-ko-m-ochi.com/data_to_change/get_data2.php"
-    
+    now = datetime.now(timezone.utc)
+    http_date = now.strftime('%a, %d %b %Y %H:%M:%S GMT')
+    headers = {
+        "Content-Encoding" : "gzip",
+        "Server": "nginx",
+        "Date" :  http_date,
+        "X-Content-Type-Options": "nosniff",
+        "X-Xss-Protection" : "1; mode=block",
+        "Content-Type": "application/json; charset=UTF-8",
+    }
+
+    # 發送 POST 請求，直接回傳紀錄列表 (不寫入共用暫存檔，避免同時搜尋互相覆蓋)
+    response = services.resolve("http").post(url, json=payload, headers=headers, timeout=VIDEO_QUERY_TIMEOUT)
+    response.raise_for_status()
+    try:
+        data = response.json()
+    except json.JSONDecodeError:
+        raise ValueError(f"無法解析 JSON 響應: {response.text[:200]}")
+    if not isinstance(data, list):
+        raise ValueError(f"後端回傳的資料格式不正確: {str(data)[:200]}")
+    return data
+
+
+def get_data(armor_type: str, battle_field: str, boss_name: str,
+                     difficulty: str, considerHelper_bool: bool, bilibiliDisplay_bool: bool,exclude_students: str, include_students: str) -> list:
+    """
+    依條件向 kina-ko-m-ochi.com 後端查詢影片資料，回傳紀錄列表 (欄位仍為日文，需經 translate_records 翻譯)
+    """
     # 建立中→日翻譯對照表
     armor_translation = {
         "輕裝備": "軽装備",
@@ -186,39 +264,9 @@ def get_data(armor_type: str, battle_field: str, boss_name: str,
     jp_battle_field = battle_field_translation.get(battle_field, battle_field)
     jp_boss_name = boss_name_translation.get(boss_name, boss_name)
     
-    # 由於使用者提供學生名稱為中文，因此需要先取得學生中文與日文對照資料
-    jp_url = 'https://schaledb.com/data/jp/students.json'
-    tw_url = 'https://schaledb.com/data/tw/students.json'
-    try:
-        jp_response = requests.get(jp_url)
-        tw_response = requests.get(tw_url)
-        jp_students = jp_response.json()
-        tw_students = tw_response.json()
-    except Exception as e:
-        print(f"下載學生資料失敗: {e}")
-        # 若下載失敗，直接使用使用者提供的原始資料
-        translated_include = [s.strip() for s in include_students.split(",") if s.strip()] if include_students else []
-        translated_exclude = [s.strip() for s in exclude_students.split(",") if s.strip()] if exclude_students else []
-    else:
-        # 建立「中文名稱 -> 日文名稱」對照表
-        cn_to_jp_mapping = {}
-        for student_id, tw_student in tw_students.items():
-            jp_student = jp_students.get(student_id)
-            if tw_student and jp_student:
-                tw_name = tw_student.get("Name")
-                jp_name = jp_student.get("Name")
-                if tw_name and jp_name:
-                    cn_to_jp_mapping[tw_name] = jp_name
-        # 將使用者提供的 includeStudents 轉換成日文
-        translated_include = []
-        if include_students:
-            for name in [s.strip() for s in include_students.split(",") if s.strip()]:
-                translated_include.append(cn_to_jp_mapping.get(name, name))
-        # 將使用者提供的 excludeStudents 轉換成日文
-        translated_exclude = []
-        if exclude_students:
-            for name in [s.strip() for s in exclude_students.split(",") if s.strip()]:
-                translated_exclude.append(cn_to_jp_mapping.get(name, name))
+    # 使用者提供學生名稱為中文，透過共用的中文->日文對照表轉換
+    translated_include = [translator.cn_to_jp(s.strip()) for s in include_students.split(",") if s.strip()] if include_students else []
+    translated_exclude = [translator.cn_to_jp(s.strip()) for s in exclude_students.split(",") if s.strip()] if exclude_students else []
     
     payload = {
         "armor": jp_armor,
@@ -235,35 +283,6 @@ def get_data(armor_type: str, battle_field: str, boss_name: str,
         "unitNumber": 0,  
         "unit": "0"  # 0 = 不考慮幾刀，1 = 優先找一刀的組合，2 = 優先找兩刀的組合
     }
-    now = datetime.now(timezone.utc)
-    http_date = now.strftime('%a, %d %b %Y %H:%M:%S GMT')
-    headers = {
-        "Content-Encoding" : "gzip",
-        "Server": "nginx",
-        "Date" :  http_date,
-        "X-Content-Type-Options": "nosniff",
-        "X-Xss-Protection" : "1; mode=block",
-        "Content-Type": "application/json; charset=UTF-8",
-    }
-    
-    # 發送 POST 請求
-    #print("發送請求到", url)
-    #print(payload)
-    #print(headers)
-    JSON_DIR = Path(__file__).parent / "Json"
-    JSON_DIR.mkdir(parents=True, exist_ok=True)
-    CACHE_JSON = JSON_DIR / "cache.json"
-    response = requests.post(url, json=payload, headers=headers)
-    response.raise_for_status()
-    try:
-        data = response.json()
-        # print("成功解析 JSON 響應:", data)
-    except json.JSONDecodeError:
-        print("無法解析 JSON 響應:", response.text)
-        data = {"response" : response.text}    
-    with open(CACHE_JSON, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
-    print("✅ 已將資料寫入 cache.json")
-
-
-
+    # 相同條件的查詢共用快取結果；translate_records 會原地修改紀錄，因此回傳淺複本以保持快取內容不變
+    records = video_query_cache.get_or_fetch(payload, _post_video_query)
+    return [dict(rec) for rec in records]